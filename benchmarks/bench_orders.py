@@ -0,0 +1,145 @@
+"""
+End-to-end load benchmark for /handle-web-order and /handle-odoo-order.
+
+Starts the in-memory fake Odoo (benchmarks/fake_odoo.py) with the requested
+per-call latency, points the app at it and replays the Craft payloads from
+'craft resources/order-*.json' through the Flask app at the given concurrency.
+Photo URLs in the payloads are rewritten to the fake server's /images/ endpoint.
+
+Reports p50/p95/p99 latency, throughput and the number of Odoo calls per order.
+
+Usage:
+    python benchmarks/bench_orders.py [--route web|odoo|both] [--orders 30] [--concurrency 4]
+                                      [--latency-ms 40] [--jitter-ms 15] [--protocol xmlrpc|jsonrpc]
+                                      [--odoo-order-lines 5]
+"""
+import os
+import sys
+import glob
+import json
+import time
+import logging
+import argparse
+import statistics
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fake_odoo import FAKE_DB, FakeOdoo, FakeOdooServer  # noqa: E402
+
+
+def load_payloads(image_base_url):
+    """Load the Craft order payloads, with photo URLs pointing at the fake server."""
+    payloads = []
+    for path in sorted(glob.glob(os.path.join(ROOT, 'craft resources', 'order-*.json'))):
+        with open(path, encoding='utf-8') as payload_file:
+            payload = json.load(payload_file)
+        for line_item in payload.get('lineItems', []):
+            photo = line_item.get('options', {}).get('photo')
+            if isinstance(photo, dict) and photo.get('path'):
+                photo['path'] = f"{image_base_url}/images/{photo['path'].rsplit('/', 1)[-1]}"
+        payloads.append((os.path.basename(path), payload))
+    return payloads
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def run_load(app, fake, route, bodies, concurrency):
+    """POST every body to route with `concurrency` client threads. Returns (latencies_ms, errors, wall_s, calls)."""
+    local = threading.local()
+
+    def send(body):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = app.test_client()
+        started = time.perf_counter()
+        response = client.post(route, json=body)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        return elapsed_ms, response.status_code
+
+    calls_before = fake.total_calls()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(send, bodies))
+    wall = time.perf_counter() - started
+
+    latencies = [elapsed_ms for elapsed_ms, _ in results]
+    errors = sum(1 for _, status in results if status != 200)
+    return latencies, errors, wall, fake.total_calls() - calls_before
+
+
+def report(name, latencies, errors, wall, calls):
+    count = len(latencies)
+    print(f"\n{name}")
+    print(f"  orders:       {count} ({errors} failed)")
+    print(f"  latency ms:   p50 {percentile(latencies, 0.50):.0f}  p95 {percentile(latencies, 0.95):.0f}  "
+          f"p99 {percentile(latencies, 0.99):.0f}  mean {statistics.mean(latencies):.0f}  max {max(latencies):.0f}")
+    print(f"  throughput:   {count / wall:.2f} orders/s ({wall:.1f} s wall)")
+    print(f"  Odoo calls:   {calls / count:.1f} per order ({calls} total)")
+
+
+def print_top_calls(fake, limit=12):
+    print("\nMost frequent Odoo calls (all routes):")
+    for key, count in sorted(fake.call_counts.items(), key=lambda item: -item[1])[:limit]:
+        print(f"  {count:>6}  {key}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--route', choices=['web', 'odoo', 'both'], default='both')
+    parser.add_argument('--orders', type=int, default=30, help='Orders to send per route')
+    parser.add_argument('--concurrency', type=int, default=4, help='Concurrent client threads')
+    parser.add_argument('--latency-ms', type=float, default=40, help='Fake Odoo per-call latency')
+    parser.add_argument('--jitter-ms', type=float, default=15, help='Fake Odoo per-call jitter (+/-)')
+    parser.add_argument('--protocol', choices=['xmlrpc', 'jsonrpc'], default='xmlrpc')
+    parser.add_argument('--odoo-order-lines', type=int, default=5, help='Lines per seeded sale order (odoo route)')
+    parser.add_argument('--verbose', action='store_true', help='Keep the application logs')
+    options = parser.parse_args()
+
+    fake = FakeOdoo(latency=options.latency_ms / 1000, jitter=options.jitter_ms / 1000)
+    fake.seed_reference_data()
+    server = FakeOdooServer(fake).start()
+
+    # The app reads its Odoo configuration at import time
+    os.environ.update({
+        'JUSTFRAMEIT_ODOO_URL': server.url,
+        'JUSTFRAMEIT_ODOO_DB': FAKE_DB,
+        'JUSTFRAMEIT_ODOO_USERNAME': 'benchmark',
+        'JUSTFRAMEIT_ODOO_API_KEY': 'benchmark',
+        'JUSTFRAMEIT_ODOO_PROTOCOL': options.protocol,
+    })
+    from app import app
+
+    if not options.verbose:
+        logging.disable(logging.INFO)
+
+    print(f"Fake Odoo at {server.url}: {options.latency_ms:.0f} ms +/- {options.jitter_ms:.0f} ms per call, "
+          f"protocol {options.protocol}, concurrency {options.concurrency}")
+
+    try:
+        if options.route in ('web', 'both'):
+            payloads = load_payloads(server.url)
+            bodies = [payloads[index % len(payloads)][1] for index in range(options.orders)]
+            report('/handle-web-order (' + ', '.join(name for name, _ in payloads) + ')',
+                   *run_load(app, fake, '/handle-web-order', bodies, options.concurrency))
+
+        if options.route in ('odoo', 'both'):
+            bodies = [{'id': fake.seed_odoo_order(options.odoo_order_lines)} for _ in range(options.orders)]
+            report(f'/handle-odoo-order ({options.odoo_order_lines} lines per order)',
+                   *run_load(app, fake, '/handle-odoo-order', bodies, options.concurrency))
+
+        print_top_calls(fake)
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
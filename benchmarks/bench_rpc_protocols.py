@@ -0,0 +1,190 @@
+"""
+Compare XML-RPC and JSON-RPC encoding cost for the Odoo calls this service makes.
+
+For each scenario the exact execute_kw request (and its response) is encoded and
+decoded with both protocols, reporting serialize/parse time and bytes on the wire.
+
+Scenarios mirror the heaviest real calls:
+- ir.attachment create with a base64 photo in 'datas' (handle_web_order)
+- x_configuration write of a price-export CSV (generate_price_export_v2)
+- product.product search_read returning ~5k rows (generate_csv_direct)
+
+Usage:
+    python benchmarks/bench_rpc_protocols.py [--repeat 5] [--rows 5000] [--image-kb 3000]
+    python benchmarks/bench_rpc_protocols.py --live   # also time a real search_read on both protocols
+"""
+import os
+import sys
+import json
+import time
+import base64
+import random
+import argparse
+import statistics
+import xmlrpc.client
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DB, UID, API_KEY = 'justframeit', 2, 'x' * 40
+
+
+def build_scenarios(rows, image_kb):
+    """Return a list of (name, request_args, response) tuples."""
+    rng = random.Random(42)
+
+    image_base64 = base64.b64encode(rng.randbytes(image_kb * 1024)).decode('ascii')
+    attachment_call = (
+        'ir.attachment', 'create',
+        [{'name': 'photo.jpg', 'type': 'binary', 'datas': image_base64,
+          'res_model': 'sale.order', 'res_id': 4242, 'mimetype': 'image/jpeg'}],
+        {}
+    )
+
+    csv_lines = ['Product;Location;Dimension;Price']
+    for i in range(rows * 4):
+        csv_lines.append(f"LIST-{i % 700:04d};R{i % 40};{rng.randint(5, 150)} x {rng.randint(5, 150)};{rng.uniform(5, 900):.2f}")
+    csv_base64 = base64.b64encode('\n'.join(csv_lines).encode('utf-8')).decode('ascii')
+    csv_call = (
+        'x_configuration', 'write',
+        [[1], {'x_studio_price_export_csv': csv_base64, 'x_studio_price_export_csv_filename': 'export.csv'}],
+        {}
+    )
+
+    products = [{
+        'id': i,
+        'name': f"Kaderlijst {i} eiken naturel",
+        'product_tmpl_id': [10000 + i, f"Kaderlijst {i} eiken naturel"],
+        'x_studio_product_code': f"LIST-{i:05d}",
+        'x_studio_location_code': f"R{i % 40}",
+        'description_ecommerce': f"<p>Beschrijving van product {i}</p>",
+        'x_studio_price_computation': rng.choice(['Surface', 'Circumference']),
+        'standard_price': round(rng.uniform(1, 80), 2),
+        'x_studio_associated_service': [rng.randint(1, 30), 'Zagen'],
+        'x_studio_associated_work_center': [rng.randint(1, 8), 'Atelier'],
+        'x_studio_associated_cost_per_employee_per_hour': 45.0,
+    } for i in range(rows)]
+    search_read_call = (
+        'product.product', 'search_read',
+        [[['x_studio_price_computation', 'in', ['Surface', 'Circumference']]]],
+        {'fields': list(products[0].keys())}
+    )
+
+    return [
+        ('ir.attachment create (photo)', attachment_call, 4242),
+        ('x_configuration write (CSV)', csv_call, True),
+        (f'product.product search_read ({rows} rows)', search_read_call, products),
+    ]
+
+
+def xmlrpc_round(call, response):
+    model, method, args, kwargs = call
+    timings = {}
+
+    started = time.perf_counter()
+    request_body = xmlrpc.client.dumps((DB, UID, API_KEY, model, method, args, kwargs), 'execute_kw', allow_none=True).encode('utf-8')
+    timings['serialize_request'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    xmlrpc.client.loads(request_body, use_builtin_types=True)
+    timings['parse_request'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    response_body = xmlrpc.client.dumps((response,), methodresponse=True, allow_none=True).encode('utf-8')
+    timings['serialize_response'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    xmlrpc.client.loads(response_body)
+    timings['parse_response'] = time.perf_counter() - started
+
+    return timings, len(request_body), len(response_body)
+
+
+def jsonrpc_round(call, response):
+    model, method, args, kwargs = call
+    timings = {}
+
+    started = time.perf_counter()
+    request_body = json.dumps({
+        'jsonrpc': '2.0', 'method': 'call', 'id': 1,
+        'params': {'service': 'object', 'method': 'execute_kw',
+                   'args': [DB, UID, API_KEY, model, method, args, kwargs]},
+    }).encode('utf-8')
+    timings['serialize_request'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    json.loads(request_body)
+    timings['parse_request'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    response_body = json.dumps({'jsonrpc': '2.0', 'id': 1, 'result': response}).encode('utf-8')
+    timings['serialize_response'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    json.loads(response_body)
+    timings['parse_response'] = time.perf_counter() - started
+
+    return timings, len(request_body), len(response_body)
+
+
+def measure(round_function, call, response, repeat):
+    samples = [round_function(call, response) for _ in range(repeat)]
+    client_ms = statistics.median((t['serialize_request'] + t['parse_response']) * 1000 for t, _, _ in samples)
+    server_ms = statistics.median((t['parse_request'] + t['serialize_response']) * 1000 for t, _, _ in samples)
+    _, request_bytes, response_bytes = samples[0]
+    return client_ms, server_ms, request_bytes, response_bytes
+
+
+def run_codec_benchmark(rows, image_kb, repeat):
+    print(f"{'Scenario':<42} {'Protocol':<8} {'client ms':>10} {'server ms':>10} {'req bytes':>12} {'resp bytes':>12}")
+    print('-' * 100)
+    for name, call, response in build_scenarios(rows, image_kb):
+        results = {}
+        for protocol, round_function in (('xmlrpc', xmlrpc_round), ('jsonrpc', jsonrpc_round)):
+            results[protocol] = measure(round_function, call, response, repeat)
+            client_ms, server_ms, request_bytes, response_bytes = results[protocol]
+            print(f"{name:<42} {protocol:<8} {client_ms:>10.2f} {server_ms:>10.2f} {request_bytes:>12,} {response_bytes:>12,}")
+
+        xml, js = results['xmlrpc'], results['jsonrpc']
+        print(f"{'':<42} {'ratio':<8} {xml[0] / max(js[0], 1e-9):>9.1f}x {xml[1] / max(js[1], 1e-9):>9.1f}x "
+              f"{xml[2] / js[2]:>11.2f}x {xml[3] / js[3]:>11.2f}x")
+    print("\nclient ms = serialize request + parse response (this service); "
+          "server ms = parse request + serialize response (Odoo side)")
+
+
+def run_live_benchmark(repeat):
+    """Time the same search_read against the configured Odoo with both protocols."""
+    from odoo_client import ODOO_URL, ODOO_DB, ODOO_API_KEY, OdooModels, get_uid
+
+    uid = get_uid()
+    domain = [[['x_studio_price_computation', 'in', ['Surface', 'Circumference']]]]
+    fields = {'fields': ['name', 'product_tmpl_id', 'x_studio_product_code', 'x_studio_price_computation',
+                         'standard_price', 'x_studio_associated_service']}
+
+    print(f"\nLive search_read against {ODOO_URL}")
+    for protocol in ('xmlrpc', 'jsonrpc'):
+        client = OdooModels(ODOO_URL, pool_size=1, protocol=protocol)
+        durations = []
+        rows = 0
+        for _ in range(repeat):
+            started = time.perf_counter()
+            rows = len(client.execute_kw(ODOO_DB, uid, ODOO_API_KEY, 'product.product', 'search_read', domain, fields))
+            durations.append((time.perf_counter() - started) * 1000)
+        client.close()
+        print(f"  {protocol:<8} {rows} rows, median {statistics.median(durations):.1f} ms, min {min(durations):.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5, help='Repetitions per measurement (median is reported)')
+    parser.add_argument('--rows', type=int, default=5000, help='Rows in the search_read scenario')
+    parser.add_argument('--image-kb', type=int, default=3000, help='Size of the raw photo before base64 encoding')
+    parser.add_argument('--live', action='store_true', help='Also time a real search_read against JUSTFRAMEIT_ODOO_URL')
+    options = parser.parse_args()
+
+    run_codec_benchmark(options.rows, options.image_kb, options.repeat)
+    if options.live:
+        run_live_benchmark(options.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,652 @@
+"""
+In-memory stand-in for the Odoo server, for local benchmarks and tests.
+
+Implements just enough of the models touched by /handle-web-order and
+/handle-odoo-order (product.product, product.template, mrp.bom, mrp.bom.line,
+x_services, x_services_duration_rules, sale.order, sale.order.line, res.partner,
+res.country, ir.attachment, ir.logging, x_configuration, product.pricelist) to run
+the handlers end to end, over XML-RPC (/xmlrpc/2/common, /xmlrpc/2/object) and
+JSON-RPC (/jsonrpc). Every call can be delayed by a configurable latency and
+jitter to simulate a remote Odoo, and every call is counted per model.method.
+
+It also serves dummy photos on GET /images/<name> so payload photo URLs can be
+pointed at it instead of the real image host.
+
+Usage:
+    python benchmarks/fake_odoo.py --port 8069 --latency-ms 40 --jitter-ms 15
+"""
+import os
+import re
+import json
+import time
+import random
+import argparse
+import threading
+import xmlrpc.client
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FAKE_DB = 'fake'
+FAKE_UID = 2
+
+CRAFT_RESOURCES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'craft resources')
+
+# Relational fields per model: field -> (type, comodel, inverse field for one2many)
+SCHEMA = {
+    'product.product': {
+        'product_tmpl_id': ('many2one', 'product.template', None),
+        'x_studio_associated_service': ('many2one', 'x_services', None),
+        'x_studio_associated_service_duration_rule': ('many2many', 'x_services_duration_rules', None),
+        'x_studio_associated_work_center': ('many2one', 'mrp.workcenter', None),
+        'product_template_attribute_value_ids': ('many2many', 'product.template.attribute.value', None),
+        'categ_id': ('many2one', 'product.category', None),
+    },
+    'product.template': {
+        'route_ids': ('many2many', 'stock.route', None),
+        'bom_ids': ('one2many', 'mrp.bom', 'product_tmpl_id'),
+        'categ_id': ('many2one', 'product.category', None),
+    },
+    'mrp.bom': {
+        'product_tmpl_id': ('many2one', 'product.template', None),
+        'product_id': ('many2one', 'product.product', None),
+        'bom_line_ids': ('one2many', 'mrp.bom.line', 'bom_id'),
+        'operation_ids': ('one2many', 'mrp.routing.workcenter', 'bom_id'),
+    },
+    'mrp.bom.line': {
+        'bom_id': ('many2one', 'mrp.bom', None),
+        'product_id': ('many2one', 'product.product', None),
+    },
+    'mrp.routing.workcenter': {
+        'bom_id': ('many2one', 'mrp.bom', None),
+        'workcenter_id': ('many2one', 'mrp.workcenter', None),
+    },
+    'x_services': {
+        'x_studio_associated_work_center': ('many2one', 'mrp.workcenter', None),
+    },
+    'x_services_duration_rules': {
+        'x_associated_service': ('many2one', 'x_services', None),
+        'x_studio_work_center': ('many2one', 'mrp.workcenter', None),
+    },
+    'sale.order': {
+        'partner_id': ('many2one', 'res.partner', None),
+        'order_line': ('one2many', 'sale.order.line', 'order_id'),
+    },
+    'sale.order.line': {
+        'order_id': ('many2one', 'sale.order', None),
+        'product_id': ('many2one', 'product.product', None),
+        'product_template_attribute_value_ids': ('many2many', 'product.template.attribute.value', None),
+    },
+    'res.partner': {
+        'country_id': ('many2one', 'res.country', None),
+    },
+    'ir.attachment': {},
+    'mail.message': {
+        'attachment_ids': ('many2many', 'ir.attachment', None),
+    },
+}
+
+# product.product fields stored on (and read through to) the template
+TEMPLATE_FIELDS = {'name', 'list_price', 'route_ids', 'bom_ids', 'description_sale', 'image_1920', 'categ_id',
+                   'type', 'standard_price'}
+
+# Methods that only read data
+READ_METHODS = {'search', 'search_read', 'read', 'search_count', 'fields_get', 'name_search'}
+
+
+class FakeOdooError(xmlrpc.client.Fault):
+    """Raised for invalid calls; a fault, as the client sees Odoo errors over either protocol."""
+
+    def __init__(self, message):
+        super().__init__(1, message)
+
+    def __str__(self):
+        return self.faultString
+
+
+class FakeOdoo:
+    """
+    In-memory Odoo database with an execute_kw entry point.
+
+    Args:
+        latency: Base delay (seconds) added to every call
+        jitter: Random +/- delay (seconds) added on top of latency
+        seed: Random seed for jitter (deterministic runs)
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self._random = random.Random(seed)
+        self._lock = threading.RLock()
+        self.tables = {}
+        self.next_ids = {}
+        self.call_counts = {}
+        self.calls = []  # (model, method) in call order
+        self.record_calls = False
+
+    # ------------------------------------------------------------------ #
+    # Call entry points
+    # ------------------------------------------------------------------ #
+
+    def authenticate(self, db, login, password, user_agent_env=None):
+        return FAKE_UID
+
+    def execute_kw(self, db, uid, password, model, method, args, kwargs=None):
+        kwargs = kwargs or {}
+        self._sleep()
+        with self._lock:
+            key = f"{model}.{method}"
+            self.call_counts[key] = self.call_counts.get(key, 0) + 1
+            if self.record_calls:
+                self.calls.append((model, method))
+            handler = getattr(self, f"_method_{method}", None)
+            if handler is None:
+                # Business methods (action_confirm, button_bom_cost, ...) are accepted as no-ops
+                return True
+            return handler(model, *args, **kwargs)
+
+    def _sleep(self):
+        delay = self.latency
+        if self.jitter:
+            with self._lock:
+                delay += self._random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    def total_calls(self):
+        with self._lock:
+            return sum(self.call_counts.values())
+
+    def reset_counters(self):
+        with self._lock:
+            self.call_counts = {}
+            self.calls = []
+
+    # ------------------------------------------------------------------ #
+    # Storage helpers
+    # ------------------------------------------------------------------ #
+
+    def _table(self, model):
+        return self.tables.setdefault(model, {})
+
+    def _field_def(self, model, field):
+        return SCHEMA.get(model, {}).get(field)
+
+    def insert(self, model, vals):
+        """Create a record without counting it as an RPC call (used for seeding)."""
+        with self._lock:
+            return self._create_one(model, dict(vals))
+
+    def _create_one(self, model, vals):
+        record_id = self.next_ids.get(model, 1)
+        self.next_ids[model] = record_id + 1
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        record = {'id': record_id, 'create_date': now, 'write_date': now}
+        self._table(model)[record_id] = record
+
+        if model == 'product.product':
+            template_vals = {field: vals.pop(field) for field in list(vals) if field in TEMPLATE_FIELDS}
+            if 'product_tmpl_id' not in vals:
+                template_vals.setdefault('name', vals.get('default_code') or f"Product {record_id}")
+                vals['product_tmpl_id'] = self._create_one('product.template', template_vals)
+            elif template_vals:
+                self._write_one('product.template', vals['product_tmpl_id'], template_vals)
+        if model == 'sale.order.line':
+            vals.setdefault('product_updatable', True)
+            vals.setdefault('product_template_attribute_value_ids', [])
+            vals.setdefault('product_uom_qty', 1)
+        if model == 'sale.order':
+            vals.setdefault('state', 'draft')
+
+        self._apply_vals(model, record, vals)
+
+        if model == 'sale.order.line' and not record.get('name') and record.get('product_id'):
+            product = self._read_one('product.product', record['product_id'], ['display_name', 'description_sale'])
+            name = product['display_name']
+            if product.get('description_sale'):
+                name += "\n" + product['description_sale']
+            record['name'] = name
+        return record_id
+
+    def _write_one(self, model, record_id, vals):
+        record = self._table(model).get(record_id)
+        if record is None:
+            raise FakeOdooError(f"Record {model}({record_id}) does not exist")
+        if model == 'product.product':
+            template_vals = {field: vals.pop(field) for field in list(vals) if field in TEMPLATE_FIELDS}
+            if template_vals:
+                self._write_one('product.template', record['product_tmpl_id'], template_vals)
+        self._apply_vals(model, record, vals)
+        record['write_date'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    def _apply_vals(self, model, record, vals):
+        for field, value in vals.items():
+            field_def = self._field_def(model, field)
+            if not field_def:
+                record[field] = value
+                continue
+            field_type, comodel, inverse = field_def
+            if field_type == 'many2one':
+                record[field] = value[0] if isinstance(value, (list, tuple)) else (value or False)
+            elif field_type == 'many2many':
+                record[field] = self._apply_x2many_commands(comodel, None, None, record.get(field, []), value)
+            else:  # one2many: ids live on the comodel through the inverse field
+                self._apply_x2many_commands(comodel, inverse, record['id'], [], value)
+
+    def _apply_x2many_commands(self, comodel, inverse, parent_id, current_ids, commands):
+        ids = list(current_ids)
+        for command in commands or []:
+            if isinstance(command, int):
+                ids.append(command)
+                continue
+            operation = command[0]
+            if operation == 0:
+                vals = dict(command[2])
+                if inverse:
+                    vals[inverse] = parent_id
+                ids.append(self._create_one(comodel, vals))
+            elif operation == 1:
+                self._write_one(comodel, command[1], dict(command[2]))
+            elif operation == 2:
+                self._table(comodel).pop(command[1], None)
+                ids = [i for i in ids if i != command[1]]
+            elif operation in (3, 5):
+                ids = [] if operation == 5 else [i for i in ids if i != command[1]]
+            elif operation == 4:
+                if inverse:
+                    self._write_one(comodel, command[1], {inverse: parent_id})
+                if command[1] not in ids:
+                    ids.append(command[1])
+            elif operation == 6:
+                ids = list(command[2])
+        return ids
+
+    def _one2many_ids(self, model, field, record_id):
+        _, comodel, inverse = self._field_def(model, field)
+        return sorted(rid for rid, rec in self._table(comodel).items() if rec.get(inverse) == record_id)
+
+    def _display_name(self, model, record):
+        if model == 'product.product':
+            name = self._field_value(model, record, 'name')
+            code = record.get('default_code')
+            return f"[{code}] {name}" if code else name
+        return record.get('name') or record.get('x_name') or f"{model},{record['id']}"
+
+    def _field_value(self, model, record, field):
+        if model == 'product.product' and field in TEMPLATE_FIELDS:
+            template = self._table('product.template').get(record.get('product_tmpl_id'), {})
+            return self._field_value('product.template', template, field) if template else False
+        if field == 'display_name':
+            return self._display_name(model, record)
+        field_def = self._field_def(model, field)
+        if field_def:
+            field_type, comodel, _ = field_def
+            if field_type == 'one2many':
+                return self._one2many_ids(model, field, record['id'])
+            if field_type == 'many2one':
+                related_id = record.get(field)
+                related = self._table(comodel).get(related_id) if related_id else None
+                if not related_id:
+                    return False
+                return [related_id, self._display_name(comodel, related) if related else str(related_id)]
+            return list(record.get(field, []))
+        return record.get(field, False)
+
+    def _read_one(self, model, record_id, fields):
+        record = self._table(model).get(record_id)
+        if record is None:
+            return None
+        fields = fields or [f for f in record if f not in ('create_date',)]
+        result = {'id': record_id}
+        for field in fields:
+            result[field] = self._field_value(model, record, field)
+        return result
+
+    # ------------------------------------------------------------------ #
+    # Domain evaluation
+    # ------------------------------------------------------------------ #
+
+    def _match(self, model, record, domain):
+        # Odoo domains are in prefix notation with an implicit '&' between terms
+        results = []
+        for term in reversed(domain):
+            if term == '!':
+                results.append(not results.pop())
+            elif term in ('&', '|'):
+                first, second = results.pop(), results.pop()
+                results.append(first and second if term == '&' else first or second)
+            else:
+                results.append(self._match_term(model, record, term))
+        return all(results)
+
+    def _match_term(self, model, record, term):
+        field, operator, value = term
+        if '.' in field:
+            # Dotted path through a many2one, e.g. product_tmpl_id.write_date
+            head, rest = field.split('.', 1)
+            _, comodel, _ = self._field_def(model, head)
+            related = self._table(comodel).get(record.get(head))
+            return related is not None and self._match_term(comodel, related, (rest, operator, value))
+        actual = self._field_value(model, record, field)
+        field_def = self._field_def(model, field)
+        if isinstance(actual, list) and field_def and field_def[0] == 'many2one':
+            actual = actual[0]
+        return self._compare(actual, operator, value)
+
+    @staticmethod
+    def _compare(actual, operator, value):
+        if operator == '=':
+            return actual == value or (isinstance(actual, list) and value in actual)
+        if operator == '!=':
+            return actual != value
+        if operator == 'in':
+            if isinstance(actual, list):
+                return any(item in value for item in actual)
+            return actual in value
+        if operator == 'not in':
+            return actual not in value
+        if operator in ('ilike', 'like'):
+            return str(value).lower() in str(actual or '').lower()
+        if operator in ('>', '>=', '<', '<='):
+            if actual in (False, None):
+                return False
+            return {'>': actual > value, '>=': actual >= value, '<': actual < value, '<=': actual <= value}[operator]
+        raise FakeOdooError(f"Unsupported domain operator: {operator}")
+
+    def _search_ids(self, model, domain, offset=0, limit=None, order=None):
+        ids = [rid for rid, rec in sorted(self._table(model).items()) if self._match(model, rec, domain or [])]
+        if order and order.strip().endswith('desc'):
+            ids.reverse()
+        ids = ids[offset:]
+        return ids[:limit] if limit else ids
+
+    # ------------------------------------------------------------------ #
+    # ORM methods
+    # ------------------------------------------------------------------ #
+
+    def _method_search(self, model, domain=None, offset=0, limit=None, order=None, **kwargs):
+        return self._search_ids(model, domain, offset, limit, order)
+
+    def _method_search_count(self, model, domain=None, **kwargs):
+        return len(self._search_ids(model, domain))
+
+    def _method_read(self, model, ids, fields=None, **kwargs):
+        single = isinstance(ids, int)
+        ids = [ids] if single else ids
+        return [r for r in (self._read_one(model, rid, fields) for rid in ids) if r is not None]
+
+    def _method_search_read(self, model, domain=None, fields=None, offset=0, limit=None, order=None, **kwargs):
+        ids = self._search_ids(model, domain, offset, limit, order)
+        return [self._read_one(model, rid, fields) for rid in ids]
+
+    def _method_create(self, model, vals, **kwargs):
+        if isinstance(vals, list):
+            return [self._create_one(model, dict(v)) for v in vals]
+        return self._create_one(model, dict(vals))
+
+    def _method_write(self, model, ids, vals, **kwargs):
+        ids = [ids] if isinstance(ids, int) else ids
+        for record_id in ids:
+            self._write_one(model, record_id, dict(vals))
+        return True
+
+    def _method_unlink(self, model, ids, **kwargs):
+        ids = [ids] if isinstance(ids, int) else ids
+        for record_id in ids:
+            self._table(model).pop(record_id, None)
+        return True
+
+    def _method_message_post(self, model, record_id, **kwargs):
+        record_id = record_id[0] if isinstance(record_id, list) else record_id
+        vals = {'model': model, 'res_id': record_id, 'body': kwargs.get('body', '')}
+        missing = [aid for aid in kwargs.get('attachment_ids') or [] if aid not in self._table('ir.attachment')]
+        if missing:
+            raise FakeOdooError(f"Record ir.attachment({missing[0]}) does not exist")
+        if kwargs.get('attachment_ids'):
+            vals['attachment_ids'] = [(6, 0, kwargs['attachment_ids'])]
+        return self._create_one('mail.message', vals)
+
+    def _method_action_confirm(self, model, ids, **kwargs):
+        for record_id in ids:
+            self._write_one(model, record_id, {'state': 'sale'})
+        return True
+
+    def _method_action_update_prices(self, model, ids, **kwargs):
+        # Odoo returns None here, which XML-RPC cannot marshal without allow_none
+        raise FakeOdooError("cannot marshal None unless allow_none is enabled")
+
+    def _method_button_bom_cost(self, model, ids, **kwargs):
+        raise FakeOdooError("cannot marshal None unless allow_none is enabled")
+
+    # ------------------------------------------------------------------ #
+    # Seed data
+    # ------------------------------------------------------------------ #
+
+    def seed_reference_data(self, payload_dir=CRAFT_RESOURCES):
+        """
+        Create the component catalog, services, duration rules, pricelists and
+        configuration needed by the handlers, using every SKU found in the Craft
+        order payloads.
+        """
+        computations = {'list': 'Circumference', 'glass': 'Surface', 'passePartout': 'Surface', 'backCover': 'Surface'}
+        skus = {}
+        for filename in sorted(os.listdir(payload_dir)):
+            if not re.match(r'order-.*\.json$', filename):
+                continue
+            with open(os.path.join(payload_dir, filename), encoding='utf-8') as payload_file:
+                payload = json.load(payload_file)
+            for line_item in payload.get('lineItems', []):
+                breakdown = line_item.get('options', {}).get('priceBreakdown', {})
+                for product_type, data in breakdown.items():
+                    if not isinstance(data, dict):
+                        continue
+                    for product in data.get('products', []):
+                        if product.get('sku'):
+                            skus.setdefault(product['sku'].split('.')[0], product_type)
+
+        with self._lock:
+            workcenter_id = self._create_one('mrp.workcenter', {'name': 'Atelier'})
+            for index, (code, product_type) in enumerate(sorted(skus.items()), 1):
+                service_id = self._create_one('x_services', {
+                    'x_name': f"Service {code}",
+                    'x_studio_associated_work_center': workcenter_id,
+                })
+                rule_ids = [
+                    self._create_one('x_services_duration_rules', {
+                        'x_associated_service': service_id,
+                        'x_studio_work_center': workcenter_id,
+                        'x_studio_quantity': quantity,
+                        'x_duurtijd_totaal': duration,
+                    })
+                    for quantity, duration in ((0.5, 120), (1, 240), (2, 420), (5, 900), (100, 1800))
+                ]
+                self._create_one('product.product', {
+                    'name': f"Component {code}",
+                    'default_code': code,
+                    'type': 'consu',
+                    'x_studio_product_code': code,
+                    'x_studio_price_computation': computations.get(product_type, 'Unit'),
+                    'x_studio_associated_service': service_id,
+                    'x_studio_associated_service_duration_rule': [(6, 0, rule_ids)],
+                    'x_studio_is_visible_in_portal_reports': product_type in ('list', 'glass', 'passePartout'),
+                    'standard_price': 2.5 * index,
+                })
+
+            for name, discount in (('Default', 0), ('Retail', 0), ('Pro', 15)):
+                self._create_one('product.pricelist', {'name': name, 'x_studio_price_discount': discount})
+            self._create_one('x_configuration', {'x_name': 'Configuration', 'x_studio_price_export_dimensions': False})
+            self._create_one('res.country', {'name': 'Belgium'})
+        return sorted(skus)
+
+    def seed_odoo_order(self, line_count, components_per_line=4):
+        """
+        Create a draft sale order with line_count lines, each on a template product
+        that has a BOM made of existing catalog components. Returns the order id.
+        """
+        with self._lock:
+            component_ids = self._search_ids('product.product', [['x_studio_product_code', '!=', False]])
+            if not component_ids:
+                raise FakeOdooError("Seed the reference data first")
+            partner_id = self._create_one('res.partner', {'name': 'Benchmark Customer', 'email': 'bench@example.com'})
+            order_lines = []
+            for index in range(line_count):
+                product_id = self._create_one('product.product', {
+                    'name': f"Kader op maat {index + 1}",
+                    'default_code': f"PRESET{index + 1:03d}",
+                    'x_studio_width': 30 + index,
+                    'x_studio_height': 40 + index,
+                })
+                template_id = self._table('product.product')[product_id]['product_tmpl_id']
+                bom_lines = [
+                    (0, 0, {'product_id': component_ids[(index + offset) % len(component_ids)], 'product_qty': 1})
+                    for offset in range(components_per_line)
+                ]
+                self._create_one('mrp.bom', {'product_tmpl_id': template_id, 'product_qty': 1, 'bom_line_ids': bom_lines})
+                order_lines.append((0, 0, {'product_id': product_id, 'price_unit': 50 + index, 'product_uom_qty': 1}))
+            return self._create_one('sale.order', {'partner_id': partner_id, 'order_line': order_lines})
+
+
+class FakeOdooRequestHandler(BaseHTTPRequestHandler):
+    """HTTP/1.1 keep-alive handler for XML-RPC, JSON-RPC and dummy image requests."""
+
+    protocol_version = 'HTTP/1.1'
+    fake = None  # set by FakeOdooServer
+    image_bytes = b''
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, body, content_type, status=200):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if not self.path.startswith('/images/'):
+            self._reply(b'Not found', 'text/plain', 404)
+            return
+        if self.headers.get('If-None-Match') == '"fake-image"':
+            self.send_response(304)
+            self.send_header('ETag', '"fake-image"')
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/jpeg')
+        self.send_header('Content-Length', str(len(self.image_bytes)))
+        self.send_header('ETag', '"fake-image"')
+        self.end_headers()
+        self.wfile.write(self.image_bytes)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.path.endswith('/jsonrpc'):
+            self._handle_jsonrpc(body)
+        elif self.path.endswith('/xmlrpc/2/common') or self.path.endswith('/xmlrpc/2/object'):
+            self._handle_xmlrpc(body)
+        else:
+            self._reply(b'Not found', 'text/plain', 404)
+
+    def _dispatch(self, service, method, params):
+        if service == 'common':
+            if method == 'authenticate':
+                return self.fake.authenticate(*params)
+            if method == 'version':
+                return {'server_version': 'fake'}
+        if service == 'object' and method == 'execute_kw':
+            return self.fake.execute_kw(*params)
+        raise FakeOdooError(f"Unknown method {service}.{method}")
+
+    def _handle_xmlrpc(self, body):
+        params, method = xmlrpc.client.loads(body, use_builtin_types=True)
+        service = 'common' if self.path.endswith('/common') else 'object'
+        try:
+            result = self._dispatch(service, method, params)
+            response = xmlrpc.client.dumps((result,), methodresponse=True, allow_none=True)
+        except Exception as e:
+            response = xmlrpc.client.dumps(xmlrpc.client.Fault(1, f"{type(e).__name__}: {e}"), allow_none=True)
+        self._reply(response.encode('utf-8'), 'text/xml')
+
+    def _handle_jsonrpc(self, body):
+        payload = json.loads(body)
+        params = payload.get('params', {})
+        try:
+            result = self._dispatch(params.get('service'), params.get('method'), params.get('args', []))
+            response = {'jsonrpc': '2.0', 'id': payload.get('id'), 'result': result}
+        except Exception as e:
+            response = {'jsonrpc': '2.0', 'id': payload.get('id'), 'error': {
+                'code': 200, 'message': 'Odoo Server Error',
+                'data': {'name': f"fake_odoo.{type(e).__name__}", 'message': str(e)},
+            }}
+        self._reply(json.dumps(response).encode('utf-8'), 'application/json')
+
+
+class FakeOdooServer:
+    """
+    Threaded HTTP server exposing a FakeOdoo instance.
+
+    Example:
+        fake = FakeOdoo(latency=0.03, jitter=0.01)
+        fake.seed_reference_data()
+        with FakeOdooServer(fake) as server:
+            os.environ['JUSTFRAMEIT_ODOO_URL'] = server.url
+    """
+
+    def __init__(self, fake, host='127.0.0.1', port=0, image_size=200 * 1024):
+        handler = type('BoundFakeOdooRequestHandler', (FakeOdooRequestHandler,), {
+            'fake': fake,
+            'image_bytes': random.Random(1).randbytes(image_size),
+        })
+        self.fake = fake
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8069)
+    parser.add_argument('--latency-ms', type=float, default=0, help='Delay added to every call')
+    parser.add_argument('--jitter-ms', type=float, default=0, help='Random +/- delay added on top of the latency')
+    parser.add_argument('--odoo-order-lines', type=int, default=0, help='Also seed a sale order with this many lines')
+    options = parser.parse_args()
+
+    fake = FakeOdoo(latency=options.latency_ms / 1000, jitter=options.jitter_ms / 1000)
+    skus = fake.seed_reference_data()
+    print(f"Seeded {len(skus)} components")
+    if options.odoo_order_lines:
+        order_id = fake.seed_odoo_order(options.odoo_order_lines)
+        print(f"Seeded sale order {order_id} with {options.odoo_order_lines} lines")
+
+    server = FakeOdooServer(fake, options.host, options.port)
+    print(f"Fake Odoo listening on {server.url} (db: {FAKE_DB})")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,362 @@
+import os
+import time
+import bisect
+import logging
+import threading
+from collections import OrderedDict
+from odoo_client import ODOO_DB, ODOO_API_KEY
+from reference_replica import get_reference_replica
+
+logger = logging.getLogger(__name__)
+
+# Seconds a cached component stays valid (the catalog changes about once a day)
+CATALOG_CACHE_TTL = float(os.getenv('JUSTFRAMEIT_CATALOG_CACHE_TTL', '3600'))
+
+# Seconds an unknown product code is remembered as missing
+CATALOG_NEGATIVE_TTL = float(os.getenv('JUSTFRAMEIT_CATALOG_NEGATIVE_TTL', '300'))
+
+# Maximum number of product codes kept per process (least recently used are evicted)
+CATALOG_CACHE_SIZE = int(os.getenv('JUSTFRAMEIT_CATALOG_CACHE_SIZE', '5000'))
+
+# Everything prepare_product_and_bom needs from a component (incl. the visible-in-reports flag)
+COMPONENT_FIELDS = [
+    'id',
+    'name',
+    'x_studio_product_code',
+    'x_studio_price_computation',
+    'x_studio_associated_service',
+    'x_studio_associated_service_duration_rule',
+    'x_studio_is_visible_in_portal_reports',
+]
+
+# Seconds the service and duration-rule tables stay valid
+SERVICE_CACHE_TTL = float(os.getenv('JUSTFRAMEIT_SERVICE_CACHE_TTL', '3600'))
+
+# Minimum seconds between two on-demand reloads triggered by unknown service/rule ids
+SERVICE_MIN_RELOAD_INTERVAL = float(os.getenv('JUSTFRAMEIT_SERVICE_MIN_RELOAD_INTERVAL', '30'))
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+_services = None
+_services_lock = threading.Lock()
+
+
+class ComponentCatalog:
+    """
+    Process-level read-through LRU/TTL cache of components, keyed by x_studio_product_code.
+
+    Lookups only fetch the codes that are missing or expired, in a single batched
+    search_read. Codes Odoo does not know are cached as missing for a shorter TTL.
+    Returned records are shared between requests and must not be modified.
+
+    When the reference replica is enabled, missing codes are read from it instead
+    of Odoo (a local read, kept fresh by its delta sync) and the cache is cleared
+    whenever a replica sync changed data, so it only saves the SQLite reads and
+    JSON decoding of repeated lookups.
+    """
+
+    def __init__(self, ttl=CATALOG_CACHE_TTL, negative_ttl=CATALOG_NEGATIVE_TTL, max_size=CATALOG_CACHE_SIZE):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max(1, max_size)
+        self._entries = OrderedDict()  # product code -> (expires_at, record or None)
+        self._generation = None  # reference replica generation the entries were read from
+        self._lock = threading.Lock()
+        # Counters
+        self._hits = 0
+        self._misses = 0
+        self._negative_hits = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._fetches = 0
+        self._fetched_codes = 0
+        self._replica_lookups = 0
+
+    def get_many(self, models, uid, codes):
+        """
+        Get components by product code.
+
+        Args:
+            models: Odoo models proxy
+            uid: User ID
+            codes: Iterable of x_studio_product_code values
+
+        Returns:
+            dict: product code -> component record (codes not found in Odoo are left out)
+        """
+        replica = get_reference_replica()
+        generation = None
+        if replica is not None:
+            replica.ensure_fresh(models, uid)
+            generation = replica.generation()
+            with self._lock:
+                if generation != self._generation:
+                    # A sync changed the replica (or this is the first lookup): start over from it
+                    self._entries.clear()
+                    self._generation = generation
+
+        found = {}
+        missing = []
+        now = time.monotonic()
+        with self._lock:
+            for code in dict.fromkeys(c for c in codes if c):
+                entry = self._entries.get(code)
+                if entry is not None and entry[0] < now:
+                    del self._entries[code]
+                    self._expirations += 1
+                    entry = None
+                if entry is None:
+                    self._misses += 1
+                    missing.append(code)
+                    continue
+                self._entries.move_to_end(code)
+                if entry[1] is None:
+                    self._negative_hits += 1
+                else:
+                    self._hits += 1
+                    found[code] = entry[1]
+
+        if missing:
+            fetched = self._fetch(models, uid, missing, replica, generation)
+            found.update(fetched)
+        return found
+
+    def _fetch(self, models, uid, codes, replica=None, generation=None):
+        if replica is not None:
+            fetched = replica.by_keys(models, uid, 'product.product', codes)
+        else:
+            logger.info(f"Component catalog: fetching {len(codes)} uncached product code(s)")
+            records = models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
+                'product.product', 'search_read',
+                [[['x_studio_product_code', 'in', codes]]],
+                {'fields': COMPONENT_FIELDS})
+            fetched = {record['x_studio_product_code']: record for record in records}
+
+        now = time.monotonic()
+        with self._lock:
+            if replica is not None:
+                self._replica_lookups += 1
+            else:
+                self._fetches += 1
+            self._fetched_codes += len(codes)
+            if generation != self._generation:
+                # A concurrent lookup saw a newer replica generation: these records may be stale
+                return fetched
+            for code in codes:
+                record = fetched.get(code)
+                expires_at = now + (self.ttl if record is not None else self.negative_ttl)
+                self._entries[code] = (expires_at, record)
+                self._entries.move_to_end(code)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+        return fetched
+
+    def invalidate(self, codes=None):
+        """Forget the given product codes, or the whole catalog when codes is None."""
+        with self._lock:
+            if codes is None:
+                self._entries.clear()
+                return
+            for code in codes:
+                self._entries.pop(code, None)
+
+    def stats(self):
+        """Hit/miss/eviction counters."""
+        with self._lock:
+            lookups = self._hits + self._negative_hits + self._misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl,
+                'hits': self._hits,
+                'negative_hits': self._negative_hits,
+                'misses': self._misses,
+                'hit_ratio': round((self._hits + self._negative_hits) / lookups, 4) if lookups else 0.0,
+                'evictions': self._evictions,
+                'expirations': self._expirations,
+                'fetches': self._fetches,
+                'fetched_codes': self._fetched_codes,
+                'replica_lookups': self._replica_lookups,
+                'replica_generation': self._generation,
+            }
+
+
+class ServiceTables:
+    """One loaded snapshot of x_services and x_services_duration_rules."""
+
+    def __init__(self, services, duration_rules, generation=None):
+        self.loaded_at = time.monotonic()
+        self.generation = generation  # reference replica generation the tables were built from
+        self.services_by_id = {service['id']: service for service in services}
+        self.rules_by_id = {rule['id']: rule for rule in duration_rules}
+        self.compiled = {}  # tuple of rule ids -> (sorted quantities, durations)
+
+
+class ServiceCatalog:
+    """
+    Process-level cache of services and their duration rules.
+
+    Both tables are read with one search_read each and kept for a TTL (or until
+    refresh()). With the reference replica enabled they are read locally from it
+    and rebuilt whenever a replica sync changed data. Each component's duration rule set is compiled once into sorted
+    quantity/duration arrays, so finding the operation duration is a bisect
+    instead of a sort and a linear scan per component.
+    """
+
+    def __init__(self, ttl=SERVICE_CACHE_TTL, min_reload_interval=SERVICE_MIN_RELOAD_INTERVAL):
+        self.ttl = ttl
+        self.min_reload_interval = min_reload_interval
+        self._tables = None
+        self._load_lock = threading.Lock()
+        self._compile_lock = threading.Lock()
+        # Counters
+        self._loads = 0
+        self._lookups = 0
+        self._compilations = 0
+
+    def _load(self, models, uid):
+        replica = get_reference_replica()
+        if replica is not None:
+            # The replica is fresh here (tables() synced it); read it locally
+            generation = replica.generation()
+            self._tables = ServiceTables(replica.records(models, uid, 'x_services'),
+                                         replica.records(models, uid, 'x_services_duration_rules'), generation)
+            self._loads += 1
+            logger.info(f"Service catalog: loaded from reference replica (generation {generation})")
+            return self._tables
+
+        logger.info("Service catalog: loading services and duration rules")
+        services = models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
+            'x_services', 'search_read', [[]],
+            {'fields': ['x_name', 'x_studio_associated_work_center']})
+        duration_rules = models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
+            'x_services_duration_rules', 'search_read', [[]],
+            {'fields': ['x_studio_quantity', 'x_duurtijd_totaal']})
+        self._tables = ServiceTables(services, duration_rules)
+        self._loads += 1
+        logger.info(f"Service catalog: loaded {len(services)} services and {len(duration_rules)} duration rules")
+        return self._tables
+
+    def tables(self, models, uid, service_ids=(), rule_ids=()):
+        """
+        Return the current tables, loading them when missing or expired.
+
+        If any of the given service or duration rule ids is unknown (created after
+        the last load), the tables are reloaded, at most once per min_reload_interval.
+        """
+        tables = self._tables
+        replica = get_reference_replica()
+        if replica is not None:
+            replica.ensure_fresh(models, uid)
+            if tables is not None and tables.generation == replica.generation():
+                return tables
+        elif tables is not None and time.monotonic() - tables.loaded_at < self.ttl:
+            unknown = (any(sid not in tables.services_by_id for sid in service_ids)
+                       or any(rid not in tables.rules_by_id for rid in rule_ids))
+            if not unknown or time.monotonic() - tables.loaded_at < self.min_reload_interval:
+                return tables
+
+        with self._load_lock:
+            # Another thread may have reloaded while we were waiting
+            if self._tables is not tables:
+                return self._tables
+            return self._load(models, uid)
+
+    def refresh(self, models, uid):
+        """Reload both tables now."""
+        with self._load_lock:
+            return self._load(models, uid)
+
+    def invalidate(self):
+        """Drop the tables; the next lookup reloads them."""
+        with self._load_lock:
+            self._tables = None
+
+    def duration_for(self, tables, rule_ids, quantity):
+        """
+        Duration (seconds) of the first rule whose x_studio_quantity is >= quantity,
+        or of the largest rule if quantity exceeds them all.
+
+        Args:
+            tables: ServiceTables returned by tables()
+            rule_ids: The component's x_studio_associated_service_duration_rule ids
+            quantity: Component quantity (surface, circumference or units)
+
+        Returns:
+            The matching x_duurtijd_totaal, or None if none of the rules are known
+        """
+        key = tuple(rule_ids)
+        compiled = tables.compiled.get(key)
+        if compiled is None:
+            rules = [tables.rules_by_id[rid] for rid in key if rid in tables.rules_by_id]
+            rules_sorted = sorted(rules, key=lambda rule: rule['x_studio_quantity'])
+            compiled = (
+                [rule['x_studio_quantity'] for rule in rules_sorted],
+                [rule['x_duurtijd_totaal'] for rule in rules_sorted],
+            )
+            with self._compile_lock:
+                tables.compiled[key] = compiled
+                self._compilations += 1
+        self._lookups += 1
+
+        quantities, durations = compiled
+        if not quantities:
+            return None
+        index = bisect.bisect_left(quantities, quantity)
+        return durations[min(index, len(durations) - 1)]
+
+    def stats(self):
+        """Load and lookup counters."""
+        tables = self._tables
+        return {
+            'ttl_seconds': self.ttl,
+            'loaded': tables is not None,
+            'age_seconds': round(time.monotonic() - tables.loaded_at, 1) if tables else None,
+            'services': len(tables.services_by_id) if tables else 0,
+            'duration_rules': len(tables.rules_by_id) if tables else 0,
+            'compiled_rule_sets': len(tables.compiled) if tables else 0,
+            'loads': self._loads,
+            'compilations': self._compilations,
+            'lookups': self._lookups,
+        }
+
+
+def get_component_catalog():
+    """Get the process-wide component catalog cache"""
+    global _catalog
+    if _catalog is not None:
+        return _catalog
+
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = ComponentCatalog()
+        return _catalog
+
+
+def get_service_catalog():
+    """Get the process-wide service and duration-rule cache"""
+    global _services
+    if _services is not None:
+        return _services
+
+    with _services_lock:
+        if _services is None:
+            _services = ServiceCatalog()
+        return _services
+
+
+def _reset_after_fork():
+    global _catalog_lock, _services_lock
+    _catalog_lock = threading.Lock()
+    _services_lock = threading.Lock()
+    if _catalog is not None:
+        _catalog._lock = threading.Lock()
+    if _services is not None:
+        _services._load_lock = threading.Lock()
+        _services._compile_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
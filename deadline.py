@@ -0,0 +1,149 @@
+import os
+import time
+import logging
+import functools
+import threading
+import contextvars
+
+logger = logging.getLogger(__name__)
+
+# Time budget (seconds) of an order request; below gunicorn's --timeout=600 so the request ends before the worker is killed
+REQUEST_DEADLINE = float(os.getenv('JUSTFRAMEIT_REQUEST_DEADLINE', '540'))
+
+# Remaining time (seconds) a non-essential stage (chatter posts, log attachments, route log) needs to still run
+NON_ESSENTIAL_RESERVE = float(os.getenv('JUSTFRAMEIT_DEADLINE_RESERVE', '60'))
+
+# Deadline of the request currently being handled (propagated to worker threads via copy_context)
+_current_deadline = contextvars.ContextVar('request_deadline', default=None)
+
+# Process-wide counters
+_stats_lock = threading.Lock()
+_started = 0
+_exceeded = 0
+_skipped_stages = {}
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a stage of a request starts after the request's deadline, or is cut off by it."""
+
+
+class Deadline:
+    """Point in time by which a request must be finished."""
+
+    def __init__(self, seconds, route=None):
+        self.seconds = seconds
+        self.route = route
+        self.expires_at = time.monotonic() + seconds
+        self.exceeded = False
+
+    def remaining(self):
+        """Seconds left (negative once expired)."""
+        return self.expires_at - time.monotonic()
+
+    def check(self, stage):
+        """Raise DeadlineExceeded if the deadline has passed."""
+        if self.remaining() <= 0:
+            raise self.expire(f"exceeded before {stage}")
+
+    def expire(self, reason):
+        """Record that the request ran out of time (counted once per request) and return the error to raise."""
+        global _exceeded
+        with _stats_lock:
+            if not self.exceeded:
+                self.exceeded = True
+                _exceeded += 1
+        return DeadlineExceeded(f"Deadline of {self.seconds:g}s for {self.route or 'the request'} {reason}")
+
+
+def request_deadline(route, seconds=None):
+    """
+    Decorator giving every call of a route a deadline of seconds (REQUEST_DEADLINE by default).
+
+    The deadline is visible to everything the request runs, including its worker
+    pool tasks, and is cleared when the route returns (threads serve many requests).
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            global _started
+            with _stats_lock:
+                _started += 1
+            token = _current_deadline.set(Deadline(REQUEST_DEADLINE if seconds is None else seconds, route))
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _current_deadline.reset(token)
+        return wrapper
+    return decorator
+
+
+def current_deadline():
+    """Return the deadline of the request being handled, or None."""
+    return _current_deadline.get()
+
+
+def check_deadline(stage):
+    """Raise DeadlineExceeded if the current request is past its deadline (no-op outside one)."""
+    deadline = _current_deadline.get()
+    if deadline is not None:
+        deadline.check(stage)
+
+
+def bounded_timeout(timeout, stage):
+    """
+    Timeout for a blocking operation of the current request.
+
+    Args:
+        timeout: Timeout (seconds) the operation would use on its own, or None for none
+        stage: What is about to block, for the error message
+
+    Returns:
+        float: timeout capped to the time left before the deadline (timeout as is outside a request)
+
+    Raises:
+        DeadlineExceeded: If the deadline has already passed
+    """
+    deadline = _current_deadline.get()
+    if deadline is None:
+        return timeout
+    deadline.check(stage)
+    remaining = deadline.remaining()
+    return remaining if timeout is None else min(timeout, remaining)
+
+
+def deadline_allows(stage, reserve=NON_ESSENTIAL_RESERVE):
+    """
+    Return True if a non-essential stage still fits in the current request's budget.
+
+    A stage is skipped (False) when less than reserve seconds are left, so the
+    request finishes in time instead of spending its last minutes on chatter
+    posts and logs. Always True outside a request with a deadline.
+    """
+    deadline = _current_deadline.get()
+    if deadline is None or deadline.remaining() >= reserve:
+        return True
+    logger.warning(f"Skipping {stage}: {max(deadline.remaining(), 0):.1f}s left before the deadline")
+    with _stats_lock:
+        _skipped_stages[stage] = _skipped_stages.get(stage, 0) + 1
+    return False
+
+
+def get_deadline_stats():
+    """Deadline counters of this process, for the stats endpoint."""
+    with _stats_lock:
+        return {
+            'request_deadline_s': REQUEST_DEADLINE,
+            'reserve_s': NON_ESSENTIAL_RESERVE,
+            'requests': _started,
+            'exceeded': _exceeded,
+            'skipped_stages': dict(_skipped_stages),
+        }
+
+
+def _reset_after_fork():
+    global _stats_lock
+    _stats_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,265 @@
+import io
+import os
+import base64
+import hashlib
+import logging
+import threading
+import contextvars
+import concurrent.futures
+import requests
+from requests.adapters import HTTPAdapter
+from image_store import get_image_store
+from deadline import DeadlineExceeded, bounded_timeout, check_deadline
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional: without it images are uploaded as downloaded
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of connections kept open per image host
+IMAGE_POOL_SIZE = int(os.getenv('JUSTFRAMEIT_IMAGE_POOL_SIZE', '8'))
+
+# Maximum number of images downloaded at the same time per process
+IMAGE_WORKERS = int(os.getenv('JUSTFRAMEIT_IMAGE_WORKERS', '8'))
+
+# Images larger than this (bytes) are rejected
+IMAGE_MAX_BYTES = int(os.getenv('JUSTFRAMEIT_IMAGE_MAX_BYTES', str(25 * 1024 * 1024)))
+
+# Connect/read timeout (seconds) for image downloads
+IMAGE_TIMEOUT = float(os.getenv('JUSTFRAMEIT_IMAGE_TIMEOUT', '30'))
+
+# Longest side (pixels) images are downscaled to before upload; 0 disables (needs Pillow)
+IMAGE_MAX_RESOLUTION = int(os.getenv('JUSTFRAMEIT_IMAGE_MAX_RESOLUTION', '1920'))
+
+# JPEG quality used when a downscaled image is re-encoded
+IMAGE_JPEG_QUALITY = int(os.getenv('JUSTFRAMEIT_IMAGE_JPEG_QUALITY', '90'))
+
+# Bytes read from the response at a time
+CHUNK_SIZE = 64 * 1024
+
+_fetcher = None
+_fetcher_lock = threading.Lock()
+
+
+class ImageTooLarge(Exception):
+    """Raised when an image exceeds IMAGE_MAX_BYTES."""
+
+
+class ImageFetcher:
+    """
+    Downloads product photos in the background over a pooled HTTP session.
+
+    Downloads are started with start() as soon as the photo URLs are known and
+    run on a small thread pool, so they overlap with the Odoo work of the order.
+    Each response is read in chunks up to max_bytes (larger images are dropped
+    without reading the rest), optionally downscaled to max_resolution (when
+    Pillow is installed) and base64-encoded in memory: Odoo takes the image as
+    one base64 string, so it is built once and not copied through files.
+
+    With the image store enabled, photos seen before are served from it: a
+    known URL is requested with its ETag (no body on 304, the new image on 200),
+    and known content skips resizing and encoding.
+
+    Downloads started within a request stop at the request's deadline.
+    """
+
+    def __init__(self, pool_size=IMAGE_POOL_SIZE, workers=IMAGE_WORKERS, max_bytes=IMAGE_MAX_BYTES,
+                 timeout=IMAGE_TIMEOUT, max_resolution=IMAGE_MAX_RESOLUTION, jpeg_quality=IMAGE_JPEG_QUALITY):
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.max_resolution = max_resolution if Image is not None else 0
+        self.jpeg_quality = jpeg_quality
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, pool_block=True)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=max(1, workers),
+                                                              thread_name_prefix='image-fetch')
+        self._lock = threading.Lock()
+        # Counters
+        self._downloads = 0
+        self._not_modified = 0
+        self._failures = 0
+        self._too_large = 0
+        self._bytes = 0
+        self._encoded_bytes = 0
+        self._downscaled = 0
+        self._in_flight = 0
+
+    def start(self, urls):
+        """
+        Start downloading the given URLs in the background.
+
+        Args:
+            urls: Iterable of image URLs (empty values and duplicates are ignored)
+
+        Returns:
+            dict: URL -> Future resolving to fetch()'s (image_base64, sha256) tuple
+        """
+        # Each download runs in a copy of the caller's context, so it sees the request's deadline
+        return {url: self.executor.submit(contextvars.copy_context().run, self.fetch, url)
+                for url in dict.fromkeys(u for u in urls if u)}
+
+    def fetch(self, url):
+        """
+        Download an image (or take it from the image store) and return it base64 encoded.
+
+        Args:
+            url: Image URL
+
+        Returns:
+            tuple: (image_base64, sha256 of the downloaded content), or (None, None) if the
+                   download fails or the image is too large
+        """
+        with self._lock:
+            self._in_flight += 1
+        try:
+            logger.info(f"Downloading image from: {url}")
+            store = get_image_store()
+            etag = store.etag_for(url) if store is not None else None
+            downloaded = None
+            if etag:
+                try:
+                    downloaded = self._revalidate(store, url, etag)
+                except (ImageTooLarge, DeadlineExceeded):
+                    raise
+                except Exception as e:
+                    logger.warning(f"Conditional request for {url} failed, downloading it again: {str(e)}")
+            if downloaded is None:
+                downloaded = self._stream_base64(url, store)
+            image_base64, digest, size = downloaded
+            if size is None:
+                logger.info(f"Image not modified since last download, using the stored copy ({digest[:12]})")
+                return image_base64, digest
+            with self._lock:
+                self._downloads += 1
+                self._bytes += size
+                self._encoded_bytes += len(image_base64)
+            logger.info(f"Successfully downloaded and encoded image ({size} bytes)")
+            return image_base64, digest
+        except ImageTooLarge as e:
+            with self._lock:
+                self._too_large += 1
+            logger.error(f"Failed to download image from {url}: {str(e)}")
+            return None, None
+        except Exception as e:
+            with self._lock:
+                self._failures += 1
+            logger.error(f"Failed to download image from {url}: {str(e)}")
+            return None, None
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def _revalidate(self, store, url, etag):
+        """
+        Conditional request for a URL downloaded before.
+
+        Returns:
+            tuple: (image_base64, sha256, size) as _stream_base64 returns them, with size None
+                   when the server answered 304 and the stored copy is used; None if the stored
+                   copy was evicted meanwhile
+        """
+        timeout = bounded_timeout(self.timeout, 'image download')
+        with self.session.get(url, timeout=timeout, headers={'If-None-Match': etag}, stream=True) as response:
+            if response.status_code != 304:
+                # Changed, or the server ignores ETags: this response is the download
+                return self._read_base64(response, url, store)
+        stored = store.get_by_url(url, etag)
+        if stored is None:
+            return None
+        with self._lock:
+            self._not_modified += 1
+        return stored[0], stored[1], None
+
+    def _stream_base64(self, url, store=None):
+        timeout = bounded_timeout(self.timeout, 'image download')
+        with self.session.get(url, timeout=timeout, stream=True) as response:
+            return self._read_base64(response, url, store)
+
+    def _read_base64(self, response, url, store=None):
+        response.raise_for_status()
+        content_length = response.headers.get('Content-Length')
+        if content_length and content_length.isdigit() and int(content_length) > self.max_bytes:
+            raise ImageTooLarge(f"Image is {content_length} bytes, limit is {self.max_bytes}")
+
+        raw = bytearray()
+        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+            if len(raw) + len(chunk) > self.max_bytes:
+                raise ImageTooLarge(f"Image exceeds the limit of {self.max_bytes} bytes")
+            raw += chunk
+            check_deadline('image download')
+        etag = response.headers.get('ETag')
+
+        digest = hashlib.sha256(raw).hexdigest()
+        # Same content as an earlier photo: reuse its resized and encoded copy
+        image_base64 = store.get(digest) if store is not None else None
+        if image_base64 is None:
+            image_base64 = base64.b64encode(self._downscale(raw) or raw).decode('ascii')
+        if store is not None:
+            try:
+                store.put(digest, image_base64, url, etag)
+            except Exception as e:
+                logger.warning(f"Failed to store image {digest[:12]}: {str(e)}")
+        return image_base64, digest, len(raw)
+
+    def _downscale(self, raw):
+        """Return the image as a JPEG shrunk to max_resolution, or None to keep the original."""
+        if not self.max_resolution:
+            return None
+        try:
+            with Image.open(io.BytesIO(raw)) as image:
+                if max(image.size) <= self.max_resolution:
+                    return None
+                image.thumbnail((self.max_resolution, self.max_resolution))
+                if image.mode not in ('RGB', 'L'):
+                    image = image.convert('RGB')
+                resized = io.BytesIO()
+                image.save(resized, format='JPEG', quality=self.jpeg_quality, optimize=True)
+        except Exception as e:
+            logger.warning(f"Could not downscale image, uploading it as downloaded: {str(e)}")
+            return None
+        with self._lock:
+            self._downscaled += 1
+        return resized.getvalue()
+
+    def stats(self):
+        """Download counters."""
+        with self._lock:
+            return {
+                'downloads': self._downloads,
+                'not_modified': self._not_modified,
+                'failures': self._failures,
+                'too_large': self._too_large,
+                'bytes': self._bytes,
+                'encoded_bytes': self._encoded_bytes,
+                'downscaled': self._downscaled,
+                'max_resolution': self.max_resolution,
+                'in_flight': self._in_flight,
+                'max_bytes': self.max_bytes,
+            }
+
+
+def get_image_fetcher():
+    """Get the process-wide image fetcher"""
+    global _fetcher
+    if _fetcher is not None:
+        return _fetcher
+
+    with _fetcher_lock:
+        if _fetcher is None:
+            _fetcher = ImageFetcher()
+        return _fetcher
+
+
+def _reset_after_fork():
+    # The parent's download threads and pooled sockets do not survive a fork
+    global _fetcher, _fetcher_lock
+    _fetcher_lock = threading.Lock()
+    _fetcher = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
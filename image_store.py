@@ -0,0 +1,216 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+from odoo_client import ODOO_URL, ODOO_DB
+
+logger = logging.getLogger(__name__)
+
+# Local content-addressed store of order photos (SQLite file), shared by all gunicorn workers of the
+# host. It can grow to IMAGE_STORE_MAX_BYTES and only pays off if it outlives restarts, so there is no
+# temporary default: on Azure App Service the path must be under /home (persistent storage), e.g.
+# /home/data/justframeit_images.sqlite3. Without it every photo is downloaded and uploaded as before.
+IMAGE_STORE_PATH = os.getenv('JUSTFRAMEIT_IMAGE_STORE_PATH')
+
+# Maximum total size (bytes of encoded image data) kept; least recently used images are evicted
+IMAGE_STORE_MAX_BYTES = int(os.getenv('JUSTFRAMEIT_IMAGE_STORE_MAX_BYTES', str(512 * 1024 * 1024)))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    sha256 TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    attachment_id INTEGER,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS images_last_used ON images (last_used);
+CREATE TABLE IF NOT EXISTS urls (
+    url TEXT PRIMARY KEY,
+    etag TEXT NOT NULL,
+    sha256 TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+_store = None
+_store_lock = threading.Lock()
+
+
+class ImageStore:
+    """
+    On-disk SQLite store of order photos keyed by the SHA-256 of their content.
+
+    Each entry keeps the encoded image as uploaded and the id of the Odoo
+    attachment created for it, so a photo that comes back in a later order is
+    not uploaded again as a chatter attachment (the attachment is reused; the
+    new template's main image is still written) nor, when its URL and ETag are
+    known, downloaded again (a conditional request answers 304). The store is
+    bound to one Odoo database and bounded to max_bytes of image data.
+    """
+
+    def __init__(self, path=IMAGE_STORE_PATH, max_bytes=IMAGE_STORE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._counter_lock = threading.Lock()
+        # Counters
+        self._url_hits = 0
+        self._content_hits = 0
+        self._content_misses = 0
+        self._attachment_hits = 0
+        self._attachment_misses = 0
+        self._evictions = 0
+        self._initialize()
+
+    def _connection(self):
+        # One connection per thread (and per process: forked children reopen)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _initialize(self):
+        conn = self._connection()
+        conn.executescript(_SCHEMA)
+        database = f"{ODOO_URL}|{ODOO_DB}"
+        row = conn.execute("SELECT value FROM meta WHERE name = 'database'").fetchone()
+        if not row or row[0] != database:
+            # Attachment ids belong to one Odoo database: start from scratch
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('DELETE FROM images')
+            conn.execute('DELETE FROM urls')
+            conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('database', ?)", (database,))
+            conn.execute('COMMIT')
+
+    def _count(self, counter):
+        with self._counter_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def etag_for(self, url):
+        """ETag stored for url, to send as If-None-Match, or None."""
+        row = self._connection().execute(
+            'SELECT urls.etag FROM urls JOIN images ON images.sha256 = urls.sha256 WHERE url = ?', (url,)).fetchone()
+        return row[0] if row else None
+
+    def get_by_url(self, url, etag):
+        """
+        Image stored for url with this ETag (after a 304 response).
+
+        Returns:
+            tuple: (image_base64, sha256), or None if the image was evicted meanwhile
+        """
+        conn = self._connection()
+        row = conn.execute(
+            'SELECT images.data, images.sha256 FROM urls JOIN images ON images.sha256 = urls.sha256 '
+            'WHERE url = ? AND etag = ?', (url, etag)).fetchone()
+        if row is None:
+            return None
+        conn.execute('UPDATE images SET last_used = ? WHERE sha256 = ?', (time.time(), row[1]))
+        self._count('_url_hits')
+        return row[0], row[1]
+
+    def get(self, sha256):
+        """Stored encoded image for this content digest, or None."""
+        conn = self._connection()
+        row = conn.execute('SELECT data FROM images WHERE sha256 = ?', (sha256,)).fetchone()
+        if row is None:
+            self._count('_content_misses')
+            return None
+        conn.execute('UPDATE images SET last_used = ? WHERE sha256 = ?', (time.time(), sha256))
+        self._count('_content_hits')
+        return row[0]
+
+    def put(self, sha256, image_base64, url=None, etag=None):
+        """Store an encoded image (and the URL/ETag it was downloaded from), evicting old images if needed."""
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute(
+                'INSERT INTO images (sha256, data, size, last_used) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (sha256) DO UPDATE SET last_used = excluded.last_used',
+                (sha256, image_base64, len(image_base64), time.time()))
+            if url and etag:
+                conn.execute('INSERT OR REPLACE INTO urls (url, etag, sha256) VALUES (?, ?, ?)', (url, etag, sha256))
+            self._evict(conn)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def _evict(self, conn):
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM images').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for sha256, size in conn.execute('SELECT sha256, size FROM images ORDER BY last_used').fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute('DELETE FROM images WHERE sha256 = ?', (sha256,))
+            conn.execute('DELETE FROM urls WHERE sha256 = ?', (sha256,))
+            total -= size
+            self._count('_evictions')
+
+    def attachment_for(self, sha256):
+        """Odoo attachment id created earlier for this image, or None."""
+        row = self._connection().execute(
+            'SELECT attachment_id FROM images WHERE sha256 = ?', (sha256,)).fetchone()
+        if row and row[0]:
+            self._count('_attachment_hits')
+            return row[0]
+        self._count('_attachment_misses')
+        return None
+
+    def set_attachment(self, sha256, attachment_id):
+        """Remember the Odoo attachment holding this image (None forgets it, e.g. when it was deleted)."""
+        self._connection().execute('UPDATE images SET attachment_id = ? WHERE sha256 = ?', (attachment_id, sha256))
+
+    def stats(self):
+        """Size and hit/miss counters."""
+        entries, size = self._connection().execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM images').fetchone()
+        with self._counter_lock:
+            lookups = self._attachment_hits + self._attachment_misses
+            return {
+                'path': self.path,
+                'entries': entries,
+                'bytes': size,
+                'max_bytes': self.max_bytes,
+                'url_hits': self._url_hits,
+                'content_hits': self._content_hits,
+                'content_misses': self._content_misses,
+                'attachment_hits': self._attachment_hits,
+                'attachment_misses': self._attachment_misses,
+                'hit_ratio': round(self._attachment_hits / lookups, 4) if lookups else 0.0,
+                'evictions': self._evictions,
+            }
+
+
+def get_image_store():
+    """Get the process-wide image store, or None when JUSTFRAMEIT_IMAGE_STORE_PATH is not set"""
+    global _store
+    if _store is not None:
+        return _store
+    if not IMAGE_STORE_PATH:
+        return None
+
+    with _store_lock:
+        if _store is None:
+            _store = ImageStore()
+        return _store
+
+
+def _reset_after_fork():
+    global _store_lock
+    _store_lock = threading.Lock()
+    if _store is not None:
+        _store._counter_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
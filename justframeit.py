@@ -1,16 +1,24 @@
 from flask import Blueprint, jsonify, request
-import xmlrpc.client
 import os
 import json
 import base64
 import re
 import time
+import xmlrpc.client
 from io import StringIO
 from dotenv import load_dotenv
 import logging
 from datetime import datetime
-import requests
 from utils import log_route_call
+from odoo_client import ODOO_DB, ODOO_API_KEY, get_uid, get_odoo_models, get_client_stats
+from rpc_metrics import start_ledger
+from catalog_cache import get_component_catalog, get_service_catalog
+from reference_replica import get_reference_replica
+from image_fetcher import get_image_fetcher
+from image_store import get_image_store
+from worker_pool import get_worker_pool
+from deadline import request_deadline, deadline_allows, get_deadline_stats
+from order_jobs import ASYNC_ORDERS_ENABLED, get_order_queue, register_job_handler, report_job_progress
 import concurrent.futures
 import threading
 
@@ -31,47 +39,11 @@ load_dotenv()
 # Create blueprint
 justframeit_bp = Blueprint('justframeit', __name__)
 
-# Odoo Configuration
-ODOO_URL = os.getenv('JUSTFRAMEIT_ODOO_URL')
-ODOO_DB = os.getenv('JUSTFRAMEIT_ODOO_DB')
-ODOO_USERNAME = os.getenv('JUSTFRAMEIT_ODOO_USERNAME')
-ODOO_API_KEY = os.getenv('JUSTFRAMEIT_ODOO_API_KEY')
-
 # JWT Configuration
 JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'your-secret-key')  # Change in production
 JWT_EXPIRATION_HOURS = 24
 
 
-def get_odoo_common():
-    """Get Odoo common endpoint"""
-    try:
-        common = xmlrpc.client.ServerProxy(f'{ODOO_URL}/xmlrpc/2/common', allow_none=True)
-        return common
-    except Exception as e:
-        logger.error(f"Failed to connect to Odoo common endpoint: {str(e)}")
-        raise
-
-def get_odoo_models():
-    """Get Odoo models endpoint"""
-    try:
-        models = xmlrpc.client.ServerProxy(f'{ODOO_URL}/xmlrpc/2/object', allow_none=True)
-        return models
-    except Exception as e:
-        logger.error(f"Failed to connect to Odoo models endpoint: {str(e)}")
-        raise
-
-def get_uid():
-    """Get Odoo user ID"""
-    try:
-        common = get_odoo_common()
-        uid = common.authenticate(ODOO_DB, ODOO_USERNAME, ODOO_API_KEY, {})
-        if not uid:
-            raise Exception("Authentication failed")
-        return uid
-    except Exception as e:
-        logger.error(f"Failed to authenticate with Odoo: {str(e)}")
-        raise
-
 def generate_product_reference(line_logger=None):
     """
     Generate a unique product reference using the current timestamp in microseconds.
@@ -114,30 +86,6 @@ def generate_product_reference(line_logger=None):
     return reference
 
 
-def download_image_as_base64(image_url):
-    """
-    Download an image from URL and return it as base64 encoded string.
-    
-    Args:
-        image_url: URL of the image to download
-        
-    Returns:
-        str: Base64 encoded image data, or None if download fails
-    """
-    try:
-        logger.info(f"Downloading image from: {image_url}")
-        response = requests.get(image_url, timeout=30)
-        response.raise_for_status()
-        
-        # Convert image content to base64
-        image_base64 = base64.b64encode(response.content).decode('ascii')
-        logger.info(f"Successfully downloaded and encoded image ({len(response.content)} bytes)")
-        return image_base64
-    except Exception as e:
-        logger.error(f"Failed to download image from {image_url}: {str(e)}")
-        return None
-
-
 def get_or_create_customer(models, uid, customer_data):
     """
     Get existing customer by email or create new one if not found.
@@ -200,53 +148,23 @@ def get_or_create_customer(models, uid, customer_data):
     logger.info(f"Created new customer '{customer_data['name']}' with email {customer_data['email']} (ID: {partner_id})")
     return partner_id, 'created'
 
-def get_visible_components_list(models, uid, components, line_logger=None):
+def prefetch_components(models, uid, component_lists):
     """
-    Get list of visible components (where x_studio_is_visible_in_portal_reports is True).
-    Uses batch API call for performance.
-    
+    Resolve the components of every line of a request in one catalog lookup.
+
     Args:
         models: Odoo models proxy
         uid: User ID
-        components: List of component dictionaries with 'name' and 'reference' keys
-        line_logger: Optional logger instance for parallel processing
-        
+        component_lists: Iterable of component lists (dicts with a 'reference' key), one per line
+
     Returns:
-        list: List of formatted strings "[reference] component_name" for visible components
+        dict: product code -> component record, to pass to prepare_product_and_bom
+              as components_by_ref
     """
-    log = line_logger or logger
-    
-    if not components:
-        return []
-    
-    # Collect all references for batch search
-    references = [c['reference'] for c in components if c.get('reference')]
-    
-    if not references:
-        return []
-    
-    try:
-        # Single batch search for all components
-        all_component_info = models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
-            'product.product', 'search_read',
-            [[['x_studio_product_code', 'in', references]]],
-            {'fields': ['name', 'x_studio_product_code', 'x_studio_is_visible_in_portal_reports']})
-        
-        # Filter visible components and build result list
-        visible_components = []
-        for comp_info in all_component_info:
-            if comp_info.get('x_studio_is_visible_in_portal_reports'):
-                comp_ref = comp_info.get('x_studio_product_code', '')
-                comp_name = comp_info.get('name', '')
-                visible_components.append(f"[{comp_ref}] {comp_name}")
-                log.debug(f"Found visible component: [{comp_ref}] {comp_name}")
-        
-        log.info(f"Found {len(visible_components)} visible component(s) from {len(references)} checked")
-        return visible_components
-        
-    except Exception as e:
-        log.warning(f"Failed to batch check visibility for components: {str(e)}")
-        return []
+    references = [c['reference'] for components in component_lists for c in components if c.get('reference')]
+    components_by_ref = get_component_catalog().get_many(models, uid, references)
+    logger.info(f"Prefetched {len(components_by_ref)} component(s) for {len(set(references))} unique reference(s)")
+    return components_by_ref
 
 
 def build_order_line_description_odoo(original_product_name, width, height, visible_components, line_logger=None):
@@ -277,6 +195,32 @@ def build_order_line_description_odoo(original_product_name, width, height, visi
     return description
 
 
+def build_default_line_description(product_vals):
+    """
+    Compute the description Odoo gives a new sale order line for a product, without reading it back.
+
+    Mirrors product.product.get_product_multiline_description_sale: the display name
+    ("[default_code] name") followed by description_sale on the next line, if any.
+
+    Only valid for the products web orders create: new products without variant
+    attribute values (Odoo appends those to the name) whose name and
+    description_sale have no translations (Odoo uses the customer's language).
+    Lines of other products must keep the description Odoo computes.
+    
+    Args:
+        product_vals: Creation values of the product (name, default_code, description_sale)
+        
+    Returns:
+        str: Default order line description
+    """
+    name = product_vals['name']
+    if product_vals.get('default_code'):
+        name = f"[{product_vals['default_code']}] {name}"
+    if product_vals.get('description_sale'):
+        name += "\n" + product_vals['description_sale']
+    return name
+
+
 def build_visible_components_suffix(visible_components):
     """
     Build the visible components suffix to append to existing descriptions.
@@ -405,13 +349,41 @@ def build_additional_description(line_item_options, site_name, product_title=Non
         return ""
 
 
+def _create_line_logger(order_line_id):
+    """
+    Create a logger that captures an order line's log messages in its own buffer.
+
+    Returns:
+        tuple: (line_logger, line_handler, line_log_buffer)
+    """
+    # Create a thread-local StringIO for capturing logs
+    line_log_buffer = StringIO()
+    line_handler = logging.StreamHandler(line_log_buffer)
+    line_handler.setLevel(logging.DEBUG)
+    line_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    
+    # Create a thread-specific logger
+    line_logger = logging.getLogger(f'justframeit.line.{order_line_id}')
+    line_logger.handlers = []  # Clear any existing handlers
+    line_logger.addHandler(line_handler)
+    line_logger.setLevel(logging.DEBUG)
+    line_logger.propagate = False  # Don't propagate to parent (main logger)
+    return line_logger, line_handler, line_log_buffer
+
+
 def process_order_line_parallel(
     uid, line_index, total_lines, order_line_id,
-    order_lines_by_id, products_by_id, bom_by_product, bom_by_template, sale_order_id
+    order_lines_by_id, products_by_id, bom_by_product, bom_by_template, sale_order_id,
+    bom_lines_by_id, component_products_by_id, components_by_ref
 ):
     """
-    Process a single order line in parallel. Each line gets its own log buffer
-    and its own Odoo connection (xmlrpc is not thread-safe).
+    Prepare a single order line in parallel. Each line gets its own log buffer
+    and uses the shared thread-safe Odoo client (connections are pooled).
+
+    Lines that need a new product come back with status 'prepared' and the
+    product creation values; the products of all lines are then created in one
+    batch, all lines are updated with one sale.order write and each result is
+    finished by complete_order_line.
     
     Args:
         uid: User ID
@@ -423,27 +395,18 @@ def process_order_line_parallel(
         bom_by_product: Pre-fetched variant BOM data dictionary
         bom_by_template: Pre-fetched template BOM data dictionary
         sale_order_id: ID of the sale order
+        bom_lines_by_id: Pre-fetched BOM line data dictionary (all BOMs of the order)
+        component_products_by_id: Pre-fetched component product data dictionary
+        components_by_ref: Pre-fetched component catalog lookup (product code -> record)
         
     Returns:
         tuple: (result_dict, log_string) where result_dict contains processing results
                and log_string contains all log messages for this order line
     """
-    # Create a thread-local StringIO for capturing logs
-    line_log_buffer = StringIO()
-    line_handler = logging.StreamHandler(line_log_buffer)
-    line_handler.setLevel(logging.DEBUG)
-    line_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
-    
-    # Create a thread-specific logger
-    line_logger = logging.getLogger(f'justframeit.line.{order_line_id}')
-    line_logger.handlers = []  # Clear any existing handlers
-    line_logger.addHandler(line_handler)
-    line_logger.setLevel(logging.DEBUG)
-    line_logger.propagate = False  # Don't propagate to parent (main logger)
+    line_logger, line_handler, line_log_buffer = _create_line_logger(order_line_id)
     
     try:
-        # CRITICAL: Create a thread-local Odoo connection
-        # xmlrpc.client.ServerProxy is NOT thread-safe, so each thread needs its own connection
+        # The shared client checks out a pooled connection per call, so it is safe to use from threads
         models = get_odoo_models()
         line_logger.info(f"--- Processing order line {line_index + 1}/{total_lines} (ID: {order_line_id}) ---")
         
@@ -552,27 +515,22 @@ def process_order_line_parallel(
         
         bom_info = [bom_data]
         
-        # Fetch BOM lines and component products
-        line_logger.info("Copying components from existing BOM (batch fetch)")
+        # BOM lines and component products come from the request-level prefetch
+        line_logger.info("Copying components from existing BOM (from batch data)")
         bom_line_ids = bom_info[0]['bom_line_ids']
-        
-        all_bom_lines = models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
-            'mrp.bom.line', 'read',
-            [bom_line_ids],
-            {'fields': ['product_id', 'product_qty']})
-        
-        component_product_ids = [line['product_id'][0] for line in all_bom_lines]
-        all_component_products = models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
-            'product.product', 'read',
-            [component_product_ids],
-            {'fields': ['name', 'x_studio_product_code', 'x_studio_is_visible_in_portal_reports']})
-        
-        component_products_by_id = {prod['id']: prod for prod in all_component_products}
+        # Lines the prefetch did not return (deleted or not readable) are skipped, as a per-line read would
+        missing_bom_line_ids = [bom_line_id for bom_line_id in bom_line_ids if bom_line_id not in bom_lines_by_id]
+        if missing_bom_line_ids:
+            line_logger.warning(f"Skipping {len(missing_bom_line_ids)} BOM line(s) that could not be read: {missing_bom_line_ids}")
+        all_bom_lines = [bom_lines_by_id[bom_line_id] for bom_line_id in bom_line_ids if bom_line_id in bom_lines_by_id]
         
         components = []
         visible_components = []  # Build visible components list directly during component fetch
         for bom_line in all_bom_lines:
-            component_info = component_products_by_id[bom_line['product_id'][0]]
+            component_info = component_products_by_id.get(bom_line['product_id'][0])
+            if component_info is None:
+                line_logger.warning(f"Skipping BOM line {bom_line['id']}: component product {bom_line['product_id'][0]} could not be read")
+                continue
             component_data = {
                 'name': component_info['name'],
                 'reference': component_info['x_studio_product_code']
@@ -602,61 +560,34 @@ def process_order_line_parallel(
         line_logger.info(f"New product name: {product_name}")
         line_logger.info(f"New product reference: {product_reference}")
         
-        # Create product and BOM
-        line_logger.info("Creating new product and BOM")
-        new_product_id, bom_id, bom_components_count, bom_operations_count, skipped_components = create_product_and_bom(
+        # Build product and BOM values (the products of all lines are created in one batch)
+        line_logger.info("Preparing new product and BOM")
+        product_vals, bom_components_count, bom_operations_count, skipped_components, _ = prepare_product_and_bom(
             models, uid,
             product_name, product_reference,
             width, height, price, components,
             original_template_name=original_product_name,
             existing_description_sale=product_description_sale,
-            line_logger=line_logger
+            line_logger=line_logger,
+            components_by_ref=components_by_ref
         )
         
         if skipped_components:
             line_logger.warning(f"Order line {line_index + 1}: {len(skipped_components)} component(s) were skipped")
         
-        # Get the product template ID from the created product
-        product_data = models.execute_kw(
-            ODOO_DB, uid, ODOO_API_KEY,
-            'product.product', 'read', [new_product_id], {'fields': ['product_tmpl_id']}
-        )
-        new_product_tmpl_id = product_data[0]['product_tmpl_id'][0]
-        line_logger.info(f"New product template ID: {new_product_tmpl_id} (BOM cost will be computed at end)")
-        
         # Build order line description using pre-computed visible components
         line_logger.info("Building order line description with original product name")
         new_order_line_description = build_order_line_description_odoo(
             original_product_name, width, height, visible_components, line_logger
         )
         
-        # Update existing sale order line with new product
-        if product_updatable:
-            line_logger.info(f"Updating order line {order_line_id} with new product")
-            models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
-                'sale.order', 'write',
-                [sale_order_id, {
-                    'order_line': [(1, order_line_id, {
-                        'product_id': new_product_id,
-                        'product_uom_qty': quantity,
-                        'price_unit': price,
-                        'name': new_order_line_description
-                    })]
-                }])
-            line_logger.info(f"Order line {order_line_id} updated successfully with quantity: {quantity}")
-        else:
-            line_logger.info(f"Skipping order line {order_line_id} update because product is not updatable (variant)")
-        
-        # Build result
+        # Build result (completed by complete_order_line once the product exists)
         result = {
             'order_line_id': order_line_id,
             'original_product': original_product_name,
             'original_product_code': original_product_code,
-            'new_product_id': new_product_id,
-            'new_product_tmpl_id': new_product_tmpl_id,
             'new_product_name': product_name,
             'new_product_reference': product_reference,
-            'bom_id': bom_id,
             'width': width,
             'height': height,
             'price': price,
@@ -667,10 +598,12 @@ def process_order_line_parallel(
             'bom_operations_count': bom_operations_count,
             'initial_cost': 0,
             'new_cost': 0,
-            'status': 'success'
+            'status': 'prepared',
+            'product_vals': product_vals,
+            'order_line_description': new_order_line_description,
         }
         
-        line_logger.info(f"--- Completed processing order line {line_index + 1}/{total_lines} ---")
+        line_logger.info(f"--- Prepared order line {line_index + 1}/{total_lines} ---")
         return (result, line_log_buffer.getvalue())
         
     except Exception as e:
@@ -694,9 +627,357 @@ def process_order_line_parallel(
             pass
 
 
-def create_product_and_bom(models, uid, product_name, product_reference, width, height, price, components, product_template_attribute_value_ids=None, original_template_name=None, existing_description_sale=None, line_logger=None):
+def build_order_line_update(result, created):
+    """
+    Build the sale.order write command that links a prepared order line to its new product.
+
+    Args:
+        result: Result dict returned by process_order_line_parallel (status 'prepared')
+        created: This line's entry from create_products_and_boms (must not contain 'error')
+
+    Returns:
+        tuple: (1, order_line_id, vals) command for the sale order's order_line field
+    """
+    return (1, result['order_line_id'], {
+        'product_id': created['product_id'],
+        'product_uom_qty': result['quantity'],
+        'price_unit': result['price'],
+        'name': result['order_line_description']
+    })
+
+
+def apply_order_line_updates(models, uid, sale_order_id, update_commands):
+    """
+    Apply the order line updates of all lines with a single sale.order write.
+
+    One write means one round-trip and one lock on the sale order. If it fails, the
+    commands are applied one by one so only the failing lines are reported.
+
+    Args:
+        models: Odoo models proxy
+        uid: User ID
+        sale_order_id: ID of the sale order
+        update_commands: List of (1, order_line_id, vals) commands
+
+    Returns:
+        dict: order_line_id -> error message, for the lines that could not be updated
+    """
+    if not update_commands:
+        return {}
+    logger.info(f"Updating {len(update_commands)} order line(s) of sale order {sale_order_id} in one write")
+    try:
+        models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
+            'sale.order', 'write', [sale_order_id, {'order_line': update_commands}])
+        return {}
+    except Exception as e:
+        logger.warning(f"Batch order line update failed ({str(e)}), updating order lines one by one")
+
+    errors = {}
+    for command in update_commands:
+        try:
+            models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
+                'sale.order', 'write', [sale_order_id, {'order_line': [command]}])
+        except Exception as e:
+            logger.error(f"Failed to update order line {command[1]}: {str(e)}")
+            errors[command[1]] = str(e)
+    return errors
+
+
+def complete_order_line(line_index, total_lines, result, created, update_error=None):
+    """
+    Finish the result of a prepared order line once its product is created and linked.
+
+    Args:
+        line_index: Index of the order line (0-based)
+        total_lines: Total number of order lines
+        result: Result dict returned by process_order_line_parallel (status 'prepared')
+        created: This line's entry from create_products_and_boms
+        update_error: Error message if the order line update failed
+
+    Returns:
+        tuple: (result_dict, log_string) like process_order_line_parallel
+    """
+    result = {key: value for key, value in result.items() if key not in ('product_vals', 'order_line_description')}
+    error = f"Product creation failed: {created['error']}" if 'error' in created else update_error
+    if error:
+        result.update({'status': 'error', 'reason': error})
+        return (result, f"Error processing order line {result['order_line_id']}: {error}\n")
+
+    result.update({
+        'new_product_id': created['product_id'],
+        'new_product_tmpl_id': created['product_tmpl_id'],
+        'bom_id': created['bom_id'],
+        'status': 'success',
+    })
+    logs = (f"New product ID: {created['product_id']}, template ID: {created['product_tmpl_id']} (BOM cost will be computed at end)\n"
+            f"Order line {result['order_line_id']} updated successfully with quantity: {result['quantity']}\n"
+            f"--- Completed processing order line {line_index + 1}/{total_lines} ---\n")
+    return (result, logs)
+
+
+def process_web_order_line_parallel(
+    uid, product_index, total_products, product_data, product_spec, created_product,
+    is_craft_payload, site_name, image_downloads=None
+):
+    """
+    Process a single web order line item in parallel once its product exists:
+    download and attach the photo, and build the sale order line values. Each
+    line item gets its own log buffer, like process_order_line_parallel.
+
+    Args:
+        uid: User ID
+        product_index: Index of the product in the payload (0-based)
+        total_products: Total number of products
+        product_data: Product dictionary from the (interpreted) payload
+        product_spec: Tuple (product_name, product_reference, product_vals, bom_components_count,
+                      bom_operations_count, skipped_components, visible_components)
+        created_product: This product's entry from create_products_and_boms
+        is_craft_payload: Whether the order came from Craft CMS (adds the additional description)
+        site_name: Craft site name (used in the additional description)
+        image_downloads: Optional dict photo URL -> Future of the base64 image, started by
+                         the image fetcher when the payload was read; missing URLs are downloaded here
+
+    Returns:
+        tuple: (order_line_vals, created_product_info, log_string)
+    """
+    line_logger, line_handler, line_log_buffer = _create_line_logger(f"web.{created_product['product_id']}")
+
+    try:
+        models = get_odoo_models()
+        line_logger.info(f"--- Processing product {product_index + 1}/{total_products} ---")
+        product_name, product_reference, product_vals, bom_components_count, bom_operations_count, skipped_components, visible_components = product_spec
+        product_id = created_product['product_id']
+        product_tmpl_id = created_product['product_tmpl_id']
+        bom_id = created_product['bom_id']
+        
+        # Attach image to product if photo URL is available
+        photo_url = product_data.get('photo_url')
+        image_base64 = None
+        image_attachment_id = None
+        if photo_url:
+            image_download = (image_downloads or {}).get(photo_url)
+            if image_download is not None:
+                line_logger.info(f"Waiting for background image download for product {product_id}")
+                image_base64, image_digest = image_download.result()
+            else:
+                line_logger.info(f"Downloading image for product {product_id}")
+                image_base64, image_digest = get_image_fetcher().fetch(photo_url)
+            if image_base64:
+                # The main image is written on every order: each line gets a new template, and Odoo
+                # cannot fill image_1920 from an existing attachment over RPC (its filestore does
+                # dedupe the bytes by checksum). product.product shows the template image. The
+                # chatters of the product, template and sale order share one attachment, which the
+                # image store lets later orders with the same photo reuse instead of uploading
+                try:
+                    models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
+                        'product.template', 'write',
+                        [[product_tmpl_id], {'image_1920': image_base64}])
+                    line_logger.info(f"Successfully set main image for product.template {product_tmpl_id}")
+                except Exception as e:
+                    line_logger.error(f"Failed to set main image for product.template {product_tmpl_id}: {str(e)}")
+                
+                # Extract filename from URL or generate one
+                image_filename = photo_url.split('/')[-1] if '/' in photo_url else f"product_image_{product_index + 1}.jpg"
+                
+                # One attachment (reused from an earlier order with the same photo, or created now)
+                # posted to the template and variant chatters (skipped when the request is about to run out of time)
+                if deadline_allows('product image chatter post'):
+                    image_attachment_id = attach_product_image(models, uid, image_filename, image_base64, image_digest,
+                        product_tmpl_id, product_id, line_logger)
+        
+        # Get quantity (default to 1 if not specified)
+        qty = product_data.get('qty', 1)
+        
+        # Get discount percentage (default to 0 if not specified)
+        discount = product_data.get('discount', 0)
+        
+        # Visible components (for later appending to description) were collected by prepare_product_and_bom
+        line_logger.info(f"{len(visible_components)} visible component(s) for order line description")
+        
+        # Add order line with correct quantity and discount. The name is Odoo's default line
+        # description (computed locally) with the visible components appended
+        order_line_vals = {
+            'product_id': product_id,
+            'product_uom_qty': qty,
+            'price_unit': product_data['price'],
+            'name': build_default_line_description(product_vals) + build_visible_components_suffix(visible_components),
+        }
+        
+        # Only add discount if it's greater than 0
+        if discount > 0:
+            order_line_vals['discount'] = discount
+            line_logger.info(f"Applying {discount}% discount to order line")
+        
+        # Build additional description for web orders (Craft CMS only)
+        additional_description = ''
+        if is_craft_payload and product_data.get('line_item_options'):
+            product_title = product_data.get('product_title', '')
+            additional_description = build_additional_description(
+                product_data['line_item_options'],
+                site_name,
+                product_title
+            )
+            order_line_vals['x_studio_additional_description'] = additional_description
+            line_logger.info("Setting additional description for order line")
+        
+        # Track created product info for logging
+        created_product_info = {
+            'product_id': product_id,
+            'product_name': product_name,
+            'product_reference': product_reference,
+            'bom_id': bom_id,
+            'bom_components_count': bom_components_count,
+            'bom_operations_count': bom_operations_count,
+            'skipped_components': skipped_components,
+            'width': product_data['width'],
+            'height': product_data['height'],
+            'price': product_data['price'],
+            'qty': qty,
+            'discount': discount,
+            'components': product_data['components'],
+            'visible_components': visible_components,
+            'photo_url': photo_url,
+            'image_attachment_id': image_attachment_id,
+            'additional_description': additional_description
+        }
+        
+        line_logger.info(f"Product {product_index + 1} created: ID={product_id}, BOM ID={bom_id}, Qty={qty}, Discount={discount}%")
+
+        return (order_line_vals, created_product_info, line_log_buffer.getvalue())
+    finally:
+        try:
+            line_logger.removeHandler(line_handler)
+            line_log_buffer.close()
+        except:
+            pass
+
+
+def create_image_attachment(models, uid, image_filename, image_base64, product_tmpl_id, line_logger=None):
+    """
+    Upload a product photo as an ir.attachment on the product template.
+
+    Args:
+        models: Odoo models proxy
+        uid: User ID
+        image_filename: Attachment name
+        image_base64: Base64 encoded image data
+        product_tmpl_id: Product template the attachment belongs to
+        line_logger: Optional logger instance for parallel processing
+
+    Returns:
+        int: Attachment ID, or None if the upload failed
+    """
+    log = line_logger or logger
+    try:
+        image_attachment_vals = {
+            'name': image_filename,
+            'type': 'binary',
+            'datas': image_base64,
+            'res_model': 'product.template',
+            'res_id': product_tmpl_id,
+            'mimetype': 'image/jpeg'
+        }
+        
+        image_attachment_id = models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
+            'ir.attachment', 'create', [image_attachment_vals])
+        log.info(f"Created image attachment for product.template {product_tmpl_id}: {image_filename} (ID: {image_attachment_id})")
+        return image_attachment_id
+    except Exception as e:
+        log.error(f"Failed to create image attachment for product.template {product_tmpl_id}: {str(e)}")
+        return None
+
+
+def attach_product_image(models, uid, image_filename, image_base64, image_digest, product_tmpl_id, product_id, line_logger=None):
+    """
+    Attach a product photo to the template and variant chatters, uploading it at most once.
+
+    If the image store knows an attachment for this photo (same content in an earlier
+    order) it is reused; if Odoo rejects posting it (a fault: the attachment was deleted
+    or is not accessible) the store forgets it and the photo is uploaded again. Other
+    errors (e.g. a timeout) do not trigger an upload: the post may have gone through.
+
+    Args:
+        models: Odoo models proxy
+        uid: User ID
+        image_filename: Attachment name
+        image_base64: Base64 encoded image data
+        image_digest: SHA-256 of the downloaded image (None if unknown)
+        product_tmpl_id: Product template ID
+        product_id: Product variant ID
+        line_logger: Optional logger instance for parallel processing
+
+    Returns:
+        int: Attachment ID (to post to the sale order too), or None if the upload failed
+    """
+    log = line_logger or logger
+    image_store = get_image_store() if image_digest else None
+    chatters = [('product.template', product_tmpl_id), ('product.product', product_id)]
+
+    image_attachment_id = image_store.attachment_for(image_digest) if image_store is not None else None
+    if image_attachment_id:
+        log.info(f"Reusing image attachment {image_attachment_id} of an earlier order")
+        try:
+            post_image_to_chatters(models, uid, image_attachment_id, chatters, log)
+            return image_attachment_id
+        except xmlrpc.client.Fault as e:
+            log.warning(f"Stored image attachment {image_attachment_id} cannot be used, uploading again: {str(e)}")
+            image_store.set_attachment(image_digest, None)
+        except Exception as e:
+            log.error(f"Failed to post image attachment {image_attachment_id} to {chatters[0][0]} {chatters[0][1]} chatter: {str(e)}")
+            return image_attachment_id
+
+    image_attachment_id = create_image_attachment(models, uid, image_filename, image_base64, product_tmpl_id, log)
+    if not image_attachment_id:
+        return None
+    if image_store is not None:
+        image_store.set_attachment(image_digest, image_attachment_id)
+    try:
+        post_image_to_chatters(models, uid, image_attachment_id, chatters, log)
+    except Exception as e:
+        log.error(f"Failed to post image to {chatters[0][0]} {chatters[0][1]} chatter: {str(e)}")
+    return image_attachment_id
+
+
+def post_image_to_chatters(models, uid, image_attachment_id, records, line_logger=None):
+    """
+    Post an existing image attachment to the chatter of each record.
+
+    Args:
+        models: Odoo models proxy
+        uid: User ID
+        image_attachment_id: ir.attachment ID
+        records: List of (model, record_id) tuples
+
+    Raises:
+        Exception: If the first post fails (e.g. the attachment no longer exists); later
+                   failures are logged only
+    """
+    log = line_logger or logger
+    for index, (chatter_model, chatter_id) in enumerate(records):
+        try:
+            models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
+                chatter_model, 'message_post',
+                [chatter_id],
+                {
+                    'body': f'<p>📷 Product image attached from order</p>',
+                    'body_is_html': True,
+                    'message_type': 'comment',
+                    'subtype_xmlid': 'mail.mt_note',
+                    'attachment_ids': [image_attachment_id],
+                })
+            log.info(f"Posted image to {chatter_model} {chatter_id} chatter")
+        except Exception as e:
+            if index == 0:
+                raise
+            log.error(f"Failed to post image to {chatter_model} {chatter_id} chatter: {str(e)}")
+
+
+def prepare_product_and_bom(models, uid, product_name, product_reference, width, height, price, components, product_template_attribute_value_ids=None, original_template_name=None, existing_description_sale=None, line_logger=None, components_by_ref=None):
     """
-    Shared function to create product and BOM with components and operations.
+    Shared function to build the creation values of a product and its BOM with components and operations.
+
+    The product values carry the routes and the BOM (as bom_ids on the template), so
+    create_products_and_boms can create any number of products with a single create call.
 
     Args:
         models: Odoo models proxy
@@ -714,53 +995,27 @@ def create_product_and_bom(models, uid, product_name, product_reference, width,
         existing_description_sale: Existing description_sale value to preserve (optional).
                                    If provided and not empty, this value is used instead of generating a new one.
         line_logger: Optional logger instance for parallel processing
+        components_by_ref: Optional component lookup (product code -> record) prefetched for the
+                           whole request (see prefetch_components); if None, components are looked
+                           up in the component catalog
 
     Returns:
-        tuple: (product_id, bom_id, bom_components_count, bom_operations_count, skipped_components)
+        tuple: (product_vals, bom_components_count, bom_operations_count, skipped_components, visible_components)
+               product_vals is the product.product create dict to pass to create_products_and_boms
                skipped_components is a list of dicts with 'name', 'reference', 'reason' for components not found
+               visible_components is a list of "[reference] name" strings for the components with
+               x_studio_is_visible_in_portal_reports set (used in order line descriptions)
     """
     # Use provided logger or fall back to global logger
     log = line_logger or logger
     
-    log.info("Starting product and BOM creation process")
+    log.info("Preparing product and BOM")
     log.info(f"Product: {product_name} (ref: {product_reference})")
     log.info(f"Dimensions: {width}cm x {height}cm, Price: €{price}")
     log.info(f"Components: {len(components)} items")
     if original_template_name:
         log.info(f"Original template name: {original_template_name}")
 
-    # Create product (dimensions already in cm for Odoo storage)
-    log.info("Creating product in Odoo")
-    product_vals = {
-        'name': product_name,
-        'type': 'consu',
-        'x_studio_width': width,  # cm
-        'x_studio_height': height,  # cm
-        'list_price': price,
-        'default_code': product_reference,
-        'categ_id': 8,  # Set category ID to 8
-    }
-    
-    # Store original template name in description_sale field for future reference
-    # Preserve existing description_sale if it's already set (never replace a non-null value)
-    # Use explicit check for non-empty string to handle Odoo's False returns for empty fields
-    if existing_description_sale and isinstance(existing_description_sale, str) and existing_description_sale.strip():
-        product_vals['description_sale'] = existing_description_sale
-        log.info(f"Preserving existing description_sale: {existing_description_sale}")
-    elif original_template_name:
-        product_vals['description_sale'] = f"Original: {original_template_name}"
-        log.info(f"Setting new description_sale: Original: {original_template_name}")
-
-    # Add variant attributes if provided (for variant products)
-    if product_template_attribute_value_ids:
-        product_vals['product_template_attribute_value_ids'] = [(6, 0, product_template_attribute_value_ids)]
-        log.info(f"Including {len(product_template_attribute_value_ids)} variant attribute(s) in new product")
-
-    log.debug(f"Product creation values: {product_vals}")
-    product_id = models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
-        'product.product', 'create', [product_vals])
-    log.info(f"Product created with ID: {product_id}")
-
     # Create components and BOM
     log.info("Setting up BOM creation")
     bom_components = []
@@ -778,25 +1033,22 @@ def create_product_and_bom(models, uid, product_name, product_reference, width,
 
     log.info("Processing components for BOM")
     skipped_components = []  # Track skipped components for logging
+    visible_components = []  # "[reference] name" of components shown in portal reports / descriptions
     
     # BATCH OPTIMIZATION: Fetch all components, services, and duration rules upfront
     # instead of making 2-4 API calls per component
     
-    # Step 1: Collect all references and batch search_read all components
+    # Step 1: Collect all references and look them up in the request prefetch, or in the
+    # component catalog cache (only codes that are not cached yet are fetched, in one batch)
     references = [c['reference'] for c in components if c.get('reference')]
-    log.info(f"Batch fetching {len(references)} components by reference")
-    
-    all_component_data = models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
-        'product.product', 'search_read',
-        [[['x_studio_product_code', 'in', references]]],
-        {'fields': ['id', 'x_studio_product_code', 'x_studio_price_computation', 
-                    'x_studio_associated_service', 'x_studio_associated_service_duration_rule']})
+    log.info(f"Looking up {len(references)} components by reference")
     
-    # Create lookup by reference
-    components_by_ref = {c['x_studio_product_code']: c for c in all_component_data}
+    if components_by_ref is None:
+        components_by_ref = get_component_catalog().get_many(models, uid, references)
+    all_component_data = [components_by_ref[ref] for ref in dict.fromkeys(references) if ref in components_by_ref]
     log.info(f"Found {len(all_component_data)} components in Odoo")
     
-    # Step 2: Collect all unique service IDs and duration rule IDs for batch fetch
+    # Step 2: Collect all unique service IDs and duration rule IDs
     service_ids = set()
     duration_rule_ids = set()
     for comp_data in all_component_data:
@@ -805,25 +1057,13 @@ def create_product_and_bom(models, uid, product_name, product_reference, width,
         if comp_data.get('x_studio_associated_service_duration_rule'):
             duration_rule_ids.update(comp_data['x_studio_associated_service_duration_rule'])
     
-    # Step 3: Batch fetch all services
-    services_by_id = {}
-    if service_ids:
-        log.info(f"Batch fetching {len(service_ids)} services")
-        all_services = models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
-            'x_services', 'read',
-            [list(service_ids)],
-            {'fields': ['x_name', 'x_studio_associated_work_center']})
-        services_by_id = {s['id']: s for s in all_services}
-    
-    # Step 4: Batch fetch all duration rules
-    duration_rules_by_id = {}
-    if duration_rule_ids:
-        log.info(f"Batch fetching {len(duration_rule_ids)} duration rules")
-        all_duration_rules = models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
-            'x_services_duration_rules', 'read',
-            [list(duration_rule_ids)],
-            {'fields': ['x_studio_quantity', 'x_duurtijd_totaal']})
-        duration_rules_by_id = {r['id']: r for r in all_duration_rules}
+    # Step 3: Services and duration rules come from the process-level service catalog
+    # (loaded once per TTL, reloaded if one of these ids is unknown)
+    service_catalog = get_service_catalog()
+    service_tables = None
+    if service_ids or duration_rule_ids:
+        service_tables = service_catalog.tables(models, uid, service_ids, duration_rule_ids)
+        log.info(f"Using cached service tables for {len(service_ids)} services and {len(duration_rule_ids)} duration rules")
     
     # Step 5: Process components using batch-fetched data
     for i, component in enumerate(components, 1):
@@ -846,6 +1086,13 @@ def create_product_and_bom(models, uid, product_name, product_reference, width,
         component_id = component_info['id']
         log.info(f"Found component ID: {component_id}")
 
+        # Collect visible components from the same record (no separate lookup needed)
+        if component_info.get('x_studio_is_visible_in_portal_reports'):
+            visible_component = f"[{component_info.get('x_studio_product_code', '')}] {component_info.get('name', '')}"
+            if visible_component not in visible_components:
+                visible_components.append(visible_component)
+                log.debug(f"Found visible component: {visible_component}")
+
         # Check if component has an existing quantity (from original BOM) that's not 1
         # If so, use it directly without recalculation
         if 'qty' in component and component['qty'] != 1:
@@ -877,27 +1124,23 @@ def create_product_and_bom(models, uid, product_name, product_reference, width,
             service_id = component_info['x_studio_associated_service'][0]
             log.info(f"Processing associated service ID: {service_id}")
 
-            # Get service details from batch data
-            service_info = services_by_id.get(service_id)
+            # Get service details from the service catalog
+            service_info = service_tables.services_by_id.get(service_id)
             if not service_info:
-                log.warning(f"Service ID {service_id} not found in batch data - skipping operation")
+                log.warning(f"Service ID {service_id} not found in service catalog - skipping operation")
                 continue
                 
             log.debug(f"Service info: {service_info['x_name']}")
 
-            # Get duration rules from batch data
+            # Find appropriate duration based on x_studio_quantity (bisect on the compiled rule set)
+            relevant_value = quantity  # Use the calculated quantity (surface, circumference, or default)
             duration_rule_ids_for_component = component_info.get('x_studio_associated_service_duration_rule', [])
-            duration_rules = [duration_rules_by_id[rid] for rid in duration_rule_ids_for_component if rid in duration_rules_by_id]
+            duration_seconds = service_catalog.duration_for(service_tables, duration_rule_ids_for_component, relevant_value)
 
-            if not duration_rules:
+            if duration_seconds is None:
                 log.warning(f"No duration rules found for component {component['reference']} - skipping operation")
                 continue
 
-            # Find appropriate duration based on x_studio_quantity
-            relevant_value = quantity  # Use the calculated quantity (surface, circumference, or default)
-            rules_sorted = sorted(duration_rules, key=lambda x: x['x_studio_quantity'])
-            matching_rule = next((rule for rule in rules_sorted if rule['x_studio_quantity'] >= relevant_value), rules_sorted[-1])
-            duration_seconds = matching_rule['x_duurtijd_totaal']
             log.debug(f"Duration calculation: Quantity-based ({relevant_value}) → {duration_seconds} seconds")
 
             # Convert duration from seconds to minutes and calculate MM:SS format
@@ -924,45 +1167,113 @@ def create_product_and_bom(models, uid, product_name, product_reference, width,
     else:
         log.info("All components were found and added to BOM")
 
-    # Get the product template ID from the created product
-    log.info("Getting product template ID")
-    product_data = models.execute_kw(
-        ODOO_DB, uid, ODOO_API_KEY,
-        'product.product', 'read', [product_id], {'fields': ['product_tmpl_id']}
-    )
-    product_tmpl_id = product_data[0]['product_tmpl_id'][0]
-    log.debug(f"Product template ID: {product_tmpl_id}")
-
-    # Set route_ids for finished products (MTO and Manufacturing, exclude Buy)
-    log.info("Setting route_ids for finished product (MTO and Manufacturing)")
-    models.execute_kw(
-        ODOO_DB, uid, ODOO_API_KEY,
-        'product.template', 'write',
-        [[product_tmpl_id], {'route_ids': [(6, 0, [1, 4])]}]  # 1=MTO, 4=Manufacture
-    )
-    log.info("Successfully set route_ids to [1, 4] (MTO and Manufacturing)")
+    # Product values (dimensions already in cm for Odoo storage)
+    product_vals = {
+        'name': product_name,
+        'type': 'consu',
+        'x_studio_width': width,  # cm
+        'x_studio_height': height,  # cm
+        'list_price': price,
+        'default_code': product_reference,
+        'categ_id': 8,  # Set category ID to 8
+    }
+    
+    # Store original template name in description_sale field for future reference
+    # Preserve existing description_sale if it's already set (never replace a non-null value)
+    # Use explicit check for non-empty string to handle Odoo's False returns for empty fields
+    if existing_description_sale and isinstance(existing_description_sale, str) and existing_description_sale.strip():
+        product_vals['description_sale'] = existing_description_sale
+        log.info(f"Preserving existing description_sale: {existing_description_sale}")
+    elif original_template_name:
+        product_vals['description_sale'] = f"Original: {original_template_name}"
+        log.info(f"Setting new description_sale: Original: {original_template_name}")
 
-    # Create Bill of Materials using the template ID
-    log.info("Creating Bill of Materials")
+    # Add variant attributes if provided (for variant products)
+    if product_template_attribute_value_ids:
+        product_vals['product_template_attribute_value_ids'] = [(6, 0, product_template_attribute_value_ids)]
+        log.info(f"Including {len(product_template_attribute_value_ids)} variant attribute(s) in new product")
+
+    # Set route_ids for finished products (MTO and Manufacturing, exclude Buy) and the BOM at creation;
+    # both are template fields, written through the product's template
+    product_vals['route_ids'] = [(6, 0, [1, 4])]  # 1=MTO, 4=Manufacture
+
+    log.info("Adding Bill of Materials to product values")
     log.info(f"BOM components: {len(bom_components)}")
     log.info(f"BOM operations: {len(bom_operations)}")
 
     bom_vals = {
-        'product_tmpl_id': product_tmpl_id,
         'product_qty': 1,
         'type': 'normal',
         'bom_line_ids': bom_components,
         'operation_ids': bom_operations,
     }
+    product_vals['bom_ids'] = [(0, 0, bom_vals)]
 
     log.debug(f"BOM creation values: {len(bom_components)} components, {len(bom_operations)} operations")
-    bom_id = models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
-        'mrp.bom', 'create', [bom_vals])
+    log.info("Product and BOM values prepared")
+
+    return product_vals, len(bom_components), len(bom_operations), skipped_components, visible_components
+
+def create_products_and_boms(models, uid, product_vals_list, line_logger=None):
+    """
+    Create products with their routes and BOMs (values from prepare_product_and_bom).
+
+    All products are created with one create call and their template and BOM ids
+    are read back with one read, whatever the number of products. If Odoo rejects
+    the batch (a fault: one invalid product fails it as a whole), each product is
+    created on its own so the failure is reported for that product only. Any other
+    error (transport, overload, deadline) is raised: the batch may have been
+    committed, and creating the products again would duplicate them.
+
+    Args:
+        models: Odoo models proxy
+        uid: User ID
+        product_vals_list: List of product.product create dicts
+        line_logger: Optional logger instance
 
-    log.info(f"BOM created with ID: {bom_id}")
-    log.info("Product and BOM creation completed successfully")
+    Returns:
+        list: One dict per product, in order: {'product_id', 'product_tmpl_id', 'bom_id'}
+              on success, or {'error': message} if that product could not be created
+    """
+    log = line_logger or logger
+    if not product_vals_list:
+        return []
+
+    log.info(f"Creating {len(product_vals_list)} product(s) with routes and BOM in one call")
+    try:
+        product_ids = models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
+            'product.product', 'create', [product_vals_list])
+        created = [{'product_id': product_id} for product_id in product_ids]
+    except xmlrpc.client.Fault as e:
+        # One invalid product fails the whole batch; retry one by one to isolate it
+        log.warning(f"Batch product creation failed ({str(e)}), creating products one by one")
+        created = []
+        for index, product_vals in enumerate(product_vals_list):
+            try:
+                product_id = models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
+                    'product.product', 'create', [product_vals])
+                created.append({'product_id': product_id})
+            except xmlrpc.client.Fault as e:
+                log.error(f"Failed to create product {product_vals.get('default_code')} ({index + 1}/{len(product_vals_list)}): {str(e)}")
+                created.append({'error': str(e)})
+
+    # Template and BOM ids of the created products
+    product_ids = [entry['product_id'] for entry in created if 'product_id' in entry]
+    if product_ids:
+        product_data = models.execute_kw(
+            ODOO_DB, uid, ODOO_API_KEY,
+            'product.product', 'read', [product_ids], {'fields': ['product_tmpl_id', 'bom_ids']}
+        )
+        product_data_by_id = {product['id']: product for product in product_data}
+        for entry in created:
+            if 'product_id' not in entry:
+                continue
+            product = product_data_by_id[entry['product_id']]
+            entry['product_tmpl_id'] = product['product_tmpl_id'][0]
+            entry['bom_id'] = product['bom_ids'][0]
+            log.info(f"Product created with ID: {entry['product_id']} (template {entry['product_tmpl_id']}, BOM {entry['bom_id']})")
 
-    return product_id, bom_id, len(bom_components), len(bom_operations), skipped_components
+    return created
 
 def interpret_craft_payload(craft_payload):
     """
@@ -1169,6 +1480,67 @@ def dummy_route():
     """Dummy route for testing purposes"""
     return jsonify({'message': 'This is a dummy route', 'status': 'success'})
 
+@justframeit_bp.route('/justframeit-api/stats', methods=['GET'])
+def stats_route():
+    """Runtime counters of this worker process (Odoo connection pool, ...)"""
+    stats = get_client_stats()
+    stats['component_catalog'] = get_component_catalog().stats()
+    stats['service_catalog'] = get_service_catalog().stats()
+    replica = get_reference_replica()
+    if replica is not None:
+        stats['reference_replica'] = replica.stats()
+    stats['image_fetcher'] = get_image_fetcher().stats()
+    stats['worker_pool'] = get_worker_pool().stats()
+    stats['deadlines'] = get_deadline_stats()
+    order_queue = get_order_queue()
+    if order_queue is not None:
+        stats['order_jobs'] = order_queue.stats()
+    image_store = get_image_store()
+    if image_store is not None:
+        stats['image_store'] = image_store.stats()
+    return jsonify({'pid': os.getpid(), 'stats': stats, 'status': 'success'})
+
+def is_craft_order_payload(data):
+    """Return True if a web order payload comes from Craft CMS (see interpret_craft_payload)."""
+    return (
+        'number' in data and
+        'reference' in data and
+        'customer' in data and
+        'lineItems' in data and
+        'shippingAddress' in data
+    )
+
+
+def web_order_payload_error(data):
+    """
+    Check a web order payload before it is processed or queued.
+
+    Args:
+        data: Request payload (simple or Craft CMS format)
+
+    Returns:
+        str: Why the payload cannot be processed, or None if it looks valid
+    """
+    if not data:
+        return 'Missing payload data in request'
+    if is_craft_order_payload(data):
+        return None
+    # Support both 'product' (single) and 'products' (list) formats
+    if 'products' not in data and 'product' not in data:
+        return 'Missing product(s) or customer data in request'
+    if 'customer' not in data:
+        return 'Missing customer data in request'
+    return None
+
+
+def wants_async_response():
+    """Return True if the current web order request should be queued and answered with 202 Accepted."""
+    if get_order_queue() is None:
+        # No durable job queue configured (JUSTFRAMEIT_ORDER_JOBS_PATH)
+        return False
+    return ASYNC_ORDERS_ENABLED or 'respond-async' in request.headers.get('Prefer', '').lower()
+
+
 @justframeit_bp.route('/handle-web-order', methods=['POST'])
 def handle_web_order():
     """
@@ -1212,33 +1584,73 @@ def handle_web_order():
     Craft payload: Complex structure like order-21871ab.json will be automatically detected and converted.
 
     Note: 'name' and 'reference' fields are optional and will be auto-generated with timestamps if not provided.
+
+    With JUSTFRAMEIT_ASYNC_ORDERS (or a 'Prefer: respond-async' request header) the
+    payload is only validated and queued: the response is 202 Accepted with a job id,
+    and /jobs/<job_id> reports the progress and the final order_id.
     """
+    data = request.get_json(silent=True)
+    if wants_async_response():
+        return enqueue_web_order(data)
+    response_data, status_code = process_web_order(data)
+    return jsonify(response_data), status_code
+
+
+def enqueue_web_order(data):
+    """Validate a web order and queue it for the background workers (202 Accepted)."""
+    payload_error = web_order_payload_error(data)
+    if payload_error:
+        logger.error(f"Rejected web order: {payload_error}")
+        return jsonify({'error': payload_error}), 400
+
+    # Craft retries its webhook: the same order reference is answered with the same job
+    dedupe_key = str(data['reference']) if is_craft_order_payload(data) else None
+    job, created = get_order_queue().enqueue('web_order', data, dedupe_key)
+    status_url = f"/jobs/{job['id']}"
+    response_data = {
+        'message': 'Web order accepted' if created else 'Web order was already accepted',
+        'job_id': job['id'],
+        'job_status': job['status'],
+        'status_url': status_url,
+        'status': 'accepted'
+    }
+    return jsonify(response_data), 202, {'Location': status_url}
+
+
+@request_deadline('/handle-web-order')
+def process_web_order(data):
+    """
+    Create the customer, the products with their BOMs and the confirmed sale order of a web order.
+
+    Runs for synchronous /handle-web-order requests and for queued web order jobs.
+
+    Args:
+        data: Web order payload (simple or Craft CMS format)
+
+    Returns:
+        tuple: (response_data, status_code)
+    """
+    # Set up log capture (removed on every return: job worker threads run many orders)
+    log_capture_string = StringIO()
+    log_handler = logging.StreamHandler(log_capture_string)
+    log_handler.setLevel(logging.DEBUG)
+    log_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    logger.addHandler(log_handler)
     try:
-        # Set up log capture
-        log_capture_string = StringIO()
-        log_handler = logging.StreamHandler(log_capture_string)
-        log_handler.setLevel(logging.DEBUG)
-        log_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
-        logger.addHandler(log_handler)
+        rpc_ledger = start_ledger('/handle-web-order')
 
         logger.info("Starting web order processing")
 
-        # Get payload from request
-        logger.info("Receiving payload from request")
-        data = request.get_json()
-        if not data:
-            logger.error("No payload data in request")
-            return jsonify({'error': 'Missing payload data in request'}), 400
+        # Validate the payload
+        logger.info("Validating payload")
+        payload_error = web_order_payload_error(data)
+        if payload_error:
+            logger.error(payload_error)
+            return {'error': payload_error}, 400
 
         # Check if this is a Craft CMS payload by looking for specific fields
         logger.info("Detecting payload type")
-        is_craft_payload = (
-            'number' in data and
-            'reference' in data and
-            'customer' in data and
-            'lineItems' in data and
-            'shippingAddress' in data
-        )
+        is_craft_payload = is_craft_order_payload(data)
 
         if is_craft_payload:
             # Convert Craft payload to simple format
@@ -1249,13 +1661,6 @@ def handle_web_order():
         else:
             # Assume it's already in simple format
             logger.info("Detected simple payload format")
-            # Support both 'product' (single) and 'products' (list) formats
-            if 'products' not in data and 'product' not in data:
-                logger.error("Simple payload missing required fields")
-                return jsonify({'error': 'Missing product(s) or customer data in request'}), 400
-            if 'customer' not in data:
-                logger.error("Simple payload missing customer field")
-                return jsonify({'error': 'Missing customer data in request'}), 400
             # Convert single product format to products list for consistency
             if 'product' in data and 'products' not in data:
                 data['products'] = [data['product']]
@@ -1265,6 +1670,11 @@ def handle_web_order():
         payload_type = "Craft CMS" if is_craft_payload else "Simple"
         logger.info(f"Processing {payload_type} payload successfully")
 
+        # Start downloading all photos now so they overlap with the Odoo work below
+        image_downloads = get_image_fetcher().start(p.get('photo_url') for p in payload['products'])
+        if image_downloads:
+            logger.info(f"Started {len(image_downloads)} background image download(s)")
+
         # Generate timestamp for unique naming if needed
         logger.info("Generating timestamp for unique naming")
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
@@ -1278,6 +1688,7 @@ def handle_web_order():
         # Get or create customer
         logger.info("Processing customer information")
         partner_id, customer_action = get_or_create_customer(models, uid, payload['customer'])
+        report_job_progress('customer')
 
         # Process ALL products and create order lines
         products = payload['products']
@@ -1285,9 +1696,14 @@ def handle_web_order():
         
         order_lines = []
         created_products = []  # Track all created products for logging
+
+        # PREFETCH: resolve the components of all products at once instead of per product
+        components_by_ref = prefetch_components(models, uid, [p.get('components', []) for p in products])
         
+        # PREPARE: build the product and BOM values of every product, then create them all at once
+        product_specs = []
         for product_index, product_data in enumerate(products):
-            logger.info(f"--- Processing product {product_index + 1}/{len(products)} ---")
+            logger.info(f"--- Preparing product {product_index + 1}/{len(products)} ---")
             
             # Auto-generate product name and reference using sequence system if not provided
             product_name = product_data.get('name', '').strip() if product_data.get('name') else ''
@@ -1303,174 +1719,64 @@ def handle_web_order():
                 product_reference = product_name
                 logger.info(f"Auto-generated product reference: {product_reference}")
 
-            # Use shared function to create product and BOM
-            logger.info(f"Creating product and BOM for product {product_index + 1}")
-            product_id, bom_id, bom_components_count, bom_operations_count, skipped_components = create_product_and_bom(
+            # Use shared function to build the product and BOM values
+            logger.info(f"Preparing product and BOM for product {product_index + 1}")
+            product_vals, bom_components_count, bom_operations_count, skipped_components, visible_components = prepare_product_and_bom(
                 models, uid,
                 product_name, product_reference,
                 product_data['width'], product_data['height'],
-                product_data['price'], product_data['components']
+                product_data['price'], product_data['components'],
+                components_by_ref=components_by_ref
             )
             
             # Log skipped components if any
             if skipped_components:
                 logger.warning(f"Product {product_index + 1}: {len(skipped_components)} component(s) were skipped")
-            
-            # Attach image to product if photo URL is available
-            photo_url = product_data.get('photo_url')
-            image_base64 = None
-            image_attachment_id = None
-            if photo_url:
-                logger.info(f"Downloading image for product {product_id}")
-                image_base64 = download_image_as_base64(photo_url)
-                if image_base64:
-                    # Get the product template ID
-                    product_data_info = models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
-                        'product.product', 'read', [product_id], {'fields': ['product_tmpl_id']})
-                    product_tmpl_id = product_data_info[0]['product_tmpl_id'][0]
-                    logger.info(f"Product template ID: {product_tmpl_id}")
-                    
-                    # Set as product variant main image (product.product)
-                    try:
-                        models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
-                            'product.product', 'write',
-                            [[product_id], {'image_1920': image_base64}])
-                        logger.info(f"Successfully set main image for product.product {product_id}")
-                    except Exception as e:
-                        logger.error(f"Failed to set main image for product.product {product_id}: {str(e)}")
-                    
-                    # Set as product template main image (product.template)
-                    try:
-                        models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
-                            'product.template', 'write',
-                            [[product_tmpl_id], {'image_1920': image_base64}])
-                        logger.info(f"Successfully set main image for product.template {product_tmpl_id}")
-                    except Exception as e:
-                        logger.error(f"Failed to set main image for product.template {product_tmpl_id}: {str(e)}")
-                    
-                    # Extract filename from URL or generate one
-                    image_filename = photo_url.split('/')[-1] if '/' in photo_url else f"product_image_{product_index + 1}.jpg"
-                    
-                    # Create attachment for product variant (product.product) chatter
-                    try:
-                        product_attachment_vals = {
-                            'name': image_filename,
-                            'type': 'binary',
-                            'datas': image_base64,
-                            'res_model': 'product.product',
-                            'res_id': product_id,
-                            'mimetype': 'image/jpeg'
-                        }
-                        
-                        image_attachment_id = models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
-                            'ir.attachment', 'create', [product_attachment_vals])
-                        logger.info(f"Created image attachment for product.product {product_id}: {image_filename} (ID: {image_attachment_id})")
-                        
-                        # Post message with image to product variant chatter
-                        models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
-                            'product.product', 'message_post',
-                            [product_id],
-                            {
-                                'body': f'<p>📷 Product image attached from order</p>',
-                                'body_is_html': True,
-                                'message_type': 'comment',
-                                'subtype_xmlid': 'mail.mt_note',
-                                'attachment_ids': [image_attachment_id],
-                            })
-                        logger.info(f"Posted image to product.product {product_id} chatter")
-                    except Exception as e:
-                        logger.error(f"Failed to create image attachment for product.product {product_id}: {str(e)}")
-                    
-                    # Create attachment for product template (product.template) chatter
-                    try:
-                        template_attachment_vals = {
-                            'name': image_filename,
-                            'type': 'binary',
-                            'datas': image_base64,
-                            'res_model': 'product.template',
-                            'res_id': product_tmpl_id,
-                            'mimetype': 'image/jpeg'
-                        }
-                        
-                        template_attachment_id = models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
-                            'ir.attachment', 'create', [template_attachment_vals])
-                        logger.info(f"Created image attachment for product.template {product_tmpl_id}: {image_filename} (ID: {template_attachment_id})")
-                        
-                        # Post message with image to product template chatter
-                        models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
-                            'product.template', 'message_post',
-                            [product_tmpl_id],
-                            {
-                                'body': f'<p>📷 Product image attached from order</p>',
-                                'body_is_html': True,
-                                'message_type': 'comment',
-                                'subtype_xmlid': 'mail.mt_note',
-                                'attachment_ids': [template_attachment_id],
-                            })
-                        logger.info(f"Posted image to product.template {product_tmpl_id} chatter")
-                    except Exception as e:
-                        logger.error(f"Failed to create image attachment for product.template {product_tmpl_id}: {str(e)}")
-            
-            # Get quantity (default to 1 if not specified)
-            qty = product_data.get('qty', 1)
-            
-            # Get discount percentage (default to 0 if not specified)
-            discount = product_data.get('discount', 0)
-            
-            # Get visible components for later appending to description
-            logger.info("Getting visible components for order line description")
-            visible_components = get_visible_components_list(models, uid, product_data['components'])
-            
-            # Add order line with correct quantity and discount (no name - let Odoo compute default)
-            order_line_vals = {
-                'product_id': product_id,
-                'product_uom_qty': qty,
-                'price_unit': product_data['price']
-            }
-            
-            # Only add discount if it's greater than 0
-            if discount > 0:
-                order_line_vals['discount'] = discount
-                logger.info(f"Applying {discount}% discount to order line")
-            
+
+            product_specs.append((product_name, product_reference, product_vals, bom_components_count,
+                                  bom_operations_count, skipped_components, visible_components))
+
+        # CREATE: all products with their routes and BOMs (one create + one read)
+        created = create_products_and_boms(models, uid, [spec[2] for spec in product_specs])
+        failed = [f"product {index + 1} ({product_specs[index][1]}): {entry['error']}"
+                  for index, entry in enumerate(created) if 'error' in entry]
+        if failed:
+            for failure in failed:
+                logger.error(f"Failed to create {failure}")
+            raise Exception(f"Failed to create {len(failed)} of {len(created)} product(s): " + '; '.join(failed))
+        report_job_progress('products')
+
+        # PARALLEL PROCESSING: photos and order line values of all line items at once
+        # Logs are captured per line item and output in order after all parallel work completes
+        total_products = len(products)
+        web_line_results = [None] * total_products
+        site_name = payload.get('site_name', '')
+        # Line items run on the process-wide worker pool, scheduled fairly against other requests
+        worker_pool = get_worker_pool()
+        request_group = object()
+        future_to_index = {}
+        for product_index, product_data in enumerate(products):
+            future = worker_pool.submit(
+                request_group,
+                process_web_order_line_parallel,
+                uid, product_index, total_products, product_data,
+                product_specs[product_index], created[product_index],
+                is_craft_payload, site_name, image_downloads
+            )
+            future_to_index[future] = product_index
+
+        for future in concurrent.futures.as_completed(future_to_index):
+            web_line_results[future_to_index[future]] = future.result()
+
+        # Keep the payload order for the sale order lines
+        for product_index, (order_line_vals, created_product_info, logs) in enumerate(web_line_results):
+            for log_line in logs.strip().split('\n'):
+                if log_line:
+                    logger.info(f"[Product {product_index + 1}] {log_line}")
             order_lines.append((0, 0, order_line_vals))
-            
-            # Build additional description for web orders (Craft CMS only)
-            additional_description = ''
-            if is_craft_payload and product_data.get('line_item_options'):
-                site_name = payload.get('site_name', '')
-                product_title = product_data.get('product_title', '')
-                additional_description = build_additional_description(
-                    product_data['line_item_options'],
-                    site_name,
-                    product_title
-                )
-            
-            # Track created product info for logging
-            created_products.append({
-                'product_id': product_id,
-                'product_name': product_name,
-                'product_reference': product_reference,
-                'bom_id': bom_id,
-                'bom_components_count': bom_components_count,
-                'bom_operations_count': bom_operations_count,
-                'skipped_components': skipped_components,
-                'width': product_data['width'],
-                'height': product_data['height'],
-                'price': product_data['price'],
-                'qty': qty,
-                'discount': discount,
-                'components': product_data['components'],
-                'visible_components': visible_components,
-                'photo_url': photo_url,
-                'image_base64': image_base64,
-                'image_attachment_id': image_attachment_id,
-                'additional_description': additional_description
-            })
-            
-            logger.info(f"Product {product_index + 1} created: ID={product_id}, BOM ID={bom_id}, Qty={qty}, Discount={discount}%")
+            created_products.append(created_product_info)
 
-        # Create sale order with all order lines
+        # Create sale order with all order lines (descriptions are final, no follow-up writes)
         logger.info("Creating sale order with all order lines")
         order_vals = {
             'partner_id': partner_id,
@@ -1480,80 +1786,23 @@ def handle_web_order():
         logger.debug(f"Sale order values: partner_id={partner_id}, {len(order_lines)} order line(s)")
         order_id = models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
             'sale.order', 'create', [order_vals])
-
-        # Update order lines to append visible components to descriptions and set additional description
-        logger.info("Updating order lines with visible components and additional description")
-        sale_order_data = models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
-            'sale.order', 'read', [order_id], {'fields': ['order_line']})
-        order_line_ids = sale_order_data[0]['order_line']
-        
-        for line_idx, order_line_id in enumerate(order_line_ids):
-            if line_idx < len(created_products):
-                prod = created_products[line_idx]
-                visible_comps = prod.get('visible_components', [])
-                additional_desc = prod.get('additional_description', '')
-                
-                update_vals = {}
-                
-                if visible_comps:
-                    # Read current description
-                    line_data = models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
-                        'sale.order.line', 'read', [order_line_id], {'fields': ['name']})
-                    current_description = line_data[0].get('name', '')
-                    
-                    # Append visible components suffix
-                    components_suffix = build_visible_components_suffix(visible_comps)
-                    new_description = current_description + components_suffix
-                    update_vals['name'] = new_description
-                
-                # Set additional description for web orders
-                if additional_desc:
-                    update_vals['x_studio_additional_description'] = additional_desc
-                    logger.info(f"Setting additional description for order line {order_line_id}")
-                
-                # Update order line if there are changes
-                if update_vals:
-                    models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
-                        'sale.order.line', 'write', [[order_line_id], update_vals])
-                    logger.info(f"Updated order line {order_line_id} with {len(visible_comps)} visible component(s)" + 
-                               (", additional description set" if additional_desc else ""))
+        report_job_progress('sale order', order_id)
 
         # Confirm the sale order (move from quotation to sale order state)
         logger.info("Confirming sale order")
         models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
             'sale.order', 'action_confirm', [[order_id]])
         logger.info(f"Sale order {order_id} confirmed successfully")
+        report_job_progress('confirmed', order_id)
 
         logger.info("Web order processing completed successfully")
         logger.info(f"Results - Customer ID: {partner_id}, Products: {len(created_products)}, Order ID: {order_id}")
 
-        # Attach product images to sale order chatter
-        sale_order_image_attachment_ids = []
-        for prod_idx, prod in enumerate(created_products):
-            if prod.get('image_base64'):
-                try:
-                    # Extract filename from URL or generate one
-                    image_filename = prod['photo_url'].split('/')[-1] if prod.get('photo_url') and '/' in prod['photo_url'] else f"product_{prod_idx + 1}_image.jpg"
-                    
-                    # Create attachment linked to the sale order
-                    sale_order_image_vals = {
-                        'name': image_filename,
-                        'type': 'binary',
-                        'datas': prod['image_base64'],
-                        'res_model': 'sale.order',
-                        'res_id': order_id,
-                        'mimetype': 'image/jpeg'
-                    }
-                    
-                    sale_order_image_id = models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
-                        'ir.attachment', 'create', [sale_order_image_vals])
-                    sale_order_image_attachment_ids.append(sale_order_image_id)
-                    logger.info(f"Created image attachment for sale order {order_id}: {image_filename} (ID: {sale_order_image_id})")
-                except Exception as e:
-                    logger.error(f"Failed to create image attachment for sale order: {str(e)}")
+        # Attach product images to sale order chatter (the attachments created for the products)
+        sale_order_image_attachment_ids = [prod['image_attachment_id'] for prod in created_products if prod.get('image_attachment_id')]
         
-        # Post images to sale order chatter if any
-        if sale_order_image_attachment_ids:
+        # Post images to sale order chatter if any (skipped when the request is about to run out of time)
+        if sale_order_image_attachment_ids and deadline_allows('image chatter post'):
             try:
                 models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
                     'sale.order', 'message_post',
@@ -1571,50 +1820,53 @@ def handle_web_order():
 
         # Save original payload as attachment
         attachment_ids = []
-        try:
-            payload_json = json.dumps(data, indent=2, ensure_ascii=False)
-            attachment_name = f"order_payload_{timestamp}.json"
-
-            attachment_vals = {
-                'name': attachment_name,
-                'type': 'binary',
-                'datas': base64.b64encode(payload_json.encode('utf-8')).decode('ascii'),  # Base64 encode the UTF-8 bytes
-                'res_model': 'sale.order',
-                'res_id': order_id,
-                'mimetype': 'application/json'
-            }
+        if deadline_allows('payload attachment'):
+            try:
+                payload_json = json.dumps(data, indent=2, ensure_ascii=False)
+                attachment_name = f"order_payload_{timestamp}.json"
+
+                attachment_vals = {
+                    'name': attachment_name,
+                    'type': 'binary',
+                    'datas': base64.b64encode(payload_json.encode('utf-8')).decode('ascii'),  # Base64 encode the UTF-8 bytes
+                    'res_model': 'sale.order',
+                    'res_id': order_id,
+                    'mimetype': 'application/json'
+                }
 
-            attachment_id = models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
-                'ir.attachment', 'create', [attachment_vals])
+                attachment_id = models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
+                    'ir.attachment', 'create', [attachment_vals])
 
-            attachment_ids = [attachment_id]
-            logger.info(f"Successfully created payload attachment: {attachment_name} (ID: {attachment_id})")
-        except Exception as e:
-            logger.error(f"Failed to create payload attachment: {str(e)}")
+                attachment_ids = [attachment_id]
+                logger.info(f"Successfully created payload attachment: {attachment_name} (ID: {attachment_id})")
+            except Exception as e:
+                logger.error(f"Failed to create payload attachment: {str(e)}")
 
         # Save processing logs as text attachment
         try:
-            # Get the captured logs and remove the handler
+            # Append the Odoo call ledger, then get the captured logs and remove the handler
+            logger.info(rpc_ledger.format())
             log_contents = log_capture_string.getvalue()
             logger.removeHandler(log_handler)
             log_capture_string.close()
 
-            log_attachment_name = f"order_processing_logs_{timestamp}.txt"
+            if deadline_allows('log attachment'):
+                log_attachment_name = f"order_processing_logs_{timestamp}.txt"
 
-            log_attachment_vals = {
-                'name': log_attachment_name,
-                'type': 'binary',
-                'datas': base64.b64encode(log_contents.encode('utf-8')).decode('ascii'),  # Base64 encode the UTF-8 bytes
-                'res_model': 'sale.order',
-                'res_id': order_id,
-                'mimetype': 'text/plain'
-            }
+                log_attachment_vals = {
+                    'name': log_attachment_name,
+                    'type': 'binary',
+                    'datas': base64.b64encode(log_contents.encode('utf-8')).decode('ascii'),  # Base64 encode the UTF-8 bytes
+                    'res_model': 'sale.order',
+                    'res_id': order_id,
+                    'mimetype': 'text/plain'
+                }
 
-            log_attachment_id = models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
-                'ir.attachment', 'create', [log_attachment_vals])
+                log_attachment_id = models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
+                    'ir.attachment', 'create', [log_attachment_vals])
 
-            attachment_ids.append(log_attachment_id)
-            logger.info(f"Successfully created log attachment: {log_attachment_name} (ID: {log_attachment_id})")
+                attachment_ids.append(log_attachment_id)
+                logger.info(f"Successfully created log attachment: {log_attachment_name} (ID: {log_attachment_id})")
         except Exception as e:
             logger.error(f"Failed to create log attachment: {str(e)}")
             # Clean up the handler even if attachment creation fails
@@ -1710,20 +1962,21 @@ def handle_web_order():
 </ul>"""
 
         # Post the comprehensive message to the sale order's chatter
-        try:
-            models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
-                'sale.order', 'message_post',
-                [order_id],
-                {
-                    'body': chatter_message,
-                    'body_is_html': True,                # keep HTML rendering
-                    'message_type': 'comment',
-                    'subtype_xmlid': 'mail.mt_note',     # 🔑 internal note
-                    'attachment_ids': attachment_ids,
-                })
-            logger.info(f"Successfully posted comprehensive processing logs to sale order {order_id} chatter")
-        except Exception as e:
-            logger.error(f"Failed to post message to sale order chatter: {str(e)}")
+        if deadline_allows('chatter summary'):
+            try:
+                models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
+                    'sale.order', 'message_post',
+                    [order_id],
+                    {
+                        'body': chatter_message,
+                        'body_is_html': True,                # keep HTML rendering
+                        'message_type': 'comment',
+                        'subtype_xmlid': 'mail.mt_note',     # 🔑 internal note
+                        'attachment_ids': attachment_ids,
+                    })
+                logger.info(f"Successfully posted comprehensive processing logs to sale order {order_id} chatter")
+            except Exception as e:
+                logger.error(f"Failed to post message to sale order chatter: {str(e)}")
 
         # Prepare response data
         response_data = {
@@ -1740,13 +1993,15 @@ def handle_web_order():
         # Log the route call to Odoo logging model
         log_route_call(models, uid, '/handle-web-order', data, log_contents, response_data)
 
-        return jsonify(response_data)
+        return response_data, 200
 
     except Exception as e:
         # Clean up log handler and get logs if available
         log_contents = ""
         try:
             if 'log_handler' in locals() and 'log_capture_string' in locals():
+                if 'rpc_ledger' in locals():
+                    logger.info(rpc_ledger.format())
                 log_contents = log_capture_string.getvalue()
                 logger.removeHandler(log_handler)
                 log_capture_string.close()
@@ -1763,9 +2018,37 @@ def handle_web_order():
         request_data = data if 'data' in locals() else {}
         log_route_call(None, None, '/handle-web-order', request_data, log_contents, error_response)
 
-        return jsonify(error_response), 500
+        return error_response, 500
+    finally:
+        logger.removeHandler(log_handler)
+        log_capture_string.close()
+
+
+# Queued web orders are processed by the same code as synchronous ones
+register_job_handler('web_order', process_web_order)
+
+
+@justframeit_bp.before_app_request
+def start_order_jobs():
+    """Resume queued orders (e.g. after a restart) as soon as this process serves requests"""
+    # Whenever a job queue is configured, even with JUSTFRAMEIT_ASYNC_ORDERS now off
+    order_queue = get_order_queue()
+    if order_queue is not None:
+        order_queue.start()
+
+
+@justframeit_bp.route('/jobs/<job_id>', methods=['GET'])
+def job_status_route(job_id):
+    """Progress and result of an order accepted with 202"""
+    order_queue = get_order_queue()
+    job = order_queue.get(job_id) if order_queue is not None else None
+    if job is None:
+        return jsonify({'error': f'Unknown job {job_id}', 'status': 'error'}), 404
+    return jsonify({'job': job, 'status': 'success'})
+
 
 @justframeit_bp.route('/handle-odoo-order', methods=['POST'])
+@request_deadline('/handle-odoo-order')
 def handle_odoo_order():
     """
     Handle existing Odoo sale order by copying product specs and creating new product with BOM
@@ -1788,6 +2071,7 @@ def handle_odoo_order():
         log_handler.setLevel(logging.DEBUG)
         log_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
         logger.addHandler(log_handler)
+        rpc_ledger = start_ledger('/handle-odoo-order')
 
         logger.info("Starting Odoo order processing")
 
@@ -1884,41 +2168,82 @@ def handle_odoo_order():
         
         logger.info(f"BOM batch fetch complete: {len(bom_by_product)} variant BOMs, {len(bom_by_template)} template BOMs")
 
-        # PARALLEL PROCESSING: Process order lines in parallel using ThreadPoolExecutor
+        # PREFETCH: BOM lines and component products of all BOMs in 2 calls instead of 2 per order line,
+        # then the component catalog records prepare_product_and_bom needs (local with the reference replica)
+        all_bom_line_ids = list(dict.fromkeys(line_id for bom in all_boms for line_id in bom['bom_line_ids']))
+        all_bom_lines = []
+        if all_bom_line_ids:
+            all_bom_lines = models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
+                'mrp.bom.line', 'read',
+                [all_bom_line_ids],
+                {'fields': ['product_id', 'product_qty']})
+        bom_lines_by_id = {line['id']: line for line in all_bom_lines}
+
+        component_product_ids = list(dict.fromkeys(line['product_id'][0] for line in all_bom_lines))
+        all_component_products = []
+        if component_product_ids:
+            all_component_products = models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
+                'product.product', 'read',
+                [component_product_ids],
+                {'fields': ['name', 'x_studio_product_code', 'x_studio_is_visible_in_portal_reports']})
+        component_products_by_id = {prod['id']: prod for prod in all_component_products}
+
+        components_by_ref = prefetch_components(models, uid, [[
+            {'reference': prod['x_studio_product_code']} for prod in all_component_products
+        ]])
+        logger.info(f"Component prefetch complete: {len(bom_lines_by_id)} BOM lines, {len(component_products_by_id)} component products")
+
+        # PARALLEL PROCESSING: Process order lines in parallel on the process-wide worker pool
         # Logs are captured per-line and output sequentially after all parallel work completes
         logger.info(f"Starting parallel processing of {len(order_line_ids)} order lines")
         
         total_lines = len(order_line_ids)
         parallel_results = [None] * total_lines  # Store results in order
         
-        # Use ThreadPoolExecutor for parallel processing
-        # Max workers limited to avoid overwhelming Odoo with too many concurrent requests
-        max_workers = min(5, total_lines)  # Limit to 5 concurrent workers
-        
-        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # Submit all tasks
-            # Note: Each thread creates its own Odoo connection (xmlrpc is not thread-safe)
-            future_to_index = {}
-            for line_index, order_line_id in enumerate(order_line_ids):
-                future = executor.submit(
-                    process_order_line_parallel,
-                    uid, line_index, total_lines, order_line_id,
-                    order_lines_by_id, products_by_id, bom_by_product, bom_by_template, sale_order_id
+        # The pool caps concurrent line work against Odoo for the whole process and
+        # serves requests round-robin, so this order shares the workers fairly
+        # Note: All threads share the pooled Odoo client (one connection checked out per call)
+        worker_pool = get_worker_pool()
+        request_group = object()
+        future_to_index = {}
+        for line_index, order_line_id in enumerate(order_line_ids):
+            future = worker_pool.submit(
+                request_group,
+                process_order_line_parallel,
+                uid, line_index, total_lines, order_line_id,
+                order_lines_by_id, products_by_id, bom_by_product, bom_by_template, sale_order_id,
+                bom_lines_by_id, component_products_by_id, components_by_ref
+            )
+            future_to_index[future] = line_index
+        
+        # Collect results as they complete
+        for future in concurrent.futures.as_completed(future_to_index):
+            line_index = future_to_index[future]
+            try:
+                result, logs = future.result()
+                parallel_results[line_index] = (result, logs)
+            except Exception as e:
+                logger.error(f"Order line {line_index + 1} raised exception: {e}")
+                parallel_results[line_index] = (
+                    {'order_line_id': order_line_ids[line_index], 'status': 'error', 'reason': str(e)},
+                    f"Error processing order line: {e}\n"
                 )
-                future_to_index[future] = line_index
-            
-            # Collect results as they complete
-            for future in concurrent.futures.as_completed(future_to_index):
-                line_index = future_to_index[future]
-                try:
-                    result, logs = future.result()
-                    parallel_results[line_index] = (result, logs)
-                except Exception as e:
-                    logger.error(f"Order line {line_index + 1} raised exception: {e}")
-                    parallel_results[line_index] = (
-                        {'order_line_id': order_line_ids[line_index], 'status': 'error', 'reason': str(e)},
-                        f"Error processing order line: {e}\n"
-                    )
+
+        # BATCH CREATION: the new products (with routes and BOMs) of all prepared lines in one create call
+        prepared_indexes = [index for index, (result, _) in enumerate(parallel_results) if result.get('status') == 'prepared']
+        created = create_products_and_boms(models, uid,
+            [parallel_results[index][0]['product_vals'] for index in prepared_indexes])
+
+        # BATCH UPDATE: link every new product to its order line with a single sale.order write
+        update_commands = [build_order_line_update(parallel_results[line_index][0], created_product)
+                           for line_index, created_product in zip(prepared_indexes, created)
+                           if 'error' not in created_product]
+        update_errors = apply_order_line_updates(models, uid, sale_order_id, update_commands)
+        for line_index, created_product in zip(prepared_indexes, created):
+            result, logs = parallel_results[line_index]
+            completed_result, completed_logs = complete_order_line(
+                line_index, total_lines, result, created_product, update_errors.get(result['order_line_id']))
+            parallel_results[line_index] = (completed_result, logs + completed_logs)
         
         logger.info("Parallel processing complete, outputting logs in order")
         
@@ -1934,7 +2259,7 @@ def handle_odoo_order():
             processed_lines.append(result)
             
             # Handle chatter messages for skipped lines (must be done after parallel processing)
-            if result.get('status') == 'skipped' and result.get('chatter_message'):
+            if result.get('status') == 'skipped' and result.get('chatter_message') and deadline_allows('skipped line chatter post'):
                 try:
                     models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
                         'sale.order', 'message_post',
@@ -2022,50 +2347,53 @@ def handle_odoo_order():
 
         # Save original payload as attachment
         attachment_ids = []
-        try:
-            payload_json = json.dumps(data, indent=2, ensure_ascii=False)
-            attachment_name = f"odoo_order_payload_{final_timestamp}.json"
-
-            attachment_vals = {
-                'name': attachment_name,
-                'type': 'binary',
-                'datas': base64.b64encode(payload_json.encode('utf-8')).decode('ascii'),  # Base64 encode the UTF-8 bytes
-                'res_model': 'sale.order',
-                'res_id': sale_order_id,
-                'mimetype': 'application/json'
-            }
+        if deadline_allows('payload attachment'):
+            try:
+                payload_json = json.dumps(data, indent=2, ensure_ascii=False)
+                attachment_name = f"odoo_order_payload_{final_timestamp}.json"
+
+                attachment_vals = {
+                    'name': attachment_name,
+                    'type': 'binary',
+                    'datas': base64.b64encode(payload_json.encode('utf-8')).decode('ascii'),  # Base64 encode the UTF-8 bytes
+                    'res_model': 'sale.order',
+                    'res_id': sale_order_id,
+                    'mimetype': 'application/json'
+                }
 
-            attachment_id = models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
-                'ir.attachment', 'create', [attachment_vals])
+                attachment_id = models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
+                    'ir.attachment', 'create', [attachment_vals])
 
-            attachment_ids = [attachment_id]
-            logger.info(f"Successfully created payload attachment: {attachment_name} (ID: {attachment_id})")
-        except Exception as e:
-            logger.error(f"Failed to create payload attachment: {str(e)}")
+                attachment_ids = [attachment_id]
+                logger.info(f"Successfully created payload attachment: {attachment_name} (ID: {attachment_id})")
+            except Exception as e:
+                logger.error(f"Failed to create payload attachment: {str(e)}")
 
         # Save processing logs as text attachment
         try:
-            # Get the captured logs and remove the handler
+            # Append the Odoo call ledger, then get the captured logs and remove the handler
+            logger.info(rpc_ledger.format())
             log_contents = log_capture_string.getvalue()
             logger.removeHandler(log_handler)
             log_capture_string.close()
 
-            log_attachment_name = f"odoo_order_processing_logs_{final_timestamp}.txt"
+            if deadline_allows('log attachment'):
+                log_attachment_name = f"odoo_order_processing_logs_{final_timestamp}.txt"
 
-            log_attachment_vals = {
-                'name': log_attachment_name,
-                'type': 'binary',
-                'datas': base64.b64encode(log_contents.encode('utf-8')).decode('ascii'),  # Base64 encode the UTF-8 bytes
-                'res_model': 'sale.order',
-                'res_id': sale_order_id,
-                'mimetype': 'text/plain'
-            }
+                log_attachment_vals = {
+                    'name': log_attachment_name,
+                    'type': 'binary',
+                    'datas': base64.b64encode(log_contents.encode('utf-8')).decode('ascii'),  # Base64 encode the UTF-8 bytes
+                    'res_model': 'sale.order',
+                    'res_id': sale_order_id,
+                    'mimetype': 'text/plain'
+                }
 
-            log_attachment_id = models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
-                'ir.attachment', 'create', [log_attachment_vals])
+                log_attachment_id = models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
+                    'ir.attachment', 'create', [log_attachment_vals])
 
-            attachment_ids.append(log_attachment_id)
-            logger.info(f"Successfully created log attachment: {log_attachment_name} (ID: {log_attachment_id})")
+                attachment_ids.append(log_attachment_id)
+                logger.info(f"Successfully created log attachment: {log_attachment_name} (ID: {log_attachment_id})")
         except Exception as e:
             logger.error(f"Failed to create log attachment: {str(e)}")
             # Clean up the handler even if attachment creation fails
@@ -2163,20 +2491,21 @@ def handle_odoo_order():
 </ul>"""
 
         # Post the comprehensive message to the sale order's chatter
-        try:
-            models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
-                'sale.order', 'message_post',
-                [sale_order_id],
-                {
-                    'body': chatter_message,
-                    'body_is_html': True,                # keep HTML rendering
-                    'message_type': 'comment',
-                    'subtype_xmlid': 'mail.mt_note',     # 🔑 internal note
-                    'attachment_ids': attachment_ids,
-                })
-            logger.info(f"Successfully posted comprehensive processing logs to sale order {sale_order_id} chatter")
-        except Exception as e:
-            logger.error(f"Failed to post message to sale order chatter: {str(e)}")
+        if deadline_allows('chatter summary'):
+            try:
+                models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
+                    'sale.order', 'message_post',
+                    [sale_order_id],
+                    {
+                        'body': chatter_message,
+                        'body_is_html': True,                # keep HTML rendering
+                        'message_type': 'comment',
+                        'subtype_xmlid': 'mail.mt_note',     # 🔑 internal note
+                        'attachment_ids': attachment_ids,
+                    })
+                logger.info(f"Successfully posted comprehensive processing logs to sale order {sale_order_id} chatter")
+            except Exception as e:
+                logger.error(f"Failed to post message to sale order chatter: {str(e)}")
 
         # Prepare response data
         response_data = {
@@ -2199,6 +2528,8 @@ def handle_odoo_order():
         log_contents = ""
         try:
             if 'log_handler' in locals() and 'log_capture_string' in locals():
+                if 'rpc_ledger' in locals():
+                    logger.info(rpc_ledger.format())
                 log_contents = log_capture_string.getvalue()
                 logger.removeHandler(log_handler)
                 log_capture_string.close()
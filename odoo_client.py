@@ -0,0 +1,534 @@
+import os
+import ssl
+import gzip
+import json
+import time
+import logging
+import itertools
+import urllib.parse
+import threading
+import http.client
+import xmlrpc.client
+from dotenv import load_dotenv
+from rpc_metrics import count_records, record_call, get_rpc_stats
+from rpc_cassette import get_cassette
+from rpc_limiter import AdaptiveLimiter
+from rpc_hedging import ODOO_HEDGE_ENABLED, ReadHedger
+from deadline import bounded_timeout, current_deadline
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Odoo Configuration
+ODOO_URL = os.getenv('JUSTFRAMEIT_ODOO_URL')
+ODOO_DB = os.getenv('JUSTFRAMEIT_ODOO_DB')
+ODOO_USERNAME = os.getenv('JUSTFRAMEIT_ODOO_USERNAME')
+ODOO_API_KEY = os.getenv('JUSTFRAMEIT_ODOO_API_KEY')
+
+# Maximum number of connections kept open to Odoo per process
+ODOO_POOL_SIZE = int(os.getenv('JUSTFRAMEIT_ODOO_POOL_SIZE', '10'))
+
+# Socket timeout (seconds) for Odoo calls
+ODOO_TIMEOUT = float(os.getenv('JUSTFRAMEIT_ODOO_TIMEOUT', '300'))
+
+# Wire protocol for model calls: 'xmlrpc' (default) or 'jsonrpc'
+ODOO_PROTOCOL = os.getenv('JUSTFRAMEIT_ODOO_PROTOCOL', 'xmlrpc').strip().lower()
+
+# Cached authentication (one authenticate round-trip per process)
+_uid = None
+_uid_lock = threading.Lock()
+
+# Shared models client (created lazily)
+_models = None
+_models_lock = threading.Lock()
+
+
+def get_odoo_common():
+    """Get Odoo common endpoint"""
+    try:
+        common = xmlrpc.client.ServerProxy(f'{ODOO_URL}/xmlrpc/2/common', allow_none=True)
+        return common
+    except Exception as e:
+        logger.error(f"Failed to connect to Odoo common endpoint: {str(e)}")
+        raise
+
+
+def get_uid():
+    """
+    Get Odoo user ID.
+
+    The uid is cached for the lifetime of the process, so only the first call
+    (or the first call after invalidate_uid) performs an authenticate round-trip.
+    """
+    global _uid
+    if _uid:
+        return _uid
+
+    with _uid_lock:
+        # Another thread may have authenticated while we were waiting
+        if _uid:
+            return _uid
+        try:
+            cassette = get_cassette()
+            if cassette and cassette.mode == 'replay':
+                _uid = cassette.recorded_uid()
+                logger.info(f"Using recorded Odoo uid {_uid} (cassette replay)")
+                return _uid
+            common = get_odoo_common()
+            uid = common.authenticate(ODOO_DB, ODOO_USERNAME, ODOO_API_KEY, {})
+            if not uid:
+                raise Exception("Authentication failed")
+            logger.info(f"Authenticated with Odoo (uid: {uid})")
+            _uid = uid
+            return uid
+        except Exception as e:
+            logger.error(f"Failed to authenticate with Odoo: {str(e)}")
+            raise
+
+
+def invalidate_uid(stale_uid=None):
+    """
+    Drop the cached uid so the next get_uid() call re-authenticates.
+
+    Args:
+        stale_uid: The uid that was rejected. If another thread already replaced
+                   it with a fresh one, the cache is left untouched.
+    """
+    global _uid
+    with _uid_lock:
+        if stale_uid is None or _uid == stale_uid:
+            _uid = None
+
+
+def is_access_error(error):
+    """Return True if an XML-RPC fault means our credentials were rejected."""
+    if not isinstance(error, xmlrpc.client.Fault):
+        return False
+    fault_string = str(error.faultString or '')
+    return error.faultCode == 3 or 'AccessDenied' in fault_string or 'Access Denied' in fault_string
+
+
+class PooledTransport(xmlrpc.client.Transport):
+    """
+    XML-RPC transport backed by a bounded pool of persistent HTTP/1.1 connections.
+
+    The stock Transport keeps a single connection, which is why a ServerProxy
+    cannot be shared between threads. Here every request checks a connection out
+    of the pool and returns it once the response has been read, so one ServerProxy
+    can serve all threads of the process while reusing warm sockets.
+    """
+
+    def __init__(self, use_https=True, pool_size=ODOO_POOL_SIZE, timeout=None, idle_timeout=60):
+        super().__init__()
+        self.use_https = use_https
+        self.pool_size = max(1, pool_size)
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self._idle = []  # (connection, returned_at) - most recently used last
+        self._open = 0
+        self._cond = threading.Condition()
+        self._local = threading.local()
+        self._ssl_context = ssl.create_default_context() if use_https else None
+        # Counters
+        self._checkouts = 0
+        self._reused = 0
+        self._created = 0
+        self._discarded = 0
+        self._waits = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+
+    def _new_connection(self, host):
+        chost, self._extra_headers, x509 = self.get_host_info(host)
+        if self.use_https:
+            return http.client.HTTPSConnection(chost, timeout=self.timeout, context=self._ssl_context, **(x509 or {}))
+        return http.client.HTTPConnection(chost, timeout=self.timeout)
+
+    def _checkout(self, host):
+        """Take an idle connection from the pool (or open a new one). Returns (connection, reused)."""
+        wait_started = None
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                while self._idle:
+                    conn, returned_at = self._idle.pop()
+                    if now - returned_at <= self.idle_timeout:
+                        self._checkouts += 1
+                        self._reused += 1
+                        self._record_wait(wait_started, now)
+                        return conn, True
+                    # Server has most likely dropped this keep-alive socket already
+                    self._close_quietly(conn)
+                    self._open -= 1
+                    self._discarded += 1
+
+                if self._open < self.pool_size:
+                    self._open += 1
+                    self._checkouts += 1
+                    self._created += 1
+                    self._record_wait(wait_started, now)
+                    break
+
+                if wait_started is None:
+                    wait_started = now
+                    self._waits += 1
+                self._cond.wait()
+
+        try:
+            return self._new_connection(host), False
+        except Exception:
+            self._discard(None)
+            raise
+
+    def _record_wait(self, wait_started, now):
+        if wait_started is None:
+            return
+        waited = now - wait_started
+        self._wait_time_total += waited
+        self._wait_time_max = max(self._wait_time_max, waited)
+
+    def _checkin(self, conn, response):
+        if response is not None and response.will_close:
+            self._discard(conn)
+            return
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def _discard(self, conn):
+        if conn is not None:
+            self._close_quietly(conn)
+        with self._cond:
+            self._open -= 1
+            self._discarded += 1
+            self._cond.notify()
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def make_connection(self, host):
+        # send_request() asks for the connection through this hook; hand it the
+        # connection checked out by the current thread
+        return self._local.conn
+
+    def last_exchange(self):
+        """(request_bytes, response_bytes) of the last request made by the current thread."""
+        return getattr(self._local, 'request_bytes', 0), getattr(self._local, 'response_bytes', 0)
+
+    def request(self, host, handler, request_body, verbose=False):
+        self._local.request_bytes = len(request_body)
+        self._local.response_bytes = 0
+        for attempt in (0, 1):
+            timeout = bounded_timeout(self.timeout, 'Odoo call')
+            conn, reused = self._checkout(host)
+            self._local.conn = conn
+            try:
+                # Never block past the request's deadline
+                conn.timeout = timeout
+                if conn.sock is not None:
+                    conn.sock.settimeout(timeout)
+                self.send_request(host, handler, request_body, verbose)
+                response = conn.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionError):
+                self._discard(conn)
+                # A reused keep-alive socket may have been closed by the server
+                # while idle (the other idle ones most likely too, e.g. after an
+                # Odoo restart); drop them and retry once on a fresh connection
+                if reused and attempt == 0:
+                    self.close()
+                    continue
+                raise
+            except Exception as e:
+                self._discard(conn)
+                self._raise_if_cut_off(e, timeout)
+                raise
+            finally:
+                self._local.conn = None
+
+            self._local.response_bytes = int(response.getheader('Content-Length') or 0)
+            try:
+                if response.status == 200:
+                    self.verbose = verbose
+                    result = self.parse_response(response)
+                else:
+                    response.read()
+                    raise xmlrpc.client.ProtocolError(
+                        host + handler, response.status, response.reason, dict(response.getheaders()))
+            except (xmlrpc.client.Fault, xmlrpc.client.ProtocolError):
+                # The response was read completely, the connection is still usable
+                self._checkin(conn, response)
+                raise
+            except Exception as e:
+                self._discard(conn)
+                self._raise_if_cut_off(e, timeout)
+                raise
+
+            self._checkin(conn, response)
+            return result
+
+    def _raise_if_cut_off(self, error, timeout):
+        # A socket timeout shortened by the request's deadline means the request ran out of
+        # time, not that Odoo is slow: raise it as DeadlineExceeded (never counted as overload)
+        deadline = current_deadline()
+        if deadline is not None and timeout != self.timeout and isinstance(error, TimeoutError):
+            raise deadline.expire(f"cut off an Odoo call after {timeout:.1f}s") from error
+
+    def close(self):
+        """Close all idle connections."""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for conn, _ in idle:
+            self._close_quietly(conn)
+
+    def stats(self):
+        """Pool counters: size, wait time and connection reuse ratio."""
+        with self._cond:
+            return {
+                'pool_size': self.pool_size,
+                'open_connections': self._open,
+                'idle_connections': len(self._idle),
+                'in_use_connections': self._open - len(self._idle),
+                'checkouts': self._checkouts,
+                'connections_created': self._created,
+                'connections_discarded': self._discarded,
+                'reuse_ratio': round(self._reused / self._checkouts, 4) if self._checkouts else 0.0,
+                'waits': self._waits,
+                'total_wait_ms': round(self._wait_time_total * 1000, 2),
+                'avg_wait_ms': round(self._wait_time_total * 1000 / self._waits, 2) if self._waits else 0.0,
+                'max_wait_ms': round(self._wait_time_max * 1000, 2),
+            }
+
+
+class JsonRpcTransport(PooledTransport):
+    """
+    Pooled transport speaking Odoo's ``/jsonrpc`` endpoint.
+
+    JSON encoding is much cheaper than XML marshalling for large payloads (base64
+    image datas, CSV fields, big search_read results). Faults are raised as
+    xmlrpc.client.Fault so callers handle both protocols the same way.
+    """
+
+    _ids = itertools.count(1)
+
+    def send_request(self, host, handler, request_body, debug):
+        connection = self.make_connection(host)
+        if debug:
+            connection.set_debuglevel(1)
+        connection.putrequest('POST', handler, skip_accept_encoding=True)
+        headers = self._extra_headers + [
+            ('Accept-Encoding', 'gzip'),
+            ('Content-Type', 'application/json'),
+            ('User-Agent', self.user_agent),
+        ]
+        self.send_headers(connection, headers)
+        self.send_content(connection, request_body)
+        return connection
+
+    def parse_response(self, response):
+        body = response.read()
+        if response.getheader('Content-Encoding', '') == 'gzip':
+            body = gzip.decompress(body)
+        return json.loads(body)
+
+    def execute_kw(self, host, handler, db, uid, password, model, method, args, kwargs):
+        request_body = json.dumps({
+            'jsonrpc': '2.0',
+            'method': 'call',
+            'params': {
+                'service': 'object',
+                'method': 'execute_kw',
+                'args': [db, uid, password, model, method, args, kwargs],
+            },
+            'id': next(self._ids),
+        }).encode('utf-8')
+
+        reply = self.request(host, handler, request_body)
+        if reply.get('error'):
+            raise json_error_to_fault(reply['error'])
+        return reply.get('result')
+
+
+def json_error_to_fault(error):
+    """Convert an Odoo JSON-RPC error object to the equivalent xmlrpc.client.Fault."""
+    data = error.get('data') or {}
+    name = data.get('name', '')
+    message = data.get('message') or error.get('message', '')
+    # Odoo's XML-RPC layer reports AccessDenied with fault code 3
+    code = 3 if name.endswith('AccessDenied') else error.get('code', 1)
+    return xmlrpc.client.Fault(code, f"{name}: {message}" if name else message)
+
+
+class OdooModels:
+    """
+    Thread-safe replacement for the xmlrpc ``/xmlrpc/2/object`` ServerProxy.
+
+    A single client is shared by all threads; thread safety comes from the pooled
+    transport underneath, which checks out one keep-alive connection per call.
+    The wire protocol is XML-RPC by default, or JSON-RPC with
+    JUSTFRAMEIT_ODOO_PROTOCOL=jsonrpc.
+
+    The call surface is identical to ServerProxy.execute_kw, so existing call sites
+    keep working unchanged.
+
+    All calls of the process (order handlers, price exports, route logging) pass
+    through one AdaptiveLimiter, which adapts the number of calls in flight to
+    Odoo's latency (at most pool_size, see rpc_limiter).
+
+    With JUSTFRAMEIT_ODOO_HEDGE_ENABLED, slow catalog and BOM reads are sent a
+    second time and the first answer wins (see rpc_hedging). Writes are never
+    hedged, and nothing is hedged while a cassette records or replays.
+
+    With JUSTFRAMEIT_ODOO_CASSETTE_MODE=record every call is also written to a
+    cassette; with =replay calls are answered from that cassette and Odoo is never
+    contacted (see rpc_cassette).
+    """
+
+    def __init__(self, url, pool_size=ODOO_POOL_SIZE, timeout=ODOO_TIMEOUT, protocol=ODOO_PROTOCOL):
+        if protocol not in ('xmlrpc', 'jsonrpc'):
+            raise ValueError(f"Unsupported Odoo protocol: {protocol}")
+        self.url = url
+        self.protocol = protocol
+        parsed_url = urllib.parse.urlsplit(url)
+        self._host = parsed_url.netloc
+        self._jsonrpc_handler = parsed_url.path.rstrip('/') + '/jsonrpc'
+
+        transport_class = JsonRpcTransport if protocol == 'jsonrpc' else PooledTransport
+        self.transport = transport_class(
+            use_https=parsed_url.scheme == 'https',
+            pool_size=pool_size,
+            timeout=timeout
+        )
+        self._proxy = xmlrpc.client.ServerProxy(f'{url}/xmlrpc/2/object', transport=self.transport, allow_none=True)
+        self.cassette = get_cassette()
+        self.limiter = AdaptiveLimiter(max_limit=pool_size)
+        self.hedger = ReadHedger(workers=2 * pool_size) if ODOO_HEDGE_ENABLED and self.cassette is None else None
+
+    def _send(self, db, uid, password, model, method, args, kwargs):
+        if self.protocol == 'jsonrpc':
+            return self.transport.execute_kw(self._host, self._jsonrpc_handler,
+                db, uid, password, model, method, args, kwargs)
+        return self._proxy.execute_kw(db, uid, password, model, method, args, kwargs)
+
+    def _call(self, db, uid, password, model, method, args, kwargs):
+        if self.cassette is None:
+            return self._send(db, uid, password, model, method, args, kwargs)
+        return self.cassette.call(uid, model, method, args, kwargs,
+            lambda: self._send(db, uid, password, model, method, args, kwargs))
+
+    def execute_kw(self, db, uid, password, model, method, args, kwargs=None):
+        """
+        Execute an Odoo model method, re-authenticating once on an access error.
+
+        Every call is timed and recorded (model, method, record count, bytes) in
+        the rpc_metrics route histograms and the current request's call ledger.
+        Calls beyond the adaptive concurrency limit wait for a free slot first.
+        Within a request with a deadline (see deadline), no call starts after it
+        and neither the wait nor the call's socket operations run past it.
+        """
+        kwargs = kwargs or {}
+        slot = self.limiter.acquire(timeout=bounded_timeout(self.limiter.queue_timeout, f"{model}.{method}"))
+        started = time.perf_counter()
+        result = None
+        error = None
+        exchange = None
+        try:
+            if self.hedger is not None and self.hedger.hedges(model, method):
+                result, exchange = self.hedger.call(f"{model}.{method}",
+                    lambda: self._attempt(db, uid, password, model, method, args, kwargs), self.limiter)
+            else:
+                result = self._call_with_reauth(db, uid, password, model, method, args, kwargs)
+            return result
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            records = count_records(method, args, result)
+            self.limiter.release(slot, f"{model}.{method}", error, records)
+            request_bytes, response_bytes = exchange or self.transport.last_exchange()
+            record_call(model, method, time.perf_counter() - started,
+                records, request_bytes, response_bytes, error)
+
+    def _attempt(self, db, uid, password, model, method, args, kwargs):
+        # One attempt of a hedged call, on a hedge thread: its exchange sizes are only known there
+        result = self._call_with_reauth(db, uid, password, model, method, args, kwargs)
+        return result, self.transport.last_exchange()
+
+    def _call_with_reauth(self, db, uid, password, model, method, args, kwargs):
+        try:
+            return self._call(db, uid, password, model, method, args, kwargs)
+        except xmlrpc.client.Fault as e:
+            if not is_access_error(e):
+                raise
+            logger.warning(f"Odoo rejected uid {uid} on {model}.{method}, re-authenticating")
+            invalidate_uid(uid)
+            fresh_uid = get_uid()
+            return self._call(db, fresh_uid, password, model, method, args, kwargs)
+
+    def close(self):
+        """Close all idle pooled connections."""
+        self.transport.close()
+
+    def stats(self):
+        """Connection pool counters."""
+        return self.transport.stats()
+
+    def limiter_stats(self):
+        """Adaptive concurrency limit counters."""
+        return self.limiter.stats()
+
+
+def get_odoo_models():
+    """Get the shared, thread-safe Odoo models client"""
+    global _models
+    if _models is not None:
+        return _models
+
+    with _models_lock:
+        if _models is None:
+            try:
+                url = ODOO_URL
+                cassette = get_cassette()
+                if not url and cassette and cassette.mode == 'replay':
+                    # Replay never contacts Odoo, so it does not need a configured URL
+                    url = 'http://odoo.invalid'
+                _models = OdooModels(url)
+            except Exception as e:
+                logger.error(f"Failed to connect to Odoo models endpoint: {str(e)}")
+                raise
+        return _models
+
+
+def _reset_after_fork():
+    """Forked children (e.g. ProcessPoolExecutor workers) must not share parent sockets."""
+    global _models, _models_lock, _uid_lock
+    _models = None
+    _models_lock = threading.Lock()
+    _uid_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_client_stats():
+    """Runtime counters of the shared Odoo client, for the stats endpoint."""
+    stats = {}
+    if _models is not None:
+        stats['connection_pool'] = _models.stats()
+        stats['concurrency_limit'] = _models.limiter_stats()
+        stats['hedging'] = _models.hedger.stats() if _models.hedger is not None else {'enabled': False}
+    stats['rpc_calls'] = get_rpc_stats()
+    cassette = get_cassette()
+    if cassette is not None:
+        stats['cassette'] = {'mode': cassette.mode, 'path': cassette.path}
+        if cassette.mode == 'replay':
+            stats['cassette']['remaining_calls'] = cassette.remaining()
+    return stats
@@ -0,0 +1,357 @@
+import os
+import json
+import time
+import uuid
+import logging
+import socket
+import sqlite3
+import threading
+import contextvars
+from deadline import REQUEST_DEADLINE
+
+logger = logging.getLogger(__name__)
+
+# Accept every web order asynchronously (202 + job id); off by default. With a jobs database (ORDER_JOBS_PATH)
+# clients can also ask for it per request with 'Prefer: respond-async'
+ASYNC_ORDERS_ENABLED = os.getenv('JUSTFRAMEIT_ASYNC_ORDERS', 'false').strip().lower() in ('1', 'true', 'yes')
+
+# Durable queue of accepted orders (SQLite file), shared by all gunicorn workers. Accepted orders
+# must survive restarts, so there is no temporary default: on Azure App Service /tmp is wiped on
+# restart and the path must be under /home (persistent storage), e.g.
+# /home/data/justframeit_jobs.sqlite3. Without it web orders are always processed synchronously.
+ORDER_JOBS_PATH = os.getenv('JUSTFRAMEIT_ORDER_JOBS_PATH')
+
+# Background threads processing queued orders per process
+ORDER_JOB_WORKERS = int(os.getenv('JUSTFRAMEIT_ORDER_JOB_WORKERS', '2'))
+
+# Seconds between checks for orders queued by other processes
+ORDER_JOB_POLL_INTERVAL = float(os.getenv('JUSTFRAMEIT_ORDER_JOB_POLL_INTERVAL', '1'))
+
+# Finished jobs are kept this many days for /jobs/<id>
+ORDER_JOB_RETENTION_DAYS = float(os.getenv('JUSTFRAMEIT_ORDER_JOB_RETENTION_DAYS', '7'))
+
+# Seconds between sweeps for jobs left running by a process that died
+ORDER_JOB_SWEEP_INTERVAL = float(os.getenv('JUSTFRAMEIT_ORDER_JOB_SWEEP_INTERVAL', '60'))
+
+if ASYNC_ORDERS_ENABLED and not ORDER_JOBS_PATH:
+    logger.warning("JUSTFRAMEIT_ASYNC_ORDERS is on but JUSTFRAMEIT_ORDER_JOBS_PATH is not set, "
+                   "web orders are processed synchronously")
+
+# Worker processes are identified by host and pid (several hosts may share the database on /home)
+_HOST = socket.gethostname()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    dedupe_key TEXT,
+    status TEXT NOT NULL,
+    progress TEXT,
+    order_id INTEGER,
+    result TEXT,
+    error TEXT,
+    worker_host TEXT,
+    worker_pid INTEGER,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+CREATE UNIQUE INDEX IF NOT EXISTS jobs_dedupe_key ON jobs (kind, dedupe_key) WHERE dedupe_key IS NOT NULL AND status != 'failed';
+"""
+
+# Job being processed by the current thread (progress reports go to it)
+_current_job = contextvars.ContextVar('order_job', default=None)
+
+# Job kind -> handler(payload) -> (response_data, status_code)
+_handlers = {}
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+class OrderQueue:
+    """
+    Durable SQLite queue of orders accepted with 202 and processed in the background.
+
+    Jobs survive restarts: every process polls the same database and claims
+    queued jobs atomically, so each job runs once. A job is never retried
+    automatically (a half-processed order may already exist in Odoo). The
+    workers sweep the table every sweep_interval: a running job whose process
+    (on this host) no longer exists, or that has not reported progress for
+    stale_after, is marked failed.
+
+    Handlers are registered per job kind with register_job_handler() and
+    return (response_data, status_code), like the synchronous routes.
+    """
+
+    def __init__(self, path=ORDER_JOBS_PATH, workers=ORDER_JOB_WORKERS, poll_interval=ORDER_JOB_POLL_INTERVAL,
+                 retention_days=ORDER_JOB_RETENTION_DAYS, stale_after=2 * REQUEST_DEADLINE,
+                 sweep_interval=ORDER_JOB_SWEEP_INTERVAL):
+        self.path = path
+        self.workers = max(1, workers)
+        self.poll_interval = poll_interval
+        self.retention = retention_days * 86400
+        self.stale_after = stale_after
+        self.sweep_interval = sweep_interval
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._threads = []
+        self._stopped = False
+        self._next_sweep = 0.0
+        # Counters (this process)
+        self._enqueued = 0
+        self._deduplicated = 0
+        self._succeeded = 0
+        self._failed = 0
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self):
+        # One connection per thread (and per process: forked children reopen)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            # Rollback journal, not WAL: WAL needs shared memory, which network file
+            # systems such as the /home share of Azure App Service do not provide
+            conn.execute('PRAGMA journal_mode=DELETE')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def enqueue(self, kind, payload, dedupe_key=None):
+        """
+        Store a job; it is processed by the next free worker of any process.
+
+        Args:
+            kind: Job kind (see register_job_handler)
+            payload: JSON-serializable job input
+            dedupe_key: Optional key (e.g. the shop's order reference); a job of the
+                        same kind with the same key that has not failed is returned
+                        instead of a new one
+
+        Returns:
+            tuple: (job dict, created) - created is False for a duplicate
+        """
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        conn = self._connection()
+        try:
+            conn.execute(
+                'INSERT INTO jobs (id, kind, payload, dedupe_key, status, progress, created_at, updated_at) '
+                "VALUES (?, ?, ?, ?, 'queued', 'queued', ?, ?)",
+                (job_id, kind, json.dumps(payload), dedupe_key, now, now))
+        except sqlite3.IntegrityError:
+            existing = conn.execute("SELECT id FROM jobs WHERE kind = ? AND dedupe_key = ? AND status != 'failed'",
+                                    (kind, dedupe_key)).fetchone()
+            with self._lock:
+                self._deduplicated += 1
+            logger.info(f"Order {dedupe_key} was already accepted as job {existing['id']}")
+            return self.get(existing['id']), False
+        with self._lock:
+            self._enqueued += 1
+        self.start()
+        self._wakeup.set()
+        logger.info(f"Accepted {kind} job {job_id}")
+        return self.get(job_id), True
+
+    def get(self, job_id):
+        """Status of a job (without its payload), or None if unknown."""
+        row = self._connection().execute(
+            'SELECT id, kind, status, progress, order_id, result, error, created_at, started_at, finished_at '
+            'FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+    def report_progress(self, job_id, stage, order_id=None):
+        """Record the stage a running job has reached (and the order it created, once known)."""
+        self._connection().execute(
+            'UPDATE jobs SET progress = ?, order_id = COALESCE(?, order_id), updated_at = ? WHERE id = ?',
+            (stage, order_id, time.time(), job_id))
+
+    def start(self):
+        """Start this process's worker threads (once)."""
+        if self._threads:
+            return
+        with self._lock:
+            if self._threads:
+                return
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f'order-job-{index}', daemon=True)
+                self._threads.append(thread)
+                thread.start()
+
+    def stop(self):
+        """Let the worker threads exit after their current job (queued jobs stay queued)."""
+        self._stopped = True
+        self._wakeup.set()
+
+    def _sweep_if_due(self):
+        # One worker thread sweeps per interval
+        now = time.monotonic()
+        with self._lock:
+            if now < self._next_sweep:
+                return
+            self._next_sweep = now + self.sweep_interval
+        try:
+            self._recover_stale()
+        except Exception as e:
+            logger.error(f"Failed to sweep order jobs: {str(e)}")
+
+    def _recover_stale(self):
+        now = time.time()
+        conn = self._connection()
+        running = conn.execute(
+            "SELECT id, worker_host, worker_pid, updated_at FROM jobs WHERE status = 'running'").fetchall()
+        # Jobs without progress for stale_after, and jobs of processes of this host that died
+        # (e.g. a gunicorn worker killed on timeout)
+        interrupted = [row['id'] for row in running
+                       if row['updated_at'] < now - self.stale_after
+                       or (row['worker_host'] == _HOST and not _pid_alive(row['worker_pid']))]
+        for job_id in interrupted:
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, finished_at = ?, updated_at = ? "
+                "WHERE id = ? AND status = 'running'",
+                ('Interrupted while processing; check Odoo before submitting the order again', now, now, job_id))
+        if interrupted:
+            logger.warning(f"Marked {len(interrupted)} interrupted order job(s) as failed")
+        conn.execute("DELETE FROM jobs WHERE status IN ('succeeded', 'failed') AND finished_at < ?",
+                     (now - self.retention,))
+
+    def _claim(self):
+        """Atomically take the oldest queued job, or None."""
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                "SELECT id, kind, payload FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1").fetchone()
+            if row is not None:
+                now = time.time()
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', progress = 'started', worker_host = ?, worker_pid = ?, "
+                    'started_at = ?, updated_at = ? WHERE id = ?', (_HOST, os.getpid(), now, now, row['id']))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return row
+
+    def _work(self):
+        while not self._stopped:
+            self._sweep_if_due()
+            try:
+                row = self._claim()
+            except Exception as e:
+                logger.error(f"Failed to claim an order job: {str(e)}")
+                row = None
+            if row is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            self._run(row)
+
+    def _run(self, row):
+        job_id = row['id']
+        handler = _handlers.get(row['kind'])
+        logger.info(f"Processing {row['kind']} job {job_id}")
+        token = _current_job.set(job_id)
+        try:
+            if handler is None:
+                raise Exception(f"No handler registered for {row['kind']} jobs")
+            response_data, status_code = handler(json.loads(row['payload']))
+            error = response_data.get('error') if status_code >= 400 else None
+        except Exception as e:
+            logger.error(f"Order job {job_id} failed: {str(e)}")
+            response_data, error = {'error': str(e), 'status': 'error'}, str(e)
+        finally:
+            _current_job.reset(token)
+
+        now = time.time()
+        status = 'failed' if error else 'succeeded'
+        self._connection().execute(
+            'UPDATE jobs SET status = ?, progress = ?, order_id = COALESCE(?, order_id), result = ?, error = ?, '
+            'finished_at = ?, updated_at = ? WHERE id = ?',
+            (status, 'done' if status == 'succeeded' else 'failed', response_data.get('order_id'),
+             json.dumps(response_data), error, now, now, job_id))
+        with self._lock:
+            if error:
+                self._failed += 1
+            else:
+                self._succeeded += 1
+        logger.info(f"Order job {job_id} {status}")
+
+    def stats(self):
+        """Jobs per status (all processes) and this process's counters."""
+        rows = self._connection().execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall()
+        with self._lock:
+            return {
+                'path': self.path,
+                'workers': len(self._threads),
+                'jobs': {status: count for status, count in rows},
+                'enqueued': self._enqueued,
+                'deduplicated': self._deduplicated,
+                'succeeded': self._succeeded,
+                'failed': self._failed,
+            }
+
+
+def _pid_alive(pid):
+    """Return True unless the process pid is known to have exited."""
+    if pid is None or pid == os.getpid() or os.name != 'posix':
+        # os.kill(pid, 0) only probes on POSIX (on Windows it would send CTRL_C_EVENT)
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        # Exists but belongs to another user
+        return True
+    return True
+
+
+def register_job_handler(kind, handler):
+    """Process jobs of this kind with handler(payload) -> (response_data, status_code)."""
+    _handlers[kind] = handler
+
+
+def report_job_progress(stage, order_id=None):
+    """Record the progress of the order job being processed by this thread (no-op for synchronous requests)."""
+    job_id = _current_job.get()
+    if job_id is None:
+        return
+    try:
+        get_order_queue().report_progress(job_id, stage, order_id)
+    except Exception as e:
+        logger.warning(f"Failed to record progress of job {job_id}: {str(e)}")
+
+
+def get_order_queue():
+    """Get the process-wide order job queue, or None when JUSTFRAMEIT_ORDER_JOBS_PATH is not set"""
+    global _queue
+    if _queue is not None:
+        return _queue
+    if not ORDER_JOBS_PATH:
+        return None
+
+    with _queue_lock:
+        if _queue is None:
+            _queue = OrderQueue()
+        return _queue
+
+
+def _reset_after_fork():
+    # The parent's worker threads do not survive a fork; queued jobs stay in the database
+    global _queue, _queue_lock
+    _queue_lock = threading.Lock()
+    _queue = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -1,5 +1,4 @@
 from flask import Blueprint, jsonify, request
-import xmlrpc.client
 import os
 import json
 import base64
@@ -11,6 +10,9 @@ import pandas as pd
 import openpyxl
 import re
 from utils import log_route_call
+from odoo_client import ODOO_DB, ODOO_API_KEY, get_uid, get_odoo_models
+from rpc_metrics import start_ledger
+from reference_replica import get_price_export_products, get_pricelists, get_duration_rules
 
 # Configure logging
 logging.basicConfig(
@@ -121,41 +123,6 @@ def create_log_capture_handler():
         # Don't raise the exception - logging failure shouldn't break the main flow
         return None
 
-# Odoo Configuration
-ODOO_URL = os.getenv('JUSTFRAMEIT_ODOO_URL')
-ODOO_DB = os.getenv('JUSTFRAMEIT_ODOO_DB')
-ODOO_USERNAME = os.getenv('JUSTFRAMEIT_ODOO_USERNAME')
-ODOO_API_KEY = os.getenv('JUSTFRAMEIT_ODOO_API_KEY')
-
-def get_odoo_common():
-    """Get Odoo common endpoint"""
-    try:
-        common = xmlrpc.client.ServerProxy(f'{ODOO_URL}/xmlrpc/2/common', allow_none=True)
-        return common
-    except Exception as e:
-        logger.error(f"Failed to connect to Odoo common endpoint: {str(e)}")
-        raise
-
-def get_odoo_models():
-    """Get Odoo models endpoint"""
-    try:
-        models = xmlrpc.client.ServerProxy(f'{ODOO_URL}/xmlrpc/2/object', allow_none=True)
-        return models
-    except Exception as e:
-        logger.error(f"Failed to connect to Odoo models endpoint: {str(e)}")
-        raise
-
-def get_uid():
-    """Get Odoo user ID"""
-    try:
-        common = get_odoo_common()
-        uid = common.authenticate(ODOO_DB, ODOO_USERNAME, ODOO_API_KEY, {})
-        if not uid:
-            raise Exception("Authentication failed")
-        return uid
-    except Exception as e:
-        logger.error(f"Failed to authenticate with Odoo: {str(e)}")
-        raise
 
 def generate_price_export_excel(models, uid, d3_formula=None):
     """
@@ -180,26 +147,21 @@ def generate_price_export_excel(models, uid, d3_formula=None):
         # =============================================
         logger.info("Fetching products with price computation = Surface or Circumference...")
 
-        products = models.execute_kw(
-            ODOO_DB, uid, ODOO_API_KEY,
-            'product.product', 'search_read',
-            [[['x_studio_price_computation', 'in', ['Surface', 'Circumference']]]],  # Filter by price computation
-            {
-                'fields': [
-                    'name',
-                    'id',
-                    'x_studio_product_code',
-                    'x_studio_location_code',
-                    'description_ecommerce',
-                    'x_studio_price_computation',
-                    'standard_price',
-                    'x_studio_associated_service',
-                    'x_studio_associated_work_center',
-                    'x_studio_associated_cost_per_employee_per_hour'
-                ],
-                # uncomment for testing with a limit
-                #'limit': 100
-            }
+        # Read from the local reference replica (synced with Odoo), or from Odoo when disabled
+        products = get_price_export_products(
+            models, uid,
+            [
+                'name',
+                'id',
+                'x_studio_product_code',
+                'x_studio_location_code',
+                'description_ecommerce',
+                'x_studio_price_computation',
+                'standard_price',
+                'x_studio_associated_service',
+                'x_studio_associated_work_center',
+                'x_studio_associated_cost_per_employee_per_hour'
+            ]
         )
 
         total_products = len(products)
@@ -335,15 +297,7 @@ def generate_price_export_excel(models, uid, d3_formula=None):
         logger.info("Fetching pricelists and filling TAB 2...")
 
         # Fetch all pricelists and filter out "Default" in Python to avoid domain parsing issues
-        all_pricelists = models.execute_kw(
-            ODOO_DB, uid, ODOO_API_KEY,
-            'product.pricelist', 'search_read',
-            [],  # Empty domain = get all pricelists
-            {
-                'fields': ['name', 'x_studio_price_discount'],
-                'limit': 100  # Add limit to prevent excessive results
-            }
-        )
+        all_pricelists = get_pricelists(models, uid, limit=100)  # Limit to prevent excessive results
 
         # Filter out pricelists named "Default" (case insensitive)
         pricelists = [
@@ -393,19 +347,7 @@ def generate_price_export_excel(models, uid, d3_formula=None):
         # =============================================
         logger.info("Fetching service duration rules and filling TAB 3...")
 
-        duration_rules = models.execute_kw(
-            ODOO_DB, uid, ODOO_API_KEY,
-            'x_services_duration_rules', 'search_read',
-            [[]],  # Empty domain = all duration rules
-            {
-                'fields': [
-                    'x_associated_service',
-                    'x_studio_work_center',
-                    'x_studio_quantity',
-                    'x_duurtijd_totaal'
-                ]
-            }
-        )
+        duration_rules = get_duration_rules(models, uid)
 
         total_duration_rules = len(duration_rules)
         logger.info(f"Fetched {total_duration_rules} service duration rules")
@@ -877,6 +819,7 @@ def generate_price_export():
         # Set up log capture
         log_handler, log_capture_string = create_log_capture_handler()
         logger.addHandler(log_handler)
+        rpc_ledger = start_ledger('/generate-price-export')
 
         logger.info("Starting price-export generation route")
         logger.info(f"Payload received: {json.dumps(payload, indent=2)}")
@@ -1027,7 +970,8 @@ def generate_price_export():
             attachment_ids.append(csv_attachment_id)
             logger.info(f"Created CSV attachment for pricelist '{pricelist_name}' with ID: {csv_attachment_id}")
 
-        # Get captured logs and create log attachment
+        # Get captured logs (with the Odoo call ledger so far) and create log attachment
+        logger.info(rpc_ledger.format())
         captured_logs = log_capture_string.getvalue()
         log_filename = f"price_export_logs_{timestamp}.txt"
         log_attachment_data = {
@@ -1158,6 +1102,8 @@ def generate_price_export():
         log_contents = ""
         try:
             if 'log_handler' in locals() and 'log_capture_string' in locals():
+                if 'rpc_ledger' in locals():
+                    logger.info(rpc_ledger.format())
                 log_contents = log_capture_string.getvalue()
                 logger.removeHandler(log_handler)
                 log_capture_string.close()
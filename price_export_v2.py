@@ -1,5 +1,4 @@
 from flask import Blueprint, jsonify, request
-import xmlrpc.client
 import os
 import json
 import base64
@@ -12,6 +11,10 @@ import openpyxl
 import re
 import csv
 from utils import log_route_call
+from odoo_client import ODOO_DB, ODOO_API_KEY, get_uid, get_odoo_models
+from rpc_metrics import start_ledger
+from reference_replica import (get_price_export_products, count_price_export_products, get_pricelists,
+    get_duration_rules, get_price_export_dimensions)
 
 # Configure logging
 logging.basicConfig(
@@ -122,41 +125,7 @@ def create_log_capture_handler():
         # Don't raise the exception - logging failure shouldn't break the main flow
         return None
 
-# Odoo Configuration
-ODOO_URL = os.getenv('JUSTFRAMEIT_ODOO_URL')
-ODOO_DB = os.getenv('JUSTFRAMEIT_ODOO_DB')
-ODOO_USERNAME = os.getenv('JUSTFRAMEIT_ODOO_USERNAME')
-ODOO_API_KEY = os.getenv('JUSTFRAMEIT_ODOO_API_KEY')
-
-def get_odoo_common():
-    """Get Odoo common endpoint"""
-    try:
-        common = xmlrpc.client.ServerProxy(f'{ODOO_URL}/xmlrpc/2/common', allow_none=True)
-        return common
-    except Exception as e:
-        logger.error(f"Failed to connect to Odoo common endpoint: {str(e)}")
-        raise
 
-def get_odoo_models():
-    """Get Odoo models endpoint"""
-    try:
-        models = xmlrpc.client.ServerProxy(f'{ODOO_URL}/xmlrpc/2/object', allow_none=True)
-        return models
-    except Exception as e:
-        logger.error(f"Failed to connect to Odoo models endpoint: {str(e)}")
-        raise
-
-def get_uid():
-    """Get Odoo user ID"""
-    try:
-        common = get_odoo_common()
-        uid = common.authenticate(ODOO_DB, ODOO_USERNAME, ODOO_API_KEY, {})
-        if not uid:
-            raise Exception("Authentication failed")
-        return uid
-    except Exception as e:
-        logger.error(f"Failed to authenticate with Odoo: {str(e)}")
-        raise
 
 
 # =============================================
@@ -174,38 +143,26 @@ def get_dimensions_from_config(models, uid):
     try:
         logger.info("Fetching dimensions from Odoo configuration...")
         
-        # Try to get dimensions from configuration
-        config_ids = models.execute_kw(
-            ODOO_DB, uid, ODOO_API_KEY,
-            'x_configuration', 'search', [[]]
-        )
+        # Try to get dimensions from configuration (reference replica, or Odoo when disabled)
+        dimensions_json = get_price_export_dimensions(models, uid)
         
-        if config_ids:
-            config_data = models.execute_kw(
-                ODOO_DB, uid, ODOO_API_KEY,
-                'x_configuration', 'read', [config_ids[0]], {
-                    'fields': ['x_studio_price_export_dimensions']
-                }
-            )
-            
-            if config_data and config_data[0].get('x_studio_price_export_dimensions'):
-                dimensions_json = config_data[0]['x_studio_price_export_dimensions']
-                logger.info(f"Found dimensions configuration in Odoo: {len(dimensions_json)} chars")
-                try:
-                    raw_dimensions = json.loads(dimensions_json)
-                    # Convert to tuples with computed values
-                    dimensions = []
-                    for dim in raw_dimensions:
-                        width_mm = dim['width_mm']
-                        height_mm = dim['height_mm']
-                        width_cm = width_mm / 10
-                        height_cm = height_mm / 10
-                        surface_m2 = (width_mm * height_mm) / 1000000  # mm² to m²
-                        circumference_m = 2 * (width_mm + height_mm) / 1000  # mm to m
-                        dimensions.append((width_mm, height_mm, width_cm, height_cm, surface_m2, circumference_m))
-                    return dimensions
-                except json.JSONDecodeError as e:
-                    logger.warning(f"Failed to parse dimensions JSON: {e}")
+        if dimensions_json:
+            logger.info(f"Found dimensions configuration in Odoo: {len(dimensions_json)} chars")
+            try:
+                raw_dimensions = json.loads(dimensions_json)
+                # Convert to tuples with computed values
+                dimensions = []
+                for dim in raw_dimensions:
+                    width_mm = dim['width_mm']
+                    height_mm = dim['height_mm']
+                    width_cm = width_mm / 10
+                    height_cm = height_mm / 10
+                    surface_m2 = (width_mm * height_mm) / 1000000  # mm² to m²
+                    circumference_m = 2 * (width_mm + height_mm) / 1000  # mm to m
+                    dimensions.append((width_mm, height_mm, width_cm, height_cm, surface_m2, circumference_m))
+                return dimensions
+            except json.JSONDecodeError as e:
+                logger.warning(f"Failed to parse dimensions JSON: {e}")
         
         # Return default dimensions based on the Excel template pattern
         logger.info("Using default dimensions from Excel template pattern")
@@ -295,8 +252,6 @@ def build_duration_lookup(duration_rules):
     Returns:
         dict: {service_name: {'sorted_rules': [(qty, duration), ...], 'max_duration': duration}}
     """
-    import bisect
-    
     lookup = {}
     
     for rule in duration_rules:
@@ -550,25 +505,22 @@ def generate_csv_direct(models, uid, pricelist_name=None):
         # =============================================
         logger.info("Fetching products with price computation = Surface or Circumference...")
         
-        products = models.execute_kw(
-            ODOO_DB, uid, ODOO_API_KEY,
-            'product.product', 'search_read',
-            [[['x_studio_price_computation', 'in', ['Surface', 'Circumference']]]],
-            {
-                'fields': [
-                    'name',
-                    'id',
-                    'product_tmpl_id',
-                    'x_studio_product_code',
-                    'x_studio_location_code',
-                    'description_ecommerce',
-                    'x_studio_price_computation',
-                    'standard_price',
-                    'x_studio_associated_service',
-                    'x_studio_associated_work_center',
-                    'x_studio_associated_cost_per_employee_per_hour'
-                ]
-            }
+        # Read from the local reference replica (synced with Odoo), or from Odoo when disabled
+        products = get_price_export_products(
+            models, uid,
+            [
+                'name',
+                'id',
+                'product_tmpl_id',
+                'x_studio_product_code',
+                'x_studio_location_code',
+                'description_ecommerce',
+                'x_studio_price_computation',
+                'standard_price',
+                'x_studio_associated_service',
+                'x_studio_associated_work_center',
+                'x_studio_associated_cost_per_employee_per_hour'
+            ]
         )
         
         logger.info(f"Fetched {len(products)} products")
@@ -578,15 +530,7 @@ def generate_csv_direct(models, uid, pricelist_name=None):
         # =============================================
         logger.info("Fetching pricelists...")
         
-        all_pricelists = models.execute_kw(
-            ODOO_DB, uid, ODOO_API_KEY,
-            'product.pricelist', 'search_read',
-            [],
-            {
-                'fields': ['name', 'x_studio_price_discount'],
-                'limit': 100
-            }
-        )
+        all_pricelists = get_pricelists(models, uid, limit=100)
         
         # Filter out "Default" pricelist
         pricelists = [
@@ -607,19 +551,7 @@ def generate_csv_direct(models, uid, pricelist_name=None):
         # =============================================
         logger.info("Fetching service duration rules...")
         
-        duration_rules = models.execute_kw(
-            ODOO_DB, uid, ODOO_API_KEY,
-            'x_services_duration_rules', 'search_read',
-            [[]],
-            {
-                'fields': [
-                    'x_associated_service',
-                    'x_studio_work_center',
-                    'x_studio_quantity',
-                    'x_duurtijd_totaal'
-                ]
-            }
-        )
+        duration_rules = get_duration_rules(models, uid)
         
         logger.info(f"Fetched {len(duration_rules)} duration rules")
         
@@ -727,26 +659,21 @@ def generate_price_export_excel(models, uid, d3_formula=None):
         # =============================================
         logger.info("Fetching products with price computation = Surface or Circumference...")
 
-        products = models.execute_kw(
-            ODOO_DB, uid, ODOO_API_KEY,
-            'product.product', 'search_read',
-            [[['x_studio_price_computation', 'in', ['Surface', 'Circumference']]]],  # Filter by price computation
-            {
-                'fields': [
-                    'name',
-                    'id',
-                    'x_studio_product_code',
-                    'x_studio_location_code',
-                    'description_ecommerce',
-                    'x_studio_price_computation',
-                    'standard_price',
-                    'x_studio_associated_service',
-                    'x_studio_associated_work_center',
-                    'x_studio_associated_cost_per_employee_per_hour'
-                ],
-                # uncomment for testing with a limit
-                #'limit': 100
-            }
+        # Read from the local reference replica (synced with Odoo), or from Odoo when disabled
+        products = get_price_export_products(
+            models, uid,
+            [
+                'name',
+                'id',
+                'x_studio_product_code',
+                'x_studio_location_code',
+                'description_ecommerce',
+                'x_studio_price_computation',
+                'standard_price',
+                'x_studio_associated_service',
+                'x_studio_associated_work_center',
+                'x_studio_associated_cost_per_employee_per_hour'
+            ]
         )
 
         total_products = len(products)
@@ -882,15 +809,7 @@ def generate_price_export_excel(models, uid, d3_formula=None):
         logger.info("Fetching pricelists and filling TAB 2...")
 
         # Fetch all pricelists and filter out "Default" in Python to avoid domain parsing issues
-        all_pricelists = models.execute_kw(
-            ODOO_DB, uid, ODOO_API_KEY,
-            'product.pricelist', 'search_read',
-            [],  # Empty domain = get all pricelists
-            {
-                'fields': ['name', 'x_studio_price_discount'],
-                'limit': 100  # Add limit to prevent excessive results
-            }
-        )
+        all_pricelists = get_pricelists(models, uid, limit=100)  # Limit to prevent excessive results
 
         # Filter out pricelists named "Default" (case insensitive)
         pricelists = [
@@ -940,19 +859,7 @@ def generate_price_export_excel(models, uid, d3_formula=None):
         # =============================================
         logger.info("Fetching service duration rules and filling TAB 3...")
 
-        duration_rules = models.execute_kw(
-            ODOO_DB, uid, ODOO_API_KEY,
-            'x_services_duration_rules', 'search_read',
-            [[]],  # Empty domain = all duration rules
-            {
-                'fields': [
-                    'x_associated_service',
-                    'x_studio_work_center',
-                    'x_studio_quantity',
-                    'x_duurtijd_totaal'
-                ]
-            }
-        )
+        duration_rules = get_duration_rules(models, uid)
 
         total_duration_rules = len(duration_rules)
         logger.info(f"Fetched {total_duration_rules} service duration rules")
@@ -1424,6 +1331,7 @@ def generate_price_export():
         # Set up log capture
         log_handler, log_capture_string = create_log_capture_handler()
         logger.addHandler(log_handler)
+        rpc_ledger = start_ledger('/generate-price-export-v2')
 
         logger.info("Starting price-export generation route (DIRECT CSV - No Excel)")
         logger.info(f"Payload received: {json.dumps(payload, indent=2)}")
@@ -1446,20 +1354,10 @@ def generate_price_export():
 
         # Get counts for reporting
         # Fetch products count
-        products = models.execute_kw(
-            ODOO_DB, uid, ODOO_API_KEY,
-            'product.product', 'search_count',
-            [[['x_studio_price_computation', 'in', ['Surface', 'Circumference']]]]
-        )
-        total_products = products
+        total_products = count_price_export_products(models, uid)
 
         # Fetch pricelists count
-        all_pricelists = models.execute_kw(
-            ODOO_DB, uid, ODOO_API_KEY,
-            'product.pricelist', 'search_read',
-            [],
-            {'fields': ['name'], 'limit': 100}
-        )
+        all_pricelists = get_pricelists(models, uid, limit=100)
         total_pricelists = len([p for p in all_pricelists if p.get('name', '').lower() != 'default'])
 
         # Set up CSV variables
@@ -1532,7 +1430,8 @@ def generate_price_export():
             attachment_ids.append(csv_attachment_id)
             logger.info(f"Created CSV attachment for pricelist '{pl_name}' with ID: {csv_attachment_id}")
 
-        # Get captured logs and create log attachment
+        # Get captured logs (with the Odoo call ledger so far) and create log attachment
+        logger.info(rpc_ledger.format())
         captured_logs = log_capture_string.getvalue()
         log_filename = f"price_export_logs_{timestamp}.txt"
         log_attachment_data = {
@@ -1643,6 +1542,8 @@ def generate_price_export():
         log_contents = ""
         try:
             if 'log_handler' in locals() and 'log_capture_string' in locals():
+                if 'rpc_ledger' in locals():
+                    logger.info(rpc_ledger.format())
                 log_contents = log_capture_string.getvalue()
                 logger.removeHandler(log_handler)
                 log_capture_string.close()
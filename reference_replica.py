@@ -0,0 +1,469 @@
+import os
+import json
+import time
+import fcntl
+import sqlite3
+import hashlib
+import logging
+import tempfile
+import threading
+from odoo_client import ODOO_URL, ODOO_DB, ODOO_API_KEY
+
+logger = logging.getLogger(__name__)
+
+# Local replica of the Odoo reference data, shared by all gunicorn workers of the host. Unlike
+# ORDER_JOBS_PATH it holds nothing that is not in Odoo, so it defaults to the temp dir: when /tmp is
+# wiped on restart the first request does one full sync (one search_read per replicated model).
+# Set the path under /home to keep it across restarts.
+REPLICA_ENABLED = os.getenv('JUSTFRAMEIT_REPLICA_ENABLED', 'true').strip().lower() in ('1', 'true', 'yes')
+REPLICA_PATH = os.getenv('JUSTFRAMEIT_REPLICA_PATH') or os.path.join(
+    tempfile.gettempdir(), f"justframeit_reference_{ODOO_DB or 'odoo'}.sqlite3")
+
+# Seconds between two delta syncs (write_date >= last sync) with Odoo
+REPLICA_SYNC_INTERVAL = float(os.getenv('JUSTFRAMEIT_REPLICA_SYNC_INTERVAL', '60'))
+
+# Price computations exported by the price-export routes
+PRICE_EXPORT_COMPUTATIONS = ['Surface', 'Circumference']
+
+# Replicated models: which records (domain), which fields, and the optional lookup key
+REPLICATED_MODELS = {
+    'product.product': {
+        # Components (looked up by product code) and every product the price exports need
+        'domain': ['|', ['x_studio_product_code', '!=', False],
+                   ['x_studio_price_computation', 'in', PRICE_EXPORT_COMPUTATIONS]],
+        'fields': [
+            'name',
+            'product_tmpl_id',
+            'x_studio_product_code',
+            'x_studio_location_code',
+            'description_ecommerce',
+            'x_studio_price_computation',
+            'standard_price',
+            'x_studio_associated_service',
+            'x_studio_associated_service_duration_rule',
+            'x_studio_associated_work_center',
+            'x_studio_associated_cost_per_employee_per_hour',
+            'x_studio_is_visible_in_portal_reports',
+        ],
+        'key': 'x_studio_product_code',
+        # name, description_ecommerce, ... are stored on the template (_inherits): editing them
+        # only changes the template's write_date
+        'inherits': 'product_tmpl_id',
+    },
+    'x_services': {
+        'domain': [],
+        'fields': ['x_name', 'x_studio_associated_work_center'],
+    },
+    'x_services_duration_rules': {
+        'domain': [],
+        'fields': ['x_associated_service', 'x_studio_work_center', 'x_studio_quantity', 'x_duurtijd_totaal'],
+    },
+    'product.pricelist': {
+        'domain': [],
+        'fields': ['name', 'x_studio_price_discount'],
+    },
+    'x_configuration': {
+        'domain': [],
+        'fields': ['x_studio_price_export_dimensions'],
+    },
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    model TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    position INTEGER NOT NULL DEFAULT 0,
+    key TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (model, id)
+);
+CREATE INDEX IF NOT EXISTS records_key ON records (model, key);
+CREATE TABLE IF NOT EXISTS sync_state (
+    model TEXT PRIMARY KEY,
+    last_write_date TEXT
+);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# SQLite limits the number of bound parameters per statement
+_MAX_PARAMS = 500
+
+_replica = None
+_replica_lock = threading.Lock()
+
+
+class ReplicaUnavailable(Exception):
+    """Raised when the replica has never been synced and Odoo cannot be reached."""
+
+
+class ReferenceReplica:
+    """
+    On-disk SQLite replica of the reference models in REPLICATED_MODELS.
+
+    All worker processes of the host share one file. Every sync_interval one of
+    them pulls the records with write_date >= the last seen write_date (or whose
+    _inherits parent, e.g. the product template, has such a write_date), while
+    the others keep reading the local copy. The ordered id list, to drop
+    deleted/archived records and keep Odoo's ordering, is only fetched when
+    records changed or the record count differs from the local one.
+
+    Only the very first sync runs on the calling request; after that syncs run
+    on a background thread and requests are served the local copy meanwhile. If
+    Odoo cannot be reached the last synced data keeps being served.
+    """
+
+    def __init__(self, path=REPLICA_PATH, sync_interval=REPLICA_SYNC_INTERVAL):
+        self.path = path
+        self.sync_interval = sync_interval
+        self._local = threading.local()
+        self._sync_lock = threading.Lock()
+        self._syncing = False
+        self._next_check = 0.0
+        self._fingerprint = hashlib.sha256(
+            json.dumps([ODOO_URL, ODOO_DB, REPLICATED_MODELS], sort_keys=True).encode('utf-8')).hexdigest()
+        # Counters
+        self._syncs = 0
+        self._sync_failures = 0
+        self._records_pulled = 0
+        self._last_sync_ms = 0.0
+        self._reads = 0
+        self._initialize()
+
+    # ------------------------------------------------------------------ #
+    # Storage
+    # ------------------------------------------------------------------ #
+
+    def _connection(self):
+        # One connection per thread (and per process: forked children reopen)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _initialize(self):
+        with self._file_lock():
+            conn = self._connection()
+            conn.executescript(_SCHEMA)
+            if self._meta(conn, 'fingerprint') != self._fingerprint:
+                # Different Odoo database or replicated fields: start from scratch
+                conn.execute('BEGIN IMMEDIATE')
+                conn.execute('DELETE FROM records')
+                conn.execute('DELETE FROM sync_state')
+                conn.execute('DELETE FROM meta')
+                conn.execute("INSERT INTO meta (name, value) VALUES ('fingerprint', ?)", (self._fingerprint,))
+                conn.execute('COMMIT')
+
+    @staticmethod
+    def _meta(conn, name, default=None):
+        row = conn.execute('SELECT value FROM meta WHERE name = ?', (name,)).fetchone()
+        return row[0] if row else default
+
+    @staticmethod
+    def _set_meta(conn, name, value):
+        conn.execute('INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)', (name, str(value)))
+
+    def _file_lock(self, blocking=True):
+        return _FileLock(self.path + '.lock', blocking)
+
+    def synced_at(self):
+        """Wall-clock time of the last successful sync (by any process), or None."""
+        value = self._meta(self._connection(), 'synced_at')
+        return float(value) if value else None
+
+    def generation(self):
+        """Counter bumped by every sync that changed data (used to refresh derived caches)."""
+        return int(self._meta(self._connection(), 'generation', 0))
+
+    # ------------------------------------------------------------------ #
+    # Sync
+    # ------------------------------------------------------------------ #
+
+    def ensure_fresh(self, models, uid):
+        """
+        Sync with Odoo if no process has done so within sync_interval.
+
+        Without local data the caller waits for the sync; otherwise the sync is
+        started on a background thread and the caller reads the current data.
+        """
+        if time.time() < self._next_check:
+            return
+
+        with self._sync_lock:
+            if time.time() < self._next_check or self._syncing:
+                return
+            synced_at = self.synced_at()
+            if synced_at and time.time() - synced_at < self.sync_interval:
+                self._next_check = synced_at + self.sync_interval
+                return
+            if not synced_at:
+                self._refresh(models, uid)
+                return
+            # A fresh thread, so the sync is not bound by the request's deadline or call ledger
+            self._syncing = True
+            threading.Thread(target=self._refresh, args=(models, uid), name='replica-sync', daemon=True).start()
+
+    def _refresh(self, models, uid):
+        try:
+            synced_at = self.synced_at()
+            # Without data we must wait for whoever is syncing; with data we can serve it meanwhile
+            with self._file_lock(blocking=not synced_at) as acquired:
+                if not acquired:
+                    return
+                synced_at = self.synced_at()
+                if synced_at and time.time() - synced_at < self.sync_interval:
+                    self._next_check = synced_at + self.sync_interval
+                    return
+                try:
+                    self._sync(models, uid)
+                except Exception as e:
+                    self._sync_failures += 1
+                    if not synced_at:
+                        raise ReplicaUnavailable(f"Reference replica could not be synced: {str(e)}") from e
+                    logger.warning(f"Reference replica sync failed, serving data from "
+                                   f"{time.time() - synced_at:.0f}s ago: {str(e)}")
+                    self._next_check = time.time() + min(self.sync_interval, 30)
+                    return
+            self._next_check = time.time() + self.sync_interval
+        finally:
+            self._syncing = False
+
+    def _sync(self, models, uid):
+        started = time.perf_counter()
+        conn = self._connection()
+        state = dict(conn.execute('SELECT model, last_write_date FROM sync_state').fetchall())
+
+        # Pull everything first so the write transaction stays short
+        pulled = {}
+        for model, spec in REPLICATED_MODELS.items():
+            last_write_date = state.get(model)
+            domain = list(spec['domain'])
+            if last_write_date:
+                delta = [['write_date', '>=', last_write_date]]
+                if spec.get('inherits'):
+                    delta = ['|'] + delta + [[f"{spec['inherits']}.write_date", '>=', last_write_date]]
+                domain += delta
+            changed = models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
+                model, 'search_read', [domain], {'fields': spec['fields'] + ['write_date']})
+            stored = dict(conn.execute('SELECT id, data FROM records WHERE model = ?', (model,)).fetchall())
+            # write_date >= last sync re-pulls the records of the last second: only count real changes
+            updated = any(stored.get(record['id']) != json.dumps(record, default=str) for record in changed)
+            if not last_write_date:
+                # Full pull: it is the ordered list
+                ordered_ids = [record['id'] for record in changed]
+            elif updated or models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
+                    model, 'search_count', [spec['domain']]) != len(stored):
+                # Records were added, changed (maybe reordered) or removed
+                ordered_ids = models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
+                    model, 'search', [spec['domain']])
+            else:
+                ordered_ids = None
+            pulled[model] = (changed, ordered_ids)
+
+        changes = 0
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            for model, (changed, ordered_ids) in pulled.items():
+                if ordered_ids is None:
+                    continue
+                key_field = REPLICATED_MODELS[model].get('key')
+                positions = {record_id: position for position, record_id in enumerate(ordered_ids)}
+                stored = dict(conn.execute('SELECT id, data FROM records WHERE model = ?', (model,)).fetchall())
+
+                # write_date >= last sync re-pulls the records of the last second: only count real changes
+                updated = []
+                for record in changed:
+                    data = json.dumps(record, default=str)
+                    if stored.get(record['id']) != data:
+                        updated.append((model, record['id'], positions.get(record['id'], 0),
+                                        (record.get(key_field) or None) if key_field else None, data))
+                conn.executemany(
+                    'INSERT OR REPLACE INTO records (model, id, position, key, data) VALUES (?, ?, ?, ?, ?)', updated)
+
+                removed = set(stored) - set(ordered_ids)
+                conn.executemany('DELETE FROM records WHERE model = ? AND id = ?', [(model, i) for i in removed])
+                conn.executemany('UPDATE records SET position = ? WHERE model = ? AND id = ?',
+                                 [(position, model, i) for i, position in positions.items()])
+
+                write_dates = [record['write_date'] for record in changed if record.get('write_date')]
+                last_write_date = max(write_dates + ([state[model]] if state.get(model) else []), default=None)
+                conn.execute('INSERT OR REPLACE INTO sync_state (model, last_write_date) VALUES (?, ?)',
+                             (model, last_write_date))
+                changes += len(updated) + len(removed)
+
+            if changes:
+                self._set_meta(conn, 'generation', int(self._meta(conn, 'generation', 0)) + 1)
+            self._set_meta(conn, 'synced_at', time.time())
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+        self._syncs += 1
+        self._records_pulled += sum(len(changed) for changed, _ in pulled.values())
+        self._last_sync_ms = (time.perf_counter() - started) * 1000
+        logger.info(f"Reference replica synced: {changes} change(s) in {self._last_sync_ms:.0f} ms")
+
+    # ------------------------------------------------------------------ #
+    # Reads
+    # ------------------------------------------------------------------ #
+
+    def records(self, models, uid, model):
+        """All replicated records of a model, in Odoo's default order."""
+        self.ensure_fresh(models, uid)
+        self._reads += 1
+        rows = self._connection().execute(
+            'SELECT data FROM records WHERE model = ? ORDER BY position, id', (model,)).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def by_keys(self, models, uid, model, keys):
+        """
+        Replicated records by lookup key (e.g. product code).
+
+        Returns:
+            dict: key -> record (keys without a record are left out)
+        """
+        self.ensure_fresh(models, uid)
+        self._reads += 1
+        keys = list(dict.fromkeys(k for k in keys if k))
+        found = {}
+        conn = self._connection()
+        for start in range(0, len(keys), _MAX_PARAMS):
+            chunk = keys[start:start + _MAX_PARAMS]
+            rows = conn.execute(
+                f"SELECT key, data FROM records WHERE model = ? AND key IN ({', '.join('?' * len(chunk))}) "
+                f"ORDER BY position, id", [model] + chunk).fetchall()
+            for key, data in rows:
+                found[key] = json.loads(data)
+        return found
+
+    def stats(self):
+        """Sync and size counters."""
+        conn = self._connection()
+        synced_at = self.synced_at()
+        return {
+            'path': self.path,
+            'sync_interval_seconds': self.sync_interval,
+            'age_seconds': round(time.time() - synced_at, 1) if synced_at else None,
+            'generation': self.generation(),
+            'records': dict(conn.execute('SELECT model, COUNT(*) FROM records GROUP BY model').fetchall()),
+            'syncs': self._syncs,
+            'sync_failures': self._sync_failures,
+            'records_pulled': self._records_pulled,
+            'last_sync_ms': round(self._last_sync_ms, 2),
+            'reads': self._reads,
+        }
+
+
+class _FileLock:
+    """Exclusive flock on a side file, to let a single process sync at a time."""
+
+    def __init__(self, path, blocking=True):
+        self.path = path
+        self.blocking = blocking
+        self._fd = None
+
+    def __enter__(self):
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_EX if self.blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(self._fd)
+            self._fd = None
+            return False
+        return True
+
+    def __exit__(self, *exc_info):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+
+def get_reference_replica():
+    """Get the process-wide reference replica, or None when JUSTFRAMEIT_REPLICA_ENABLED is off"""
+    global _replica
+    if not REPLICA_ENABLED:
+        return None
+    if _replica is not None:
+        return _replica
+
+    with _replica_lock:
+        if _replica is None:
+            _replica = ReferenceReplica()
+        return _replica
+
+
+def get_price_export_products(models, uid, fields):
+    """Products with price computation Surface or Circumference (replica, or Odoo when disabled)."""
+    replica = get_reference_replica()
+    if replica is None:
+        return models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
+            'product.product', 'search_read',
+            [[['x_studio_price_computation', 'in', PRICE_EXPORT_COMPUTATIONS]]],
+            {'fields': fields})
+    return [product for product in replica.records(models, uid, 'product.product')
+            if product.get('x_studio_price_computation') in PRICE_EXPORT_COMPUTATIONS]
+
+
+def count_price_export_products(models, uid):
+    """Number of products with price computation Surface or Circumference."""
+    replica = get_reference_replica()
+    if replica is None:
+        return models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
+            'product.product', 'search_count',
+            [[['x_studio_price_computation', 'in', PRICE_EXPORT_COMPUTATIONS]]])
+    return len(get_price_export_products(models, uid, ['id']))
+
+
+def get_pricelists(models, uid, limit=100):
+    """Pricelists with name and x_studio_price_discount (replica, or Odoo when disabled)."""
+    replica = get_reference_replica()
+    if replica is None:
+        return models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
+            'product.pricelist', 'search_read', [],
+            {'fields': ['name', 'x_studio_price_discount'], 'limit': limit})
+    return replica.records(models, uid, 'product.pricelist')[:limit]
+
+
+def get_duration_rules(models, uid):
+    """All service duration rules (replica, or Odoo when disabled)."""
+    replica = get_reference_replica()
+    if replica is None:
+        return models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
+            'x_services_duration_rules', 'search_read', [[]],
+            {'fields': REPLICATED_MODELS['x_services_duration_rules']['fields']})
+    return replica.records(models, uid, 'x_services_duration_rules')
+
+
+def get_price_export_dimensions(models, uid):
+    """x_studio_price_export_dimensions of the first x_configuration record, or None if there is none."""
+    replica = get_reference_replica()
+    if replica is None:
+        config_ids = models.execute_kw(ODOO_DB, uid, ODOO_API_KEY, 'x_configuration', 'search', [[]])
+        if not config_ids:
+            return None
+        config_data = models.execute_kw(ODOO_DB, uid, ODOO_API_KEY,
+            'x_configuration', 'read', [config_ids[0]], {'fields': ['x_studio_price_export_dimensions']})
+        return config_data[0].get('x_studio_price_export_dimensions') if config_data else None
+    configurations = replica.records(models, uid, 'x_configuration')
+    return configurations[0].get('x_studio_price_export_dimensions') if configurations else None
+
+
+def _reset_after_fork():
+    global _replica_lock
+    _replica_lock = threading.Lock()
+    if _replica is not None:
+        # The parent's sync thread does not survive a fork
+        _replica._sync_lock = threading.Lock()
+        _replica._syncing = False
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
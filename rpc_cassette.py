@@ -0,0 +1,196 @@
+import os
+import json
+import gzip
+import time
+import logging
+import threading
+import xmlrpc.client
+
+logger = logging.getLogger(__name__)
+
+# Cassette mode for Odoo calls: 'off' (default), 'record' or 'replay'
+CASSETTE_MODE = os.getenv('JUSTFRAMEIT_ODOO_CASSETTE_MODE', 'off').strip().lower()
+
+# Gzipped JSON lines file holding the recorded calls
+CASSETTE_PATH = os.getenv('JUSTFRAMEIT_ODOO_CASSETTE_PATH', 'odoo_cassette.jsonl.gz')
+
+# On replay, sleep for the recorded call duration multiplied by this factor (0 = no delay)
+CASSETTE_LATENCY_SCALE = float(os.getenv('JUSTFRAMEIT_ODOO_CASSETTE_LATENCY', '0'))
+
+_cassette = None
+_cassette_lock = threading.Lock()
+
+
+class CassetteMiss(Exception):
+    """Raised on replay when no recorded call is left for a request."""
+
+
+def _call_key(model, method, args, kwargs):
+    return json.dumps([model, method, args, kwargs], sort_keys=True, default=str)
+
+
+class CassetteRecorder:
+    """
+    Appends every Odoo call (request, response or fault, duration) to a cassette.
+
+    Each call is written as its own gzip member with a single O_APPEND write, so
+    threads and forked worker processes can record into the same file without
+    interleaving. The database name and API key are never written.
+    """
+
+    mode = 'record'
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+        self._lock = threading.Lock()
+
+    def _open(self):
+        if self._fd is None:
+            self._fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+        return self._fd
+
+    def call(self, uid, model, method, args, kwargs, send):
+        """Perform the call through send() and record its outcome."""
+        entry = {'pid': os.getpid(), 'uid': uid, 'model': model, 'method': method, 'args': args, 'kwargs': kwargs}
+        started = time.perf_counter()
+        try:
+            result = send()
+            entry['result'] = result
+            return result
+        except xmlrpc.client.Fault as e:
+            entry['fault'] = {'code': e.faultCode, 'message': e.faultString}
+            raise
+        except Exception as e:
+            entry['error'] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            entry['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 2)
+            self._write(entry)
+
+    def _write(self, entry):
+        try:
+            member = gzip.compress((json.dumps(entry, default=str) + '\n').encode('utf-8'))
+            with self._lock:
+                os.write(self._open(), member)
+        except Exception as e:
+            logger.error(f"Failed to record Odoo call {entry['model']}.{entry['method']}: {str(e)}")
+
+    def recorded_uid(self):
+        return None
+
+    def reset_after_fork(self):
+        # The inherited descriptor is fine for O_APPEND writes, but the lock may be held
+        self._lock = threading.Lock()
+
+    def close(self):
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+
+class CassettePlayer:
+    """
+    Serves recorded Odoo responses instead of calling the server.
+
+    A request is matched to the first unused recording with identical model,
+    method and arguments; if there is none (e.g. the arguments contain generated
+    references or timestamps) the next unused recording of the same model.method
+    is used. Recorded faults are raised again as xmlrpc.client.Fault.
+    """
+
+    mode = 'replay'
+
+    def __init__(self, path, latency_scale=CASSETTE_LATENCY_SCALE):
+        self.path = path
+        self.latency_scale = latency_scale
+        self._entries = []
+        self._used = []
+        self._by_key = {}     # call key -> entry indexes, in recording order
+        self._by_method = {}  # 'model.method' -> entry indexes, in recording order
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        with gzip.open(self.path, 'rt', encoding='utf-8') as cassette_file:
+            for line in cassette_file:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                index = len(self._entries)
+                self._entries.append(entry)
+                self._by_key.setdefault(_call_key(entry['model'], entry['method'], entry['args'], entry['kwargs']), []).append(index)
+                self._by_method.setdefault(f"{entry['model']}.{entry['method']}", []).append(index)
+        self._used = [False] * len(self._entries)
+        logger.info(f"Loaded {len(self._entries)} recorded Odoo call(s) from {self.path}")
+
+    def _take(self, indexes):
+        for index in indexes:
+            if not self._used[index]:
+                self._used[index] = True
+                return self._entries[index]
+        return None
+
+    def call(self, uid, model, method, args, kwargs, send):
+        """Return the recorded outcome of this call; send() is never used."""
+        # Round-trip through JSON so the key matches the recorded (JSON) arguments
+        key = _call_key(model, method, json.loads(json.dumps(args, default=str)),
+                        json.loads(json.dumps(kwargs, default=str)))
+        with self._lock:
+            entry = self._take(self._by_key.get(key, ())) or self._take(self._by_method.get(f"{model}.{method}", ()))
+        if entry is None:
+            raise CassetteMiss(f"No recorded Odoo call left for {model}.{method} in {self.path}")
+
+        if self.latency_scale > 0:
+            time.sleep(entry['elapsed_ms'] * self.latency_scale / 1000)
+
+        if 'fault' in entry:
+            raise xmlrpc.client.Fault(entry['fault']['code'], entry['fault']['message'])
+        if 'error' in entry:
+            raise ConnectionError(f"Recorded error: {entry['error']}")
+        return entry['result']
+
+    def recorded_uid(self):
+        """uid used during the recording (returned by get_uid() on replay)."""
+        return next((entry['uid'] for entry in self._entries if entry.get('uid')), 1)
+
+    def remaining(self):
+        """Number of recorded calls that have not been replayed yet."""
+        with self._lock:
+            return self._used.count(False)
+
+    def reset_after_fork(self):
+        self._lock = threading.Lock()
+
+    def close(self):
+        pass
+
+
+def get_cassette():
+    """Return the process cassette (recorder or player), or None when the mode is 'off'."""
+    global _cassette
+    if CASSETTE_MODE not in ('record', 'replay'):
+        return None
+    if _cassette is not None:
+        return _cassette
+
+    with _cassette_lock:
+        if _cassette is None:
+            if CASSETTE_MODE == 'record':
+                _cassette = CassetteRecorder(CASSETTE_PATH)
+            else:
+                _cassette = CassettePlayer(CASSETTE_PATH)
+            logger.info(f"Odoo cassette {CASSETTE_MODE} mode: {CASSETTE_PATH}")
+        return _cassette
+
+
+def _reset_after_fork():
+    global _cassette_lock
+    _cassette_lock = threading.Lock()
+    if _cassette is not None:
+        _cassette.reset_after_fork()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
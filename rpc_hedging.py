@@ -0,0 +1,175 @@
+import os
+import time
+import logging
+import threading
+import contextvars
+import collections
+import concurrent.futures
+
+logger = logging.getLogger(__name__)
+
+# Send a second copy of slow read calls (off by default: hedges add load on Odoo)
+ODOO_HEDGE_ENABLED = os.getenv('JUSTFRAMEIT_ODOO_HEDGE_ENABLED', 'false').strip().lower() in ('1', 'true', 'yes')
+
+# Read-only, idempotent methods that may be hedged; writes are never hedged
+HEDGE_METHODS = ('read', 'search_read', 'search_count', 'search')
+
+# Models whose reads are hedged (catalog and BOM models by default)
+ODOO_HEDGE_MODELS = tuple(model.strip() for model in os.getenv(
+    'JUSTFRAMEIT_ODOO_HEDGE_MODELS',
+    'product.product,product.template,mrp.bom,mrp.bom.line,x_services,x_services_duration_rules'
+).split(',') if model.strip())
+
+# Latency percentile of a model.method after which the hedge is sent
+ODOO_HEDGE_PERCENTILE = float(os.getenv('JUSTFRAMEIT_ODOO_HEDGE_PERCENTILE', '0.95'))
+
+# Hedge delay (milliseconds) before enough latencies are known, and the lower bound of the delay
+ODOO_HEDGE_DEFAULT_DELAY_MS = float(os.getenv('JUSTFRAMEIT_ODOO_HEDGE_DEFAULT_DELAY_MS', '1000'))
+ODOO_HEDGE_MIN_DELAY_MS = float(os.getenv('JUSTFRAMEIT_ODOO_HEDGE_MIN_DELAY_MS', '50'))
+
+# Recent latencies kept per model.method, and how many are needed before the percentile is used
+_WINDOW = 200
+_MIN_SAMPLES = 20
+
+
+def is_hedgeable(model, method, models=ODOO_HEDGE_MODELS):
+    """Return True if model.method is a read that may be sent twice."""
+    return method in HEDGE_METHODS and model in models
+
+
+class ReadHedger:
+    """
+    Hedged execution of idempotent Odoo reads.
+
+    The call runs on a small thread pool. If it has not answered after the
+    ODOO_HEDGE_PERCENTILE latency of its model.method (recent calls, at least
+    ODOO_HEDGE_MIN_DELAY_MS), the same call is sent again on a second pooled
+    connection; the first successful response wins and the other is discarded
+    when it arrives. A hedge is only sent when the concurrency limiter has a
+    free slot, so hedging backs off by itself when Odoo is busy.
+    """
+
+    def __init__(self, workers, models=ODOO_HEDGE_MODELS, percentile=ODOO_HEDGE_PERCENTILE,
+                 default_delay_ms=ODOO_HEDGE_DEFAULT_DELAY_MS, min_delay_ms=ODOO_HEDGE_MIN_DELAY_MS):
+        self.models = models
+        self.percentile = percentile
+        self.default_delay = default_delay_ms / 1000
+        self.min_delay = min_delay_ms / 1000
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=max(2, workers),
+                                                              thread_name_prefix='odoo-hedge')
+        self._lock = threading.Lock()
+        # model.method -> recent latencies (seconds)
+        self._latencies = {}
+        # Counters
+        self._calls = 0
+        self._hedged = 0
+        self._hedge_wins = 0
+        self._primary_wins = 0
+        self._no_slot = 0
+
+    def hedges(self, model, method):
+        """Return True if calls to model.method go through call()."""
+        return is_hedgeable(model, method, self.models)
+
+    def delay_for(self, key):
+        """Seconds to wait for the first attempt before hedging."""
+        with self._lock:
+            latencies = self._latencies.get(key)
+            if not latencies or len(latencies) < _MIN_SAMPLES:
+                return max(self.default_delay, self.min_delay)
+            ordered = sorted(latencies)
+        index = min(len(ordered) - 1, int(self.percentile * len(ordered)))
+        return max(ordered[index], self.min_delay)
+
+    def _observe(self, key, elapsed):
+        with self._lock:
+            latencies = self._latencies.get(key)
+            if latencies is None:
+                latencies = self._latencies[key] = collections.deque(maxlen=_WINDOW)
+            latencies.append(elapsed)
+
+    def _timed(self, key, attempt):
+        started = time.monotonic()
+        result = attempt()
+        self._observe(key, time.monotonic() - started)
+        return result
+
+    def call(self, key, attempt, limiter):
+        """
+        Run attempt(), hedged with a second attempt() if the first is slow.
+
+        Args:
+            key: 'model.method' of the call
+            attempt: Callable performing the call (run on the hedge threads)
+            limiter: AdaptiveLimiter the hedge takes its own slot from
+
+        Returns:
+            The result of the first attempt that succeeded (raises the first error if both fail)
+        """
+        with self._lock:
+            self._calls += 1
+        # Attempts run in a copy of the caller's context (request ledger, deadline)
+        primary = self.executor.submit(contextvars.copy_context().run, self._timed, key, attempt)
+        done, _ = concurrent.futures.wait([primary], timeout=self.delay_for(key))
+        if done:
+            return primary.result()
+
+        slot = limiter.try_acquire()
+        if slot is None:
+            with self._lock:
+                self._no_slot += 1
+            return primary.result()
+
+        logger.debug(f"{key} is slow, sending a hedged request")
+        with self._lock:
+            self._hedged += 1
+        hedge = self.executor.submit(contextvars.copy_context().run, self._timed, key, attempt)
+        self._release_when_done(limiter, slot, key, primary, hedge)
+
+        pending = {primary, hedge}
+        first_error = None
+        while pending:
+            done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                error = future.exception()
+                if error is None:
+                    with self._lock:
+                        if future is hedge:
+                            self._hedge_wins += 1
+                        else:
+                            self._primary_wins += 1
+                    return future.result()
+                first_error = first_error or error
+        raise first_error
+
+    @staticmethod
+    def _release_when_done(limiter, slot, key, *futures):
+        # The hedge's slot stands for the extra call in flight: free it once both attempts have finished.
+        # Its time spans both attempts, so it is not judged as a call latency (records=None)
+        remaining = [len(futures)]
+        lock = threading.Lock()
+
+        def _done(future):
+            with lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            limiter.release(slot, key, future.exception(), records=None)
+
+        for future in futures:
+            future.add_done_callback(_done)
+
+    def stats(self):
+        """Hedge rate and win rate."""
+        with self._lock:
+            return {
+                'enabled': True,
+                'models': list(self.models),
+                'calls': self._calls,
+                'hedged': self._hedged,
+                'hedge_rate': round(self._hedged / self._calls, 4) if self._calls else 0.0,
+                'hedge_wins': self._hedge_wins,
+                'primary_wins': self._primary_wins,
+                'win_rate': round(self._hedge_wins / self._hedged, 4) if self._hedged else 0.0,
+                'skipped_no_slot': self._no_slot,
+            }
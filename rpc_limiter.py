@@ -0,0 +1,209 @@
+import os
+import time
+import socket
+import logging
+import threading
+import http.client
+import xmlrpc.client
+
+logger = logging.getLogger(__name__)
+
+# Concurrent Odoo calls allowed per process at startup; the limit then adapts between min and max
+ODOO_INITIAL_CONCURRENCY = int(os.getenv('JUSTFRAMEIT_ODOO_INITIAL_CONCURRENCY', '5'))
+ODOO_MIN_CONCURRENCY = int(os.getenv('JUSTFRAMEIT_ODOO_MIN_CONCURRENCY', '1'))
+
+# A call slower than this many times the usual latency of its model.method (at the same size) counts as congestion
+ODOO_LATENCY_TOLERANCE = float(os.getenv('JUSTFRAMEIT_ODOO_LATENCY_TOLERANCE', '2.0'))
+
+# Factor the limit is multiplied by on congestion
+ODOO_BACKOFF_RATIO = float(os.getenv('JUSTFRAMEIT_ODOO_BACKOFF_RATIO', '0.9'))
+
+# Longest time (seconds) a call waits for a free slot before it is rejected
+ODOO_QUEUE_TIMEOUT = float(os.getenv('JUSTFRAMEIT_ODOO_QUEUE_TIMEOUT', '60'))
+
+# HTTP statuses with which Odoo (or its proxy) signals overload
+OVERLOAD_STATUSES = (429, 502, 503, 504)
+
+# Weight of a new sample in the per model.method and size latency average
+_LATENCY_WEIGHT = 0.1
+
+# Samples of a model.method and size needed before its latency is judged
+_MIN_SAMPLES = 5
+
+# Slowdowns smaller than this (seconds) are noise, not congestion
+_MIN_SLOWDOWN = 0.05
+
+
+class OdooOverloaded(Exception):
+    """Raised when an Odoo call waited longer than the queue timeout for a free slot."""
+
+
+def is_overload_error(error):
+    """
+    Return True if a failed call means Odoo is overloaded (as opposed to an application error).
+
+    A call cut off by its request's deadline raises DeadlineExceeded, not a socket
+    timeout, so running out of request time never counts as overload.
+    """
+    if isinstance(error, xmlrpc.client.ProtocolError):
+        return error.errcode in OVERLOAD_STATUSES
+    return isinstance(error, (socket.timeout, TimeoutError, ConnectionError, http.client.RemoteDisconnected))
+
+
+class AdaptiveLimiter:
+    """
+    Adaptive (AIMD) limit on the number of Odoo calls in flight in this process.
+
+    Every call takes a slot with acquire() and returns it with release(), which
+    reports how the call went. Latency is judged against the usual latency of
+    the same model.method at a similar size (record counts within a factor of
+    two), so a 200-line batch write is not compared with single-record writes.
+    A call within ODOO_LATENCY_TOLERANCE times that latency raises the limit
+    additively (by about one per limit's worth of calls, and only while the
+    limit is actually in use); a slower call or an overload error multiplies it
+    by ODOO_BACKOFF_RATIO. Only
+    calls started after the previous decrease can decrease it again, so one slow
+    spell seen by many concurrent calls shrinks the limit once.
+
+    Calls over the limit queue; a call that waits longer than queue_timeout is
+    rejected with OdooOverloaded.
+    """
+
+    def __init__(self, max_limit, initial_limit=ODOO_INITIAL_CONCURRENCY, min_limit=ODOO_MIN_CONCURRENCY,
+                 tolerance=ODOO_LATENCY_TOLERANCE, backoff_ratio=ODOO_BACKOFF_RATIO, queue_timeout=ODOO_QUEUE_TIMEOUT):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.limit = float(min(max(initial_limit, self.min_limit), self.max_limit))
+        self.tolerance = tolerance
+        self.backoff_ratio = backoff_ratio
+        self.queue_timeout = queue_timeout
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._waiting = 0
+        self._last_decrease = 0.0
+        # (model.method, size class) -> [average latency (seconds), samples]
+        self._latency = {}
+        # Counters
+        self._calls = 0
+        self._queued = 0
+        self._rejected = 0
+        self._increases = 0
+        self._decreases = 0
+        self._queue_time_total = 0.0
+        self._queue_time_max = 0.0
+
+    def acquire(self, timeout=None):
+        """
+        Wait for a free slot.
+
+        Args:
+            timeout: Longest wait (seconds), queue_timeout if None
+
+        Returns:
+            float: Start time of the call (time.monotonic()), to pass to release()
+
+        Raises:
+            OdooOverloaded: If no slot was freed in time
+        """
+        timeout = self.queue_timeout if timeout is None else timeout
+        with self._cond:
+            if self._in_flight >= int(self.limit):
+                wait_started = time.monotonic()
+                deadline = wait_started + timeout
+                self._queued += 1
+                self._waiting += 1
+                try:
+                    while self._in_flight >= int(self.limit):
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._rejected += 1
+                            raise OdooOverloaded(
+                                f"No free Odoo call slot within {timeout:g}s "
+                                f"(limit {int(self.limit)}, {self._waiting} waiting)")
+                        self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+                waited = time.monotonic() - wait_started
+                self._queue_time_total += waited
+                self._queue_time_max = max(self._queue_time_max, waited)
+            self._in_flight += 1
+            self._calls += 1
+            return time.monotonic()
+
+    def try_acquire(self):
+        """Take a slot only if one is free right now; the start time for release(), or None."""
+        with self._cond:
+            if self._in_flight >= int(self.limit):
+                return None
+            self._in_flight += 1
+            self._calls += 1
+            return time.monotonic()
+
+    def release(self, started, key, error=None, records=1):
+        """
+        Free the slot taken by acquire() and adapt the limit to how the call went.
+
+        Args:
+            started: Value returned by acquire()
+            key: 'model.method' of the call (latency is judged per key and size)
+            error: Exception raised by the call, if any
+            records: Number of records the call carried (see rpc_metrics.count_records), or
+                     None if the slot's time is not the latency of one call (it is then not judged)
+        """
+        elapsed = time.monotonic() - started
+        with self._cond:
+            in_use = self._in_flight
+            self._in_flight -= 1
+            if error is not None and is_overload_error(error):
+                self._decrease(started, f"{type(error).__name__} on {key}")
+            elif error is None and records is not None:
+                # Size classes 0, 1, 2-3, 4-7, ...: calls are only compared with calls of a similar size
+                baseline = (key, records.bit_length())
+                average = self._latency.get(baseline)
+                if average is None:
+                    self._latency[baseline] = [elapsed, 1]
+                    congested = False
+                else:
+                    congested = (average[1] >= _MIN_SAMPLES and elapsed > self.tolerance * average[0]
+                                 and elapsed - average[0] > _MIN_SLOWDOWN)
+                    average[0] += _LATENCY_WEIGHT * (elapsed - average[0])
+                    average[1] += 1
+                if congested:
+                    self._decrease(started, f"{key} ({records} records) took {elapsed * 1000:.0f}ms")
+                elif in_use * 2 >= self.limit and self.limit < self.max_limit:
+                    # Only grow while the current limit is actually being used
+                    self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+                    self._increases += 1
+            # Odoo faults (validation, access, ...) say nothing about load
+            self._cond.notify_all()
+
+    def _decrease(self, started, reason):
+        # Caller holds self._cond
+        if started < self._last_decrease or self.limit <= self.min_limit:
+            return
+        previous = int(self.limit)
+        self.limit = max(float(self.min_limit), self.limit * self.backoff_ratio)
+        self._last_decrease = time.monotonic()
+        self._decreases += 1
+        if int(self.limit) < previous:
+            logger.warning(f"Odoo looks congested ({reason}), concurrency limit lowered to {int(self.limit)}")
+
+    def stats(self):
+        """Current limit, in-flight calls and queue/reject counters."""
+        with self._cond:
+            return {
+                'limit': int(self.limit),
+                'limit_exact': round(self.limit, 2),
+                'min_limit': self.min_limit,
+                'max_limit': self.max_limit,
+                'in_flight': self._in_flight,
+                'waiting': self._waiting,
+                'calls': self._calls,
+                'queued': self._queued,
+                'rejected': self._rejected,
+                'increases': self._increases,
+                'decreases': self._decreases,
+                'total_queue_ms': round(self._queue_time_total * 1000, 2),
+                'avg_queue_ms': round(self._queue_time_total * 1000 / self._queued, 2) if self._queued else 0.0,
+                'max_queue_ms': round(self._queue_time_max * 1000, 2),
+            }
@@ -0,0 +1,183 @@
+import os
+import time
+import logging
+import threading
+import contextvars
+
+logger = logging.getLogger(__name__)
+
+# Calls slower than this (milliseconds) are flagged as slow
+SLOW_CALL_THRESHOLD_MS = float(os.getenv('JUSTFRAMEIT_ODOO_SLOW_CALL_MS', '2000'))
+
+# Route used for calls made outside of an instrumented request
+UNSCOPED_ROUTE = 'unscoped'
+
+# Ledger of the request currently being handled (propagated to worker threads via copy_context)
+_current_ledger = contextvars.ContextVar('rpc_ledger', default=None)
+
+# Per-route, per-model.method latency histograms
+_histograms = {}
+_histograms_lock = threading.Lock()
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (milliseconds)."""
+
+    BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS_MS) + 1)
+        self.count = 0
+        self.errors = 0
+        self.slow = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.records = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+
+    def observe(self, elapsed_ms, record_count=0, request_bytes=0, response_bytes=0, error=False, slow=False):
+        index = 0
+        while index < len(self.BUCKETS_MS) and elapsed_ms > self.BUCKETS_MS[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.errors += int(error)
+        self.slow += int(slow)
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.records += record_count or 0
+        self.request_bytes += request_bytes
+        self.response_bytes += response_bytes
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of observations."""
+        if not self.count:
+            return 0.0
+        threshold = fraction * self.count
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            cumulative += bucket_count
+            if cumulative >= threshold:
+                return float(self.BUCKETS_MS[index]) if index < len(self.BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    def to_dict(self):
+        labels = [f"<={bound}ms" for bound in self.BUCKETS_MS] + [f">{self.BUCKETS_MS[-1]}ms"]
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'slow': self.slow,
+            'avg_ms': round(self.total_ms / self.count, 2) if self.count else 0.0,
+            'p95_ms': self.percentile(0.95),
+            'max_ms': round(self.max_ms, 2),
+            'records': self.records,
+            'request_bytes': self.request_bytes,
+            'response_bytes': self.response_bytes,
+            'buckets': {label: count for label, count in zip(labels, self.counts) if count},
+        }
+
+
+class RpcLedger:
+    """
+    Per-request record of every Odoo call: count and total time per model.method,
+    plus the calls that exceeded the slow-call threshold.
+    """
+
+    def __init__(self, route):
+        self.route = route
+        self.started = time.monotonic()
+        self.calls = 0
+        self.total_ms = 0.0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.by_call = {}  # 'model.method' -> [count, total_ms]
+        self.slow_calls = []  # (model.method, elapsed_ms, record_count)
+        self._lock = threading.Lock()
+
+    def record(self, key, elapsed_ms, record_count, request_bytes, response_bytes, slow):
+        with self._lock:
+            self.calls += 1
+            self.total_ms += elapsed_ms
+            self.request_bytes += request_bytes
+            self.response_bytes += response_bytes
+            entry = self.by_call.setdefault(key, [0, 0.0])
+            entry[0] += 1
+            entry[1] += elapsed_ms
+            if slow:
+                self.slow_calls.append((key, elapsed_ms, record_count))
+
+    def format(self):
+        """Readable summary for the captured request logs."""
+        with self._lock:
+            wall_ms = (time.monotonic() - self.started) * 1000
+            lines = [
+                f"Odoo RPC ledger for {self.route}: {self.calls} call(s), {self.total_ms:.0f} ms in Odoo "
+                f"({wall_ms:.0f} ms wall), {self.request_bytes} bytes sent, {self.response_bytes} bytes received"
+            ]
+            for key, (count, total_ms) in sorted(self.by_call.items(), key=lambda item: -item[1][1]):
+                lines.append(f"  {key}: {count} call(s), {total_ms:.0f} ms total, {total_ms / count:.0f} ms avg")
+            for key, elapsed_ms, record_count in self.slow_calls:
+                lines.append(f"  SLOW: {key} took {elapsed_ms:.0f} ms ({record_count} record(s))")
+            return "\n".join(lines)
+
+
+def start_ledger(route):
+    """Start a call ledger for the current request (and the worker threads it spawns)."""
+    ledger = RpcLedger(route)
+    _current_ledger.set(ledger)
+    return ledger
+
+
+def current_ledger():
+    """Return the ledger of the request being handled, or None."""
+    return _current_ledger.get()
+
+
+def count_records(method, args, result):
+    """Best-effort number of records touched by a call."""
+    if isinstance(result, list):
+        return len(result)
+    if method in ('write', 'unlink', 'read') and args and isinstance(args[0], list):
+        return len(args[0])
+    if method == 'create':
+        return len(args[0]) if args and isinstance(args[0], list) else 1
+    if isinstance(result, int) and not isinstance(result, bool) and method == 'search_count':
+        return result
+    return 0
+
+
+def record_call(model, method, elapsed, record_count=0, request_bytes=0, response_bytes=0, error=None):
+    """Record one Odoo call in the route histograms and the current request ledger."""
+    elapsed_ms = elapsed * 1000
+    key = f"{model}.{method}"
+    slow = elapsed_ms >= SLOW_CALL_THRESHOLD_MS
+    ledger = _current_ledger.get()
+    route = ledger.route if ledger else UNSCOPED_ROUTE
+
+    with _histograms_lock:
+        histogram = _histograms.setdefault(route, {}).get(key)
+        if histogram is None:
+            histogram = _histograms[route][key] = LatencyHistogram()
+        histogram.observe(elapsed_ms, record_count, request_bytes, response_bytes, error=error is not None, slow=slow)
+
+    if ledger:
+        ledger.record(key, elapsed_ms, record_count, request_bytes, response_bytes, slow)
+
+    if slow:
+        logger.warning(f"Slow Odoo call on {route}: {key} took {elapsed_ms:.0f} ms ({record_count} record(s))")
+
+
+def get_rpc_stats():
+    """Latency histograms grouped by route, then by model.method."""
+    with _histograms_lock:
+        return {
+            route: {key: histogram.to_dict() for key, histogram in sorted(calls.items())}
+            for route, calls in _histograms.items()
+        }
+
+
+def reset_rpc_stats():
+    """Clear all histograms (used by benchmarks and tests)."""
+    with _histograms_lock:
+        _histograms.clear()
@@ -0,0 +1,91 @@
+import os
+import sys
+import copy
+import hashlib
+import json
+import logging
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fake_odoo import FAKE_UID, FakeOdoo, FakeOdooServer  # noqa: E402
+
+CRAFT_RESOURCES = os.path.join(ROOT, 'craft resources')
+
+# What the client fixture's image fetcher returns for every photo
+FAKE_PHOTO = 'aW1hZ2U='
+FAKE_PHOTO_SHA256 = hashlib.sha256(b'image').hexdigest()
+
+
+def load_craft_payload(name, line_items=None):
+    """Load a Craft order payload, optionally keeping only the first line_items lines."""
+    with open(os.path.join(CRAFT_RESOURCES, name), encoding='utf-8') as payload_file:
+        payload = json.load(payload_file)
+    if line_items is not None:
+        payload['lineItems'] = copy.deepcopy(payload['lineItems'][:line_items])
+    return payload
+
+
+@pytest.fixture
+def fake_odoo():
+    """Seeded in-memory Odoo without latency."""
+    fake = FakeOdoo()
+    fake.seed_reference_data()
+    return fake
+
+
+@pytest.fixture
+def client(fake_odoo, monkeypatch, tmp_path):
+    """Flask test client whose handlers talk to fake_odoo instead of a real server."""
+    import justframeit
+    import price_export_v2
+    import utils
+    import image_fetcher
+    import image_store
+    from app import app
+    import reference_replica
+    from catalog_cache import get_component_catalog, get_service_catalog
+
+    # Process-level caches must not leak between fake databases. The reference
+    # replica starts synced, as it is on any host that has served a request before.
+    replica = reference_replica.ReferenceReplica(str(tmp_path / 'reference.sqlite3'))
+    replica.ensure_fresh(fake_odoo, FAKE_UID)
+    monkeypatch.setattr(reference_replica, '_replica', replica)
+    get_component_catalog().invalidate()
+    get_service_catalog().invalidate()
+
+    for module in (justframeit, price_export_v2, utils):
+        monkeypatch.setattr(module, 'get_odoo_models', lambda: fake_odoo)
+        monkeypatch.setattr(module, 'get_uid', lambda: FAKE_UID)
+    # Photos are not downloaded: any small base64 string will do
+    store = image_store.ImageStore(str(tmp_path / 'images.sqlite3'))
+    monkeypatch.setattr(image_store, '_store', store)
+
+    def fetch(fetcher, url):
+        store.put(FAKE_PHOTO_SHA256, FAKE_PHOTO, url)
+        return FAKE_PHOTO, FAKE_PHOTO_SHA256
+    monkeypatch.setattr(image_fetcher.ImageFetcher, 'fetch', fetch)
+
+    logging.disable(logging.INFO)
+    yield app.test_client()
+    logging.disable(logging.NOTSET)
+
+
+@pytest.fixture(params=['xmlrpc', 'jsonrpc'])
+def served_client(request, client, fake_odoo, monkeypatch):
+    """Like client, but every Odoo call goes through OdooModels (limiter, hedging, deadlines, metrics) over HTTP."""
+    import justframeit
+    import price_export_v2
+    import utils
+    import odoo_client
+
+    monkeypatch.setattr(odoo_client, 'ODOO_HEDGE_ENABLED', True)
+    with FakeOdooServer(fake_odoo) as server:
+        models = odoo_client.OdooModels(server.url, pool_size=4, protocol=request.param)
+        monkeypatch.setattr(odoo_client, '_models', models)
+        for module in (justframeit, price_export_v2, utils):
+            monkeypatch.setattr(module, 'get_odoo_models', lambda: models)
+        yield client
+        models.close()
@@ -0,0 +1,79 @@
+"""
+Odoo call budgets per endpoint scenario.
+
+'total' caps the number of execute_kw calls one request may make; 'calls'
+optionally caps individual model.method pairs. When an optimization lowers the
+count, lower the budget with it so the gain cannot silently regress.
+
+Unless the scenario says otherwise the reference replica is already synced, so
+components, services, duration rules and pricelists cost no calls.
+"""
+
+CALL_BUDGETS = {
+    'web_order_1_line_with_photo': {
+        'total': 16,
+        'calls': {
+            'product.product.search_read': 0,
+            'x_services.search_read': 0,
+            'x_services_duration_rules.search_read': 0,
+            # One image attachment (shared by all chatters), the payload and the log
+            'ir.attachment.create': 3,
+            'product.product.write': 0,
+        },
+    },
+    'web_order_3_lines': {
+        'total': 11,
+        'calls': {
+            'product.product.search_read': 0,
+            'product.product.create': 1,
+            'product.product.read': 1,
+            'product.template.write': 0,
+            'mrp.bom.create': 0,
+            # Line descriptions are computed locally and sent with the sale.order create
+            'sale.order.create': 1,
+            'sale.order.read': 0,
+            'sale.order.line.read': 0,
+            'sale.order.line.write': 0,
+        },
+    },
+    # First request on a host: one full replica sync (one search_read per model)
+    'web_order_3_lines_cold_replica': {
+        'total': 16,
+        'calls': {
+            'product.product.search_read': 1,
+            'x_services.search_read': 1,
+            'x_services_duration_rules.search_read': 1,
+        },
+    },
+    # Without the replica, the request-level prefetch resolves all components in one call
+    'web_order_3_lines_no_replica': {
+        'total': 14,
+        'calls': {
+            'product.product.search_read': 1,
+            'x_services.search_read': 1,
+            'x_services_duration_rules.search_read': 1,
+        },
+    },
+    'odoo_order_20_lines': {
+        'total': 38,
+        'calls': {
+            'mrp.bom.line.read': 1,
+            'product.product.create': 1,
+            'product.product.read': 3,
+            'product.template.write': 0,
+            'mrp.bom.create': 0,
+            'product.product.search_read': 0,
+            'x_services.search_read': 0,
+            'x_services_duration_rules.search_read': 0,
+            'sale.order.write': 1,
+        },
+    },
+    'price_export_v2': {
+        'total': 7,
+        'calls': {
+            'product.product.search_read': 0,
+            'product.product.search_count': 0,
+            'x_services_duration_rules.search_read': 0,
+        },
+    },
+}
@@ -0,0 +1,90 @@
+"""Per-request deadlines: Odoo calls stop at the deadline and non-essential stages are skipped near it."""
+import time
+
+import pytest
+
+import deadline
+from benchmarks.fake_odoo import FAKE_DB, FAKE_UID, FakeOdoo, FakeOdooServer
+from deadline import Deadline, DeadlineExceeded, get_deadline_stats, request_deadline
+from odoo_client import OdooModels
+from tests.conftest import load_craft_payload
+
+
+def count_products(models):
+    return models.execute_kw(FAKE_DB, FAKE_UID, 'key', 'product.product', 'search_count', [[]])
+
+
+def test_no_odoo_call_starts_after_the_deadline():
+    fake = FakeOdoo()
+
+    @request_deadline('/test', seconds=0.2)
+    def handler(models):
+        count_products(models)
+        time.sleep(0.25)
+        count_products(models)
+
+    with FakeOdooServer(fake) as server:
+        models = OdooModels(server.url, pool_size=2)
+        with pytest.raises(DeadlineExceeded):
+            handler(models)
+        # Outside the request there is no deadline
+        count_products(models)
+
+    assert fake.call_counts['product.product.search_count'] == 2
+
+
+def test_a_slow_odoo_call_is_cut_off_at_the_deadline():
+    fake = FakeOdoo(latency=2)
+
+    @request_deadline('/test', seconds=0.3)
+    def handler(models):
+        count_products(models)
+
+    with FakeOdooServer(fake) as server:
+        models = OdooModels(server.url, pool_size=2)
+        started = time.monotonic()
+        with pytest.raises(DeadlineExceeded):
+            handler(models)
+
+    assert time.monotonic() - started < 1
+    # Running out of request time says nothing about Odoo's load
+    assert models.limiter_stats()['decreases'] == 0
+
+
+def test_non_essential_stages_are_skipped_near_the_deadline(client, fake_odoo, monkeypatch):
+    # Less time than the reserve the non-essential stages need
+    monkeypatch.setattr(deadline, 'REQUEST_DEADLINE', deadline.NON_ESSENTIAL_RESERVE / 2)
+    skipped_before = get_deadline_stats()['skipped_stages']
+    payload = load_craft_payload('order-3fb096e.json', 3)
+
+    response = client.post('/handle-web-order', json=payload)
+
+    assert response.status_code == 200, response.get_json()
+    assert fake_odoo.call_counts.get('ir.logging.create', 0) == 0
+    skipped = get_deadline_stats()['skipped_stages']
+    for stage in ('payload attachment', 'log attachment', 'chatter summary', 'route log'):
+        assert skipped.get(stage, 0) == skipped_before.get(stage, 0) + 1
+
+
+def test_product_photos_are_not_attached_near_the_deadline(client, fake_odoo, monkeypatch):
+    monkeypatch.setattr(deadline, 'REQUEST_DEADLINE', deadline.NON_ESSENTIAL_RESERVE / 2)
+    skipped_before = get_deadline_stats()['skipped_stages'].get('product image chatter post', 0)
+
+    response = client.post('/handle-web-order', json=load_craft_payload('order-21871ab.json'))
+
+    assert response.status_code == 200, response.get_json()
+    # The photo is still the product's main image, but no attachment is created or posted
+    assert fake_odoo.call_counts.get('ir.attachment.create', 0) == 0
+    assert fake_odoo.call_counts.get('product.template.message_post', 0) == 0
+    assert get_deadline_stats()['skipped_stages']['product image chatter post'] == skipped_before + 1
+
+
+def test_an_exceeded_deadline_is_counted_once():
+    exceeded_before = get_deadline_stats()['exceeded']
+    expired = Deadline(0, '/test')
+
+    for stage in ('first call', 'second call'):
+        with pytest.raises(DeadlineExceeded):
+            expired.check(stage)
+
+    assert get_deadline_stats()['exceeded'] == exceeded_before + 1
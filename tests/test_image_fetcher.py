@@ -0,0 +1,205 @@
+"""Streaming image downloads (against the fake server's /images/ endpoint), the image store and image uploads."""
+import io
+import base64
+import random
+import hashlib
+
+import pytest
+import requests
+
+import image_store
+from benchmarks.fake_odoo import FakeOdoo, FakeOdooServer
+from image_fetcher import ImageFetcher
+from image_store import ImageStore
+from tests.conftest import FAKE_PHOTO, FAKE_PHOTO_SHA256, load_craft_payload
+
+IMAGE_SIZE = 200 * 1024 + 1  # not a multiple of the chunk size
+IMAGE_BYTES = random.Random(1).randbytes(IMAGE_SIZE)  # what FakeOdooServer serves
+
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    store = ImageStore(str(tmp_path / 'images.sqlite3'))
+    monkeypatch.setattr(image_store, '_store', store)
+    return store
+
+
+@pytest.fixture
+def server():
+    with FakeOdooServer(FakeOdoo(), image_size=IMAGE_SIZE) as server:
+        yield server
+
+
+def test_downloads_are_base64_encoded(store, server):
+    fetcher = ImageFetcher()
+    downloads = fetcher.start([f"{server.url}/images/a.jpg", f"{server.url}/images/b.jpg", None])
+    results = {url: future.result() for url, future in downloads.items()}
+
+    assert len(results) == 2
+    expected = (base64.b64encode(IMAGE_BYTES).decode('ascii'), hashlib.sha256(IMAGE_BYTES).hexdigest())
+    assert all(result == expected for result in results.values())
+    assert fetcher.stats()['downloads'] == 2
+
+
+def test_large_photos_are_downscaled(store, server):
+    Image = pytest.importorskip('PIL.Image')
+    photo = io.BytesIO()
+    Image.new('RGB', (1200, 800), 'red').save(photo, format='PNG')
+    server.httpd.RequestHandlerClass.image_bytes = photo.getvalue()
+    fetcher = ImageFetcher(max_resolution=300)
+
+    image_base64, _ = fetcher.fetch(f"{server.url}/images/a.png")
+
+    with Image.open(io.BytesIO(base64.b64decode(image_base64))) as image:
+        assert image.format == 'JPEG'
+        assert image.size == (300, 200)
+    assert fetcher.stats()['downscaled'] == 1
+
+
+def test_images_over_the_size_limit_are_rejected(store, server):
+    fetcher = ImageFetcher(max_bytes=IMAGE_SIZE - 1)
+    assert fetcher.fetch(f"{server.url}/images/a.jpg") == (None, None)
+    assert fetcher.fetch(f"{server.url}/missing.jpg") == (None, None)
+
+    assert fetcher.stats()['too_large'] == 1
+    assert fetcher.stats()['failures'] == 1
+
+
+def test_web_order_uploads_each_photo_once_per_template_and_once_as_attachment(client, fake_odoo):
+    payload = load_craft_payload('order-21871ab.json')
+
+    response = client.post('/handle-web-order', json=payload)
+
+    assert response.status_code == 200, response.get_json()
+    photo = FAKE_PHOTO
+    uploads = [(model, field) for model, table in fake_odoo.tables.items()
+               for record in table.values() for field, value in record.items() if value == photo]
+    assert sorted(uploads) == [('ir.attachment', 'datas'), ('product.template', 'image_1920')]
+    messages = [m for m in fake_odoo.tables['mail.message'].values() if m.get('attachment_ids')]
+    image_attachment_id = next(a['id'] for a in fake_odoo.tables['ir.attachment'].values() if a.get('datas') == photo)
+    assert {m['model'] for m in messages if image_attachment_id in m['attachment_ids']} == {
+        'product.template', 'product.product', 'sale.order'}
+
+
+def test_known_url_is_revalidated_instead_of_downloaded(store, server):
+    fetcher = ImageFetcher()
+    url = f"{server.url}/images/a.jpg"
+
+    first = fetcher.fetch(url)
+    second = fetcher.fetch(url)
+
+    assert second == first
+    assert fetcher.stats()['downloads'] == 1
+    assert fetcher.stats()['not_modified'] == 1
+    assert store.stats()['url_hits'] == 1
+
+
+def count_gets(fetcher, monkeypatch, fail_conditional=False):
+    """Count the fetcher's GET requests, optionally failing those with If-None-Match."""
+    gets = []
+    get = fetcher.session.get
+
+    def counting_get(url, **kwargs):
+        gets.append(kwargs.get('headers'))
+        if fail_conditional and kwargs.get('headers'):
+            raise requests.ConnectionError("connection reset")
+        return get(url, **kwargs)
+
+    monkeypatch.setattr(fetcher.session, 'get', counting_get)
+    return gets
+
+
+def test_changed_url_is_read_from_the_conditional_response(store, server, monkeypatch):
+    url = f"{server.url}/images/a.jpg"
+    store.put('0' * 64, 'b2xk', url, '"old-image"')
+    fetcher = ImageFetcher()
+    gets = count_gets(fetcher, monkeypatch)
+
+    result = fetcher.fetch(url)
+
+    assert result == (base64.b64encode(IMAGE_BYTES).decode('ascii'), hashlib.sha256(IMAGE_BYTES).hexdigest())
+    assert gets == [{'If-None-Match': '"old-image"'}]
+    assert fetcher.stats()['downloads'] == 1
+    assert store.etag_for(url) == '"fake-image"'
+
+
+def test_failed_conditional_request_falls_back_to_a_download(store, server, monkeypatch):
+    fetcher = ImageFetcher()
+    url = f"{server.url}/images/a.jpg"
+    first = fetcher.fetch(url)
+    gets = count_gets(fetcher, monkeypatch, fail_conditional=True)
+
+    assert fetcher.fetch(url) == first
+    assert gets == [{'If-None-Match': '"fake-image"'}, None]
+    assert fetcher.stats()['failures'] == 0
+
+
+def test_image_store_evicts_least_recently_used(tmp_path):
+    store = ImageStore(str(tmp_path / 'images.sqlite3'), max_bytes=25)
+    store.put('a' * 64, 'x' * 10, 'https://img/a.jpg', '"a"')
+    store.put('b' * 64, 'y' * 10)
+    store.get('a' * 64)
+    store.put('c' * 64, 'z' * 10)
+
+    assert store.get('b' * 64) is None
+    assert store.get('a' * 64) == 'x' * 10
+    assert store.etag_for('https://img/a.jpg') == '"a"'
+    assert store.stats()['evictions'] == 1
+
+
+def test_repeat_photo_reuses_its_attachment(client, fake_odoo):
+    payload = load_craft_payload('order-21871ab.json')
+    assert client.post('/handle-web-order', json=payload).status_code == 200
+    fake_odoo.reset_counters()
+
+    response = client.post('/handle-web-order', json=load_craft_payload('order-21871ab.json'))
+
+    assert response.status_code == 200, response.get_json()
+    # Only the payload and log attachments are created for the repeat order
+    assert fake_odoo.call_counts['ir.attachment.create'] == 2
+    assert image_store.get_image_store().stats()['attachment_hits'] == 1
+    # The repeat order's new template still gets the photo as its main image
+    assert fake_odoo.call_counts['product.template.write'] == 1
+
+
+def test_deleted_attachment_is_uploaded_again(client, fake_odoo):
+    image_store.get_image_store().put(FAKE_PHOTO_SHA256, FAKE_PHOTO)
+    image_store.get_image_store().set_attachment(FAKE_PHOTO_SHA256, 9999)
+    fake_odoo.reset_counters()
+
+    response = client.post('/handle-web-order', json=load_craft_payload('order-21871ab.json'))
+
+    assert response.status_code == 200, response.get_json()
+    assert fake_odoo.call_counts['ir.attachment.create'] == 3
+    assert image_store.get_image_store().attachment_for(FAKE_PHOTO_SHA256) != 9999
+
+
+def test_stored_attachment_is_not_uploaded_again_after_a_timeout(client, fake_odoo, monkeypatch):
+    assert client.post('/handle-web-order', json=load_craft_payload('order-21871ab.json')).status_code == 200
+    execute_kw = fake_odoo.execute_kw
+
+    def slow_template_post(db, uid, password, model, method, args, kwargs=None):
+        if model == 'product.template' and method == 'message_post':
+            raise TimeoutError("timed out")
+        return execute_kw(db, uid, password, model, method, args, kwargs)
+
+    monkeypatch.setattr(fake_odoo, 'execute_kw', slow_template_post)
+    fake_odoo.reset_counters()
+
+    response = client.post('/handle-web-order', json=load_craft_payload('order-21871ab.json'))
+
+    assert response.status_code == 200, response.get_json()
+    # Only the payload and log attachments: the photo's attachment is kept
+    assert fake_odoo.call_counts['ir.attachment.create'] == 2
+    assert image_store.get_image_store().attachment_for(FAKE_PHOTO_SHA256) is not None
+
+
+def test_photos_are_uploaded_without_an_image_store(client, fake_odoo, monkeypatch):
+    monkeypatch.setattr(image_store, '_store', None)
+    monkeypatch.setattr(image_store, 'IMAGE_STORE_PATH', None)
+
+    response = client.post('/handle-web-order', json=load_craft_payload('order-21871ab.json'))
+
+    assert response.status_code == 200, response.get_json()
+    assert image_store.get_image_store() is None
+    assert fake_odoo.call_counts['ir.attachment.create'] == 3
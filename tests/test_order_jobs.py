@@ -0,0 +1,129 @@
+"""Asynchronous web orders: 202 Accepted, the durable job queue and /jobs/<id>."""
+import sys
+import time
+import subprocess
+
+import pytest
+
+import order_jobs
+from order_jobs import OrderQueue
+from tests.conftest import load_craft_payload
+
+ASYNC = {'Prefer': 'respond-async'}
+
+
+@pytest.fixture
+def order_queue(monkeypatch, tmp_path):
+    queue = OrderQueue(str(tmp_path / 'jobs.sqlite3'), workers=1, poll_interval=0.05)
+    monkeypatch.setattr(order_jobs, '_queue', queue)
+    yield queue
+    queue.stop()
+
+
+def insert_running_job(queue, worker_pid, worker_host=order_jobs._HOST):
+    """Store a job as if a worker had claimed it and then stopped reporting progress."""
+    now = time.time()
+    queue._connection().execute(
+        'INSERT INTO jobs (id, kind, payload, status, progress, worker_host, worker_pid, created_at, started_at, '
+        "updated_at) VALUES ('stuck', 'web_order', '{}', 'running', 'started', ?, ?, ?, ?, ?)",
+        (worker_host, worker_pid, now, now, now))
+
+
+def wait_for_status(queue, job_id, status, timeout=5):
+    deadline = time.monotonic() + timeout
+    while queue.get(job_id)['status'] != status:
+        assert time.monotonic() < deadline, f"Job {job_id} is still {queue.get(job_id)['status']}"
+        time.sleep(0.05)
+    return queue.get(job_id)
+
+
+def wait_for_job(client, job_id, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/jobs/{job_id}").get_json()['job']
+        if job['status'] in ('succeeded', 'failed'):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"Job {job_id} did not finish within {timeout}s")
+
+
+def test_web_order_is_accepted_and_processed_in_the_background(client, fake_odoo, order_queue):
+    payload = load_craft_payload('order-3fb096e.json', 3)
+
+    response = client.post('/handle-web-order', json=payload, headers=ASYNC)
+
+    assert response.status_code == 202, response.get_json()
+    job_id = response.get_json()['job_id']
+    assert response.headers['Location'] == f"/jobs/{job_id}"
+
+    job = wait_for_job(client, job_id)
+    assert job['status'] == 'succeeded', job
+    assert job['progress'] == 'done'
+    assert job['order_id'] == next(iter(fake_odoo.tables['sale.order']))
+    assert job['result']['products_created'] == 3
+
+
+def test_resent_web_order_maps_to_the_same_job(client, fake_odoo, order_queue):
+    payload = load_craft_payload('order-3fb096e.json', 1)
+
+    first = client.post('/handle-web-order', json=payload, headers=ASYNC).get_json()
+    second = client.post('/handle-web-order', json=payload, headers=ASYNC).get_json()
+
+    assert second['job_id'] == first['job_id']
+    wait_for_job(client, first['job_id'])
+    assert len(fake_odoo.tables['sale.order']) == 1
+
+
+def test_invalid_web_order_is_rejected_without_a_job(client, order_queue):
+    response = client.post('/handle-web-order', json={'customer': {'name': 'Jan'}}, headers=ASYNC)
+
+    assert response.status_code == 400
+    assert order_queue.stats()['jobs'] == {}
+    assert client.get('/jobs/unknown').status_code == 404
+
+
+def test_job_of_a_dead_worker_process_is_marked_failed(order_queue):
+    worker = subprocess.Popen([sys.executable, '-c', 'pass'])
+    worker.wait()
+    insert_running_job(order_queue, worker.pid)
+
+    order_queue.start()
+
+    job = wait_for_status(order_queue, 'stuck', 'failed')
+    assert 'Interrupted' in job['error']
+
+
+def test_job_without_progress_is_marked_failed_by_a_later_sweep(tmp_path):
+    queue = OrderQueue(str(tmp_path / 'jobs.sqlite3'), workers=1, poll_interval=0.05,
+                       stale_after=0.3, sweep_interval=0.05)
+    try:
+        queue.start()
+        time.sleep(0.1)
+        # Claimed after the first sweep by a live process of another host
+        insert_running_job(queue, worker_pid=1, worker_host='other-host')
+
+        time.sleep(0.1)
+        assert queue.get('stuck')['status'] == 'running'
+        wait_for_status(queue, 'stuck', 'failed')
+    finally:
+        queue.stop()
+
+
+def test_web_orders_are_processed_synchronously_without_a_job_queue(client, fake_odoo, monkeypatch):
+    monkeypatch.setattr(order_jobs, '_queue', None)
+    monkeypatch.setattr(order_jobs, 'ORDER_JOBS_PATH', None)
+
+    response = client.post('/handle-web-order', json=load_craft_payload('order-3fb096e.json', 1), headers=ASYNC)
+
+    assert response.status_code == 200, response.get_json()
+    assert len(fake_odoo.tables['sale.order']) == 1
+
+
+def test_rejected_order_does_not_leave_its_log_handler_behind(client):
+    import justframeit
+    handlers = list(justframeit.logger.handlers)
+
+    for _ in range(3):
+        assert justframeit.process_web_order({'customer': {'name': 'Jan'}})[1] == 400
+
+    assert justframeit.logger.handlers == handlers
@@ -0,0 +1,138 @@
+"""Batched product and BOM creation (with per-product fallback) and parallel line processing."""
+from benchmarks.fake_odoo import FakeOdooError
+from tests.conftest import load_craft_payload
+
+
+def fail_product_create(fake_odoo, monkeypatch, failing_code):
+    """Make fake_odoo reject creating the product.product with default_code failing_code."""
+    create_one = fake_odoo._create_one
+
+    def _create_one(model, vals):
+        if model == 'product.product' and vals.get('default_code') == failing_code:
+            raise FakeOdooError(f"Invalid product {failing_code}")
+        return create_one(model, vals)
+
+    monkeypatch.setattr(fake_odoo, '_create_one', _create_one)
+
+
+def test_web_order_creates_all_products_in_one_call(client, fake_odoo):
+    payload = load_craft_payload('order-3fb096e.json', 3)
+    fake_odoo.reset_counters()
+
+    response = client.post('/handle-web-order', json=payload)
+
+    assert response.status_code == 200, response.get_json()
+    assert fake_odoo.call_counts['product.product.create'] == 1
+    assert fake_odoo.call_counts['product.product.read'] == 1
+
+
+def test_odoo_order_falls_back_to_per_product_creation(client, fake_odoo, monkeypatch):
+    import justframeit
+    sale_order_id = fake_odoo.seed_odoo_order(5)
+    references = iter([f"REF{index}" for index in range(1, 100)])
+    monkeypatch.setattr(justframeit, 'generate_product_reference', lambda line_logger=None: next(references))
+    fail_product_create(fake_odoo, monkeypatch, 'REF3')
+    fake_odoo.reset_counters()
+
+    response = client.post('/handle-odoo-order', json={'id': sale_order_id})
+
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()['processed_lines'] == 4
+    # The failed batch, then one create per product
+    assert fake_odoo.call_counts['product.product.create'] == 1 + 5
+
+
+def test_web_order_keeps_line_item_order(client, fake_odoo):
+    import justframeit
+    payload = load_craft_payload('order-3fb096e.json', 3)
+    expected_prices = [product['price'] for product in justframeit.interpret_craft_payload(payload)['products']]
+
+    response = client.post('/handle-web-order', json=payload)
+
+    assert response.status_code == 200, response.get_json()
+    order_lines = sorted(fake_odoo.tables['sale.order.line'].values(), key=lambda line: line['id'])
+    assert [line['price_unit'] for line in order_lines] == expected_prices
+
+
+def test_web_order_line_descriptions_match_odoo_defaults(client, fake_odoo):
+    payload = load_craft_payload('order-3fb096e.json', 3)
+
+    response = client.post('/handle-web-order', json=payload)
+
+    assert response.status_code == 200, response.get_json()
+    for line in fake_odoo.tables['sale.order.line'].values():
+        product = fake_odoo._read_one('product.product', line['product_id'], ['display_name', 'description_sale'])
+        default_name = product['display_name'] + (f"\n{product['description_sale']}" if product['description_sale'] else '')
+        assert line['name'].startswith(default_name)
+        assert '\n\nMateriaal: ' in line['name']
+        assert line['x_studio_additional_description']
+
+
+def test_default_line_description_format():
+    from justframeit import build_default_line_description
+
+    assert build_default_line_description(
+        {'name': 'Kader op maat', 'default_code': 'REF1', 'description_sale': 'Eik, 30 x 40 cm'}
+    ) == "[REF1] Kader op maat\nEik, 30 x 40 cm"
+    assert build_default_line_description({'name': 'Kader op maat', 'default_code': False}) == "Kader op maat"
+
+
+def test_odoo_order_falls_back_to_per_line_updates(client, fake_odoo, monkeypatch):
+    sale_order_id = fake_odoo.seed_odoo_order(5)
+    failing_line_id = sorted(fake_odoo.tables['sale.order.line'])[-2]
+    write_one = fake_odoo._write_one
+
+    def _write_one(model, record_id, vals):
+        if model == 'sale.order.line' and record_id == failing_line_id:
+            raise FakeOdooError(f"Order line {record_id} is locked")
+        return write_one(model, record_id, vals)
+
+    monkeypatch.setattr(fake_odoo, '_write_one', _write_one)
+    fake_odoo.reset_counters()
+
+    response = client.post('/handle-odoo-order', json={'id': sale_order_id})
+
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()['processed_lines'] == 4
+    # The failed batch write, then one write per line
+    assert fake_odoo.call_counts['sale.order.write'] == 1 + 5
+
+
+def test_odoo_order_skips_unreadable_bom_lines(client, fake_odoo, monkeypatch):
+    sale_order_id = fake_odoo.seed_odoo_order(3)
+    unreadable_line_id = sorted(fake_odoo.tables['mrp.bom.line'])[0]
+    read_one = fake_odoo._read_one
+
+    def _read_one(model, record_id, fields):
+        if model == 'mrp.bom.line' and record_id == unreadable_line_id:
+            return None
+        return read_one(model, record_id, fields)
+
+    monkeypatch.setattr(fake_odoo, '_read_one', _read_one)
+
+    response = client.post('/handle-odoo-order', json={'id': sale_order_id})
+
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()['processed_lines'] == 3
+
+
+def test_odoo_order_does_not_recreate_products_after_a_dropped_connection(client, fake_odoo, monkeypatch):
+    sale_order_id = fake_odoo.seed_odoo_order(3)
+    products_before = len(fake_odoo.tables['product.product'])
+    execute_kw = fake_odoo.execute_kw
+
+    def commit_then_drop(db, uid, password, model, method, args, kwargs=None):
+        result = execute_kw(db, uid, password, model, method, args, kwargs)
+        if model == 'product.product' and method == 'create':
+            raise ConnectionResetError("Connection reset by peer")
+        return result
+
+    monkeypatch.setattr(fake_odoo, 'execute_kw', commit_then_drop)
+    fake_odoo.reset_counters()
+
+    response = client.post('/handle-odoo-order', json={'id': sale_order_id})
+
+    assert response.status_code == 500
+    # The batch was committed before the connection dropped: no product is created twice
+    assert fake_odoo.call_counts['product.product.create'] == 1
+    assert len(fake_odoo.tables['product.product']) == products_before + 3
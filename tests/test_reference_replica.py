@@ -0,0 +1,98 @@
+"""Reference replica delta syncs and background refreshes, and the component catalog in front of it."""
+import time
+
+import pytest
+
+import reference_replica
+from benchmarks.fake_odoo import FAKE_UID, FakeOdoo
+from catalog_cache import ComponentCatalog
+from reference_replica import ReferenceReplica
+
+
+def backdate(fake, model, write_date='2020-01-01 00:00:00'):
+    """Pretend the records were last written long before the first sync."""
+    for record in fake.tables[model].values():
+        record['write_date'] = write_date
+
+
+@pytest.fixture
+def replica(fake_odoo, tmp_path):
+    backdate(fake_odoo, 'product.product')
+    backdate(fake_odoo, 'product.template')
+    replica = ReferenceReplica(str(tmp_path / 'reference.sqlite3'), sync_interval=3600)
+    replica.ensure_fresh(fake_odoo, FAKE_UID)
+    return replica
+
+
+def test_template_rename_is_synced(replica, fake_odoo):
+    component, other = replica.records(fake_odoo, FAKE_UID, 'product.product')[:2]
+    template_id = component['product_tmpl_id'][0]
+    # Another product written since moves the sync marker past the component's write_date
+    fake_odoo.execute_kw(None, FAKE_UID, None, 'product.product', 'write',
+                         [[other['id']], {'x_studio_location_code': 'A1'}])
+    replica._sync(fake_odoo, FAKE_UID)
+    generation = replica.generation()
+
+    # name lives on the template: the product's own write_date does not move
+    fake_odoo.execute_kw(None, FAKE_UID, None, 'product.template', 'write',
+                         [[template_id], {'name': 'Renamed template'}])
+    replica._sync(fake_odoo, FAKE_UID)
+
+    synced = {r['id']: r for r in replica.records(fake_odoo, FAKE_UID, 'product.product')}
+    assert synced[component['id']]['name'] == 'Renamed template'
+    assert replica.generation() == generation + 1
+
+
+def test_quiet_sync_does_not_fetch_id_lists(replica, fake_odoo):
+    fake_odoo.reset_counters()
+
+    replica._sync(fake_odoo, FAKE_UID)
+
+    assert not any(key.endswith('.search') for key in fake_odoo.call_counts)
+
+
+def test_removed_record_is_dropped(replica, fake_odoo):
+    component = replica.records(fake_odoo, FAKE_UID, 'product.product')[0]
+
+    fake_odoo.execute_kw(None, FAKE_UID, None, 'product.product', 'unlink', [[component['id']]])
+    replica._sync(fake_odoo, FAKE_UID)
+
+    assert component['id'] not in {r['id'] for r in replica.records(fake_odoo, FAKE_UID, 'product.product')}
+
+
+def test_stale_replica_syncs_in_the_background(tmp_path):
+    fake = FakeOdoo(latency=0.2)
+    fake.seed_reference_data()
+    replica = ReferenceReplica(str(tmp_path / 'reference.sqlite3'), sync_interval=0)
+    replica.ensure_fresh(fake, FAKE_UID)
+    synced_at = replica.synced_at()
+
+    started = time.monotonic()
+    replica.ensure_fresh(fake, FAKE_UID)
+
+    # The caller is served the local copy while the sync waits on Odoo
+    assert time.monotonic() - started < 0.2
+    deadline = time.monotonic() + 10
+    while replica._syncing and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert replica.synced_at() > synced_at
+
+
+def test_component_catalog_keeps_replica_lookups_until_a_sync_changes_data(replica, fake_odoo, monkeypatch):
+    monkeypatch.setattr(reference_replica, '_replica', replica)
+    component = next(r for r in replica.records(fake_odoo, FAKE_UID, 'product.product')
+                     if r['x_studio_product_code'])
+    code = component['x_studio_product_code']
+    catalog = ComponentCatalog()
+
+    catalog.get_many(fake_odoo, FAKE_UID, [code, 'UNKNOWN'])
+    assert catalog.get_many(fake_odoo, FAKE_UID, [code, 'UNKNOWN']) == {code: component}
+    assert catalog.stats()['replica_lookups'] == 1
+    assert catalog.stats()['hits'] == 1 and catalog.stats()['negative_hits'] == 1
+
+    fake_odoo.execute_kw(None, FAKE_UID, None, 'product.template', 'write',
+                         [[component['product_tmpl_id'][0]], {'name': 'Renamed template'}])
+    replica._sync(fake_odoo, FAKE_UID)
+
+    assert catalog.get_many(fake_odoo, FAKE_UID, [code])[code]['name'] == 'Renamed template'
+    assert catalog.stats()['replica_lookups'] == 2
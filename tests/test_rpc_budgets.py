@@ -0,0 +1,76 @@
+"""Fail when an endpoint makes more Odoo calls than its budget in rpc_budgets.py."""
+import pytest
+
+from tests.conftest import load_craft_payload
+from tests.rpc_budgets import CALL_BUDGETS
+
+
+def assert_within_budget(fake_odoo, scenario):
+    budget = CALL_BUDGETS[scenario]
+    counts = dict(sorted(fake_odoo.call_counts.items()))
+    total = sum(counts.values())
+    breakdown = '\n'.join(f"  {key}: {count}" for key, count in counts.items())
+    assert total <= budget['total'], (
+        f"{scenario} made {total} Odoo calls, budget is {budget['total']}:\n{breakdown}")
+    for key, limit in budget.get('calls', {}).items():
+        assert counts.get(key, 0) <= limit, (
+            f"{scenario} made {counts.get(key, 0)} {key} calls, budget is {limit}:\n{breakdown}")
+
+
+@pytest.mark.parametrize('scenario, payload_name, line_items', [
+    ('web_order_1_line_with_photo', 'order-21871ab.json', None),
+    ('web_order_3_lines', 'order-3fb096e.json', 3),
+])
+def test_web_order_budget(client, fake_odoo, scenario, payload_name, line_items):
+    payload = load_craft_payload(payload_name, line_items)
+    fake_odoo.reset_counters()
+
+    response = client.post('/handle-web-order', json=payload)
+
+    assert response.status_code == 200, response.get_json()
+    assert_within_budget(fake_odoo, scenario)
+
+
+def test_web_order_cold_replica_budget(client, fake_odoo, monkeypatch, tmp_path):
+    import reference_replica
+    monkeypatch.setattr(reference_replica, '_replica',
+                        reference_replica.ReferenceReplica(str(tmp_path / 'cold.sqlite3')))
+    payload = load_craft_payload('order-3fb096e.json', 3)
+    fake_odoo.reset_counters()
+
+    response = client.post('/handle-web-order', json=payload)
+
+    assert response.status_code == 200, response.get_json()
+    assert_within_budget(fake_odoo, 'web_order_3_lines_cold_replica')
+
+
+def test_web_order_without_replica_budget(client, fake_odoo, monkeypatch):
+    import reference_replica
+    monkeypatch.setattr(reference_replica, 'REPLICA_ENABLED', False)
+    payload = load_craft_payload('order-3fb096e.json', 3)
+    fake_odoo.reset_counters()
+
+    response = client.post('/handle-web-order', json=payload)
+
+    assert response.status_code == 200, response.get_json()
+    assert_within_budget(fake_odoo, 'web_order_3_lines_no_replica')
+
+
+def test_odoo_order_budget(client, fake_odoo):
+    sale_order_id = fake_odoo.seed_odoo_order(20)
+    fake_odoo.reset_counters()
+
+    response = client.post('/handle-odoo-order', json={'id': sale_order_id})
+
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()['status'] == 'success'
+    assert_within_budget(fake_odoo, 'odoo_order_20_lines')
+
+
+def test_price_export_v2_budget(client, fake_odoo):
+    fake_odoo.reset_counters()
+
+    response = client.post('/generate-price-export-v2', json={'id': 1, '_model': 'x_configuration'})
+
+    assert response.status_code == 200, response.get_json()
+    assert_within_budget(fake_odoo, 'price_export_v2')
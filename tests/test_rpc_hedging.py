@@ -0,0 +1,60 @@
+"""Hedged Odoo reads (against the fake server over XML-RPC)."""
+import time
+import threading
+
+import pytest
+
+from benchmarks.fake_odoo import FAKE_DB, FAKE_UID, FakeOdoo, FakeOdooServer
+from odoo_client import OdooModels
+from rpc_hedging import ReadHedger
+
+
+@pytest.fixture
+def stalling_odoo(monkeypatch):
+    """Fake Odoo whose first call stalls for a second."""
+    fake = FakeOdoo()
+    fake.insert('product.product', {'name': 'Lijst', 'default_code': 'FRAME'})
+    stalled = threading.Event()
+
+    def _sleep():
+        if not stalled.is_set():
+            stalled.set()
+            time.sleep(1)
+
+    monkeypatch.setattr(fake, '_sleep', _sleep)
+    return fake
+
+
+@pytest.fixture
+def models(stalling_odoo):
+    with FakeOdooServer(stalling_odoo) as server:
+        models = OdooModels(server.url, pool_size=4)
+        models.hedger = ReadHedger(workers=4, default_delay_ms=50, min_delay_ms=10)
+        yield models
+        models.close()
+
+
+def test_slow_read_is_answered_by_the_hedge(models, stalling_odoo):
+    started = time.monotonic()
+    records = models.execute_kw(FAKE_DB, FAKE_UID, 'key', 'product.product', 'search_read',
+                                [[['default_code', '=', 'FRAME']]], {'fields': ['name']})
+
+    assert [record['name'] for record in records] == ['Lijst']
+    assert time.monotonic() - started < 0.5
+    stats = models.hedger.stats()
+    assert stats['hedged'] == 1
+    assert stats['hedge_wins'] == 1
+
+    # The stalled first attempt still completes; its answer is discarded and the hedge's slot freed
+    time.sleep(1.2)
+    assert stalling_odoo.call_counts['product.product.search_read'] == 2
+    assert models.limiter_stats()['in_flight'] == 0
+
+
+def test_writes_are_never_hedged(models, stalling_odoo):
+    product_id = next(iter(stalling_odoo.tables['product.product']))
+
+    models.execute_kw(FAKE_DB, FAKE_UID, 'key', 'product.product', 'write', [[product_id], {'name': 'Passe-partout'}])
+
+    assert stalling_odoo.call_counts['product.product.write'] == 1
+    assert models.hedger.stats()['calls'] == 0
@@ -0,0 +1,90 @@
+"""The adaptive (AIMD) limit on concurrent Odoo calls."""
+import time
+import threading
+import xmlrpc.client
+
+import pytest
+
+from rpc_limiter import AdaptiveLimiter, OdooOverloaded
+
+
+def make_call(limiter, key='product.product.read', duration=0.0, error=None, records=1):
+    started = limiter.acquire()
+    time.sleep(duration)
+    limiter.release(started, key, error, records)
+
+
+def test_limit_grows_additively_while_in_use():
+    limiter = AdaptiveLimiter(max_limit=4, initial_limit=2)
+
+    for _ in range(20):
+        make_call(limiter)
+    # A single call at a time does not use the limit, so it does not grow past 2
+    assert limiter.stats()['limit'] == 2
+
+    for _ in range(10):
+        # Keep every slot busy: the limit grows by 1/limit per call
+        slots = [limiter.acquire() for _ in range(limiter.stats()['limit'])]
+        for started in slots:
+            limiter.release(started, 'product.product.read')
+    assert limiter.stats()['limit'] == 4
+    assert limiter.stats()['decreases'] == 0
+
+
+def test_slow_calls_shrink_the_limit_once_per_spell():
+    limiter = AdaptiveLimiter(max_limit=10, initial_limit=10, backoff_ratio=0.5)
+    for _ in range(5):
+        make_call(limiter, duration=0.001)
+
+    # Three calls that started together all see the same slowdown
+    slots = [limiter.acquire() for _ in range(3)]
+    time.sleep(0.1)
+    for started in slots:
+        limiter.release(started, 'product.product.read')
+
+    assert limiter.stats()['limit'] == 5
+    assert limiter.stats()['decreases'] == 1
+
+
+def test_batch_calls_are_judged_against_calls_of_their_size():
+    limiter = AdaptiveLimiter(max_limit=10, initial_limit=10, backoff_ratio=0.5)
+    for _ in range(5):
+        make_call(limiter, key='sale.order.write', duration=0.001)
+
+    # A write of 200 lines takes longer than a single-line write without any congestion
+    for _ in range(5):
+        make_call(limiter, key='sale.order.write', duration=0.1, records=200)
+    assert limiter.stats()['decreases'] == 0
+
+    make_call(limiter, key='sale.order.write', duration=0.4, records=180)
+    assert limiter.stats()['decreases'] == 1
+
+
+def test_overload_errors_shrink_the_limit_and_faults_do_not():
+    limiter = AdaptiveLimiter(max_limit=10, initial_limit=8, backoff_ratio=0.5)
+
+    make_call(limiter, error=xmlrpc.client.Fault(1, 'ValidationError'))
+    assert limiter.stats()['limit'] == 8
+
+    make_call(limiter, error=xmlrpc.client.ProtocolError('odoo/xmlrpc/2/object', 503, 'Service Unavailable', {}))
+    assert limiter.stats()['limit'] == 4
+
+
+def test_calls_over_the_limit_queue_and_are_rejected_after_the_timeout():
+    limiter = AdaptiveLimiter(max_limit=1, initial_limit=1, queue_timeout=0.05)
+    started = limiter.acquire()
+
+    with pytest.raises(OdooOverloaded):
+        limiter.acquire()
+
+    waiter = threading.Thread(target=make_call, args=(limiter,))
+    limiter.queue_timeout = 5
+    waiter.start()
+    time.sleep(0.05)
+    limiter.release(started, 'sale.order.write')
+    waiter.join(timeout=5)
+
+    stats = limiter.stats()
+    assert stats['queued'] == 2
+    assert stats['rejected'] == 1
+    assert stats['in_flight'] == 0
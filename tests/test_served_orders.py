@@ -0,0 +1,43 @@
+"""Order flows through OdooModels against the fake server over HTTP: limiter, hedging, deadlines and the call ledger."""
+import base64
+import logging
+
+from deadline import get_deadline_stats
+from rpc_metrics import get_rpc_stats
+from tests.conftest import load_craft_payload
+
+
+def test_web_order_goes_through_the_odoo_client(served_client, fake_odoo, caplog):
+    # The ledger is written to the captured request logs, at INFO
+    logging.disable(logging.NOTSET)
+    caplog.set_level(logging.INFO, logger='justframeit')
+    deadline_requests = get_deadline_stats()['requests']
+    fake_odoo.reset_counters()
+
+    response = served_client.post('/handle-web-order', json=load_craft_payload('order-21871ab.json'))
+
+    assert response.status_code == 200, response.get_json()
+    stats = served_client.get('/justframeit-api/stats').get_json()['stats']
+    # Every call took a limiter slot, catalog and BOM reads went through the hedger
+    assert stats['concurrency_limit']['calls'] == fake_odoo.total_calls()
+    assert stats['concurrency_limit']['in_flight'] == 0
+    assert stats['hedging']['calls'] > 0
+    assert sum(call['count'] for call in get_rpc_stats()['/handle-web-order'].values()) >= fake_odoo.total_calls()
+    assert get_deadline_stats()['requests'] == deadline_requests + 1
+    # The request's call ledger ends up in the log attachment
+    log_attachment = next(a for a in fake_odoo.tables['ir.attachment'].values()
+                          if a['name'].startswith('order_processing_logs_'))
+    assert 'Odoo RPC ledger for /handle-web-order' in base64.b64decode(log_attachment['datas']).decode('utf-8')
+
+
+def test_odoo_order_goes_through_the_odoo_client(served_client, fake_odoo):
+    sale_order_id = fake_odoo.seed_odoo_order(3)
+    fake_odoo.reset_counters()
+
+    response = served_client.post('/handle-odoo-order', json={'id': sale_order_id})
+
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()['processed_lines'] == 3
+    stats = served_client.get('/justframeit-api/stats').get_json()['stats']
+    assert stats['concurrency_limit']['calls'] == fake_odoo.total_calls()
+    assert stats['connection_pool']['checkouts'] >= fake_odoo.total_calls()
@@ -0,0 +1,49 @@
+"""The process-wide order-line worker pool: fair scheduling, context propagation and stats."""
+import threading
+import contextvars
+
+import pytest
+
+from worker_pool import WorkerPool
+
+request_name = contextvars.ContextVar('request_name', default=None)
+
+
+def test_groups_are_served_round_robin():
+    pool = WorkerPool(workers=1)
+    gate = threading.Event()
+    order = []
+    blocker = pool.submit('blocker', gate.wait)
+    large = [pool.submit('large', order.append, f"large-{index}") for index in range(4)]
+    small = [pool.submit('small', order.append, f"small-{index}") for index in range(2)]
+    gate.set()
+
+    for future in [blocker] + large + small:
+        future.result(timeout=5)
+
+    # The small request does not wait for all lines of the large one
+    assert order == ['large-0', 'small-0', 'large-1', 'small-1', 'large-2', 'large-3']
+
+
+def test_tasks_run_in_the_submitters_context():
+    pool = WorkerPool(workers=2)
+    request_name.set('order-42')
+
+    assert pool.submit('request', request_name.get).result(timeout=5) == 'order-42'
+
+
+def test_exceptions_and_stats():
+    pool = WorkerPool(workers=2)
+
+    def fail():
+        raise ValueError('bad line')
+
+    with pytest.raises(ValueError):
+        pool.submit('request', fail).result(timeout=5)
+    pool.submit('request', sum, [1, 2]).result(timeout=5)
+
+    stats = pool.stats()
+    assert stats['workers'] == 2
+    assert stats['submitted'] == 2
+    assert stats['failed'] == 1
+    assert stats['queue_depth'] == 0
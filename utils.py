@@ -1,9 +1,9 @@
-import os
 import json
-import xmlrpc.client
 import logging
 from datetime import datetime
 from dotenv import load_dotenv
+from odoo_client import ODOO_DB, ODOO_API_KEY, get_uid, get_odoo_models
+from deadline import deadline_allows
 
 # Load environment variables
 load_dotenv()
@@ -15,42 +15,6 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Odoo Configuration for logging
-ODOO_URL = os.getenv('JUSTFRAMEIT_ODOO_URL')
-ODOO_DB = os.getenv('JUSTFRAMEIT_ODOO_DB')
-ODOO_USERNAME = os.getenv('JUSTFRAMEIT_ODOO_USERNAME')
-ODOO_API_KEY = os.getenv('JUSTFRAMEIT_ODOO_API_KEY')
-
-def get_odoo_common():
-    """Get Odoo common endpoint"""
-    try:
-        common = xmlrpc.client.ServerProxy(f'{ODOO_URL}/xmlrpc/2/common', allow_none=True)
-        return common
-    except Exception as e:
-        logger.error(f"Failed to connect to Odoo common endpoint: {str(e)}")
-        raise
-
-def get_odoo_models():
-    """Get Odoo models endpoint"""
-    try:
-        models = xmlrpc.client.ServerProxy(f'{ODOO_URL}/xmlrpc/2/object', allow_none=True)
-        return models
-    except Exception as e:
-        logger.error(f"Failed to connect to Odoo models endpoint: {str(e)}")
-        raise
-
-def get_uid():
-    """Get Odoo user ID"""
-    try:
-        common = get_odoo_common()
-        uid = common.authenticate(ODOO_DB, ODOO_USERNAME, ODOO_API_KEY, {})
-        if not uid:
-            raise Exception("Authentication failed")
-        return uid
-    except Exception as e:
-        logger.error(f"Failed to authenticate with Odoo: {str(e)}")
-        raise
-
 def log_route_call(models, uid, route_name, payload, server_logs, response_data):
     """
     Log route calls to Odoo ir.logging model.
@@ -64,8 +28,12 @@ def log_route_call(models, uid, route_name, payload, server_logs, response_data)
         response_data: The final response data returned by the route (dict)
 
     Returns:
-        int: ID of the created log record, or None if logging failed
+        int: ID of the created log record, or None if logging failed (or was skipped
+             because the request is about to reach its deadline)
     """
+    if not deadline_allows('route log'):
+        return None
+
     try:
         # If models or uid are missing, try to establish connection
         if not models or not uid:
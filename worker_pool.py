@@ -0,0 +1,156 @@
+import os
+import time
+import logging
+import threading
+import contextvars
+import collections
+import concurrent.futures
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of order lines processed at the same time per process (shared by all requests)
+LINE_WORKERS = int(os.getenv('JUSTFRAMEIT_LINE_WORKERS', '5'))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class WorkerPool:
+    """
+    Process-wide pool of threads for order-line work, shared by all requests.
+
+    Every task is submitted under a group (one per request). Groups are served
+    round-robin, one task at a time, so a 20-line order cannot hold all workers
+    while a 1-line order waits behind it. The number of workers is the cap on
+    concurrent line work against Odoo for the whole process, instead of a
+    per-request executor size.
+
+    Tasks run in a copy of the submitter's context, so their Odoo calls land in
+    the submitting request's ledger. A task must not wait on other tasks of the
+    pool (all workers could end up waiting).
+    """
+
+    def __init__(self, workers=LINE_WORKERS):
+        self.workers = max(1, workers)
+        self._cond = threading.Condition()
+        # Group -> queued tasks; the first group is served next
+        self._queues = collections.OrderedDict()
+        self._threads = []
+        # Counters
+        self._queued = 0
+        self._max_queued = 0
+        self._active = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+
+    def submit(self, group, fn, *args, **kwargs):
+        """
+        Queue fn(*args, **kwargs) under group.
+
+        Args:
+            group: Hashable key of the submitting request (e.g. a fresh object())
+            fn: Callable to run on a worker thread
+
+        Returns:
+            concurrent.futures.Future: Resolves to fn's return value (or raises its exception)
+        """
+        future = concurrent.futures.Future()
+        task = (future, contextvars.copy_context(), fn, args, kwargs, time.monotonic())
+        with self._cond:
+            self._queues.setdefault(group, collections.deque()).append(task)
+            self._queued += 1
+            self._submitted += 1
+            self._max_queued = max(self._max_queued, self._queued)
+            if len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work, name=f'line-worker-{len(self._threads)}', daemon=True)
+                self._threads.append(thread)
+                thread.start()
+            self._cond.notify()
+        return future
+
+    def _next_task(self):
+        # Caller holds self._cond; take one task of the first group and move the group to the back
+        group, queue = next(iter(self._queues.items()))
+        task = queue.popleft()
+        if queue:
+            self._queues.move_to_end(group)
+        else:
+            del self._queues[group]
+        return task
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._queues:
+                    self._cond.wait()
+                future, context, fn, args, kwargs, queued_at = self._next_task()
+                waited = time.monotonic() - queued_at
+                self._queued -= 1
+                self._active += 1
+                self._wait_seconds += waited
+                self._max_wait_seconds = max(self._max_wait_seconds, waited)
+
+            result = error = None
+            running = future.set_running_or_notify_cancel()
+            if running:
+                try:
+                    result = context.run(fn, *args, **kwargs)
+                except BaseException as e:
+                    error = e
+
+            # Count before resolving, so stats are current for whoever waits on the future
+            with self._cond:
+                self._active -= 1
+                self._completed += 1
+                if error is not None:
+                    self._failed += 1
+            if not running:
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def stats(self):
+        """Queue depth, utilisation and wait-time counters."""
+        with self._cond:
+            started = self._submitted - self._queued
+            return {
+                'workers': self.workers,
+                'threads': len(self._threads),
+                'active': self._active,
+                'queue_depth': self._queued,
+                'max_queue_depth': self._max_queued,
+                'waiting_groups': len(self._queues),
+                'submitted': self._submitted,
+                'completed': self._completed,
+                'failed': self._failed,
+                'avg_wait_ms': round(self._wait_seconds * 1000 / started, 2) if started else 0.0,
+                'max_wait_ms': round(self._max_wait_seconds * 1000, 2),
+            }
+
+
+def get_worker_pool():
+    """Get the process-wide order-line worker pool"""
+    global _pool
+    if _pool is not None:
+        return _pool
+
+    with _pool_lock:
+        if _pool is None:
+            _pool = WorkerPool()
+        return _pool
+
+
+def _reset_after_fork():
+    # The parent's worker threads do not survive a fork
+    global _pool, _pool_lock
+    _pool_lock = threading.Lock()
+    _pool = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)